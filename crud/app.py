@@ -1,6 +1,8 @@
-from flask import Flask, json, request, jsonify
+from flask import Flask, json, request, jsonify, Response, stream_with_context
 from flask_cors import CORS
 import sys, os
+import io
+import csv
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from shared.models.base import Base
 from shared.models.job import Job
@@ -8,7 +10,11 @@ from shared.models.scrape_target import ScrapeTarget
 from shared.models.media_gen_options import MediaGenOptions
 from shared.models.media_category_options import MediaCategoryOptions
 from shared.models.media_asset import MediaAsset
+from shared.models.users import Users
+from shared.models.user_subscriptions import UserSubscriptions
 from shared.database import engine, SessionLocal
+from whatsapp.subscriptionManager import subscribe_many
+from sqlalchemy import select
 import datetime
 
 app = Flask(__name__)
@@ -591,5 +597,121 @@ def get_all_media_assets():
     finally:
         db_session.close()
 
+# Number of rows per multi-row insert statement / per fetch from the server-side cursor
+SUBSCRIPTION_CHUNK_SIZE = 1000
+
+def _subscription_format():
+    """Returns the requested bulk format ("csv" or "ndjson") from the query string or Content-Type."""
+    requested = request.args.get('format')
+    if not requested:
+        requested = "ndjson" if "ndjson" in (request.content_type or "") else "csv"
+    if requested not in ("csv", "ndjson"):
+        raise ValueError("format must be 'csv' or 'ndjson'")
+    return requested
+
+def _import_subscription_chunk(rows, totals):
+    """Subscribes a chunk of import rows through subscribe_many, one category at a time, adding the created counts to totals."""
+    by_category = {}
+    for row in rows:
+        by_category.setdefault(row["category"] or None, []).append((row["phone_number"], row.get("name") or None))
+    for category, users in by_category.items():
+        message, status_code = subscribe_many(users, category, chunk_size=SUBSCRIPTION_CHUNK_SIZE, counts=totals)
+        if status_code != 200:
+            raise Exception(message)
+
+@app.route('/subscriptions/import', methods=['POST'])
+def import_subscriptions():
+    """
+    Bulk-import users and subscriptions from a CSV or NDJSON request body.
+    - Each row has a "phone_number" and optionally a "name" and a "category".
+    - The body is streamed and each chunk goes through the WhatsApp service's subscribe_many
+      (multi-row INSERT IGNORE statements), so existing users and subscriptions are skipped.
+      Each chunk is committed on its own; the WhatsApp subscription index picks up the new
+      subscriptions within seconds, since it reloads when the subscription count changes.
+    """
+    try:
+        data_format = _subscription_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    stream = io.TextIOWrapper(request.stream, encoding="utf-8")
+    if data_format == "csv":
+        records = csv.DictReader(stream)
+    else:
+        records = (json.loads(line) for line in stream if line.strip())
+
+    totals = {"rows": 0, "skipped": 0, "users_created": 0, "subscriptions_created": 0}
+    try:
+        chunk = []
+        for record in records:
+            totals["rows"] += 1
+            phone_number = str(record.get("phone_number") or "").strip()
+            if not phone_number:
+                totals["skipped"] += 1
+                continue
+            chunk.append({
+                "phone_number": phone_number,
+                "name": record.get("name"),
+                "category": str(record.get("category") or "").strip().lower()
+            })
+
+            if len(chunk) >= SUBSCRIPTION_CHUNK_SIZE:
+                _import_subscription_chunk(chunk, totals)
+                chunk = []
+
+        if chunk:
+            _import_subscription_chunk(chunk, totals)
+
+        return jsonify(dict(totals, message="Subscriptions imported successfully")), 200
+    except Exception as e:
+        return jsonify(dict(totals, error=str(e))), 400
+
+@app.route('/subscriptions/export', methods=['GET'])
+def export_subscriptions():
+    """
+    Stream every user and subscription as CSV or NDJSON.
+    - Optionally filtered by a "category" query parameter.
+    - Users without subscriptions are exported with an empty category (unless filtering by category).
+    - Rows are read through a server-side cursor and written out as they arrive.
+    """
+    try:
+        data_format = _subscription_format()
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+
+    category = request.args.get('category')
+    query = (
+        select(Users.phone_number, Users.name, UserSubscriptions.category)
+        .outerjoin(UserSubscriptions, UserSubscriptions.phone_number == Users.phone_number)
+        .order_by(Users.phone_number, UserSubscriptions.category)
+    )
+    if category:
+        query = query.where(UserSubscriptions.category == category.lower())
+
+    def generate():
+        buffer = io.StringIO()
+        writer = csv.writer(buffer)
+        if data_format == "csv":
+            writer.writerow(["phone_number", "name", "category"])
+
+        with engine.connect().execution_options(stream_results=True, yield_per=SUBSCRIPTION_CHUNK_SIZE) as connection:
+            for partition in connection.execute(query).partitions():
+                for phone_number, name, row_category in partition:
+                    if data_format == "csv":
+                        writer.writerow([phone_number, name or "", row_category or ""])
+                    else:
+                        buffer.write(json.dumps({"phone_number": phone_number, "name": name, "category": row_category}) + "\n")
+                yield buffer.getvalue()
+                buffer.seek(0)
+                buffer.truncate()
+            yield buffer.getvalue()
+
+    mimetype = "text/csv" if data_format == "csv" else "application/x-ndjson"
+    return Response(
+        stream_with_context(generate()),
+        mimetype=mimetype,
+        headers={"Content-Disposition": f"attachment; filename=subscriptions.{data_format}"}
+    )
+
 if __name__ == '__main__':
     app.run(host="0.0.0.0", port=3001)
\ No newline at end of file
@@ -9,6 +9,7 @@ from shared.database import engine, SessionLocal
 from shared.models.base import Base
 from shared.models.job import Job
 from shared.models.scrape_target import ScrapeTarget
+from whatsapp.subscriptionManager import subscription_index
 
 # Ensure app context is active for tests
 @pytest.fixture(scope='session', autouse=True)
@@ -250,3 +251,87 @@ def test_delete_scrape_target(client):
     # Verify deletion
     get_resp = client.get(f'/scrape-targets/{target_id}')
     assert get_resp.status_code == 404
+
+
+# ---------------------------
+# Tests for Subscription import/export APIs
+# ---------------------------
+
+def test_import_subscriptions_csv(client):
+    """Test bulk-importing users and subscriptions from CSV."""
+    body = (
+        "phone_number,name,category\n"
+        "96170000001,Alice,sports\n"
+        "96170000001,Alice,events\n"
+        "96170000002,,sports\n"
+        ",Missing Number,sports\n"
+    )
+    response = client.post('/subscriptions/import?format=csv', data=body, content_type='text/csv')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["message"] == "Subscriptions imported successfully"
+    assert data["rows"] == 4
+    assert data["skipped"] == 1
+    assert data["users_created"] == 2
+    assert data["subscriptions_created"] == 3
+
+    # Importing the same rows again skips existing users and subscriptions
+    response = client.post('/subscriptions/import?format=csv', data=body, content_type='text/csv')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["users_created"] == 0
+    assert data["subscriptions_created"] == 0
+
+
+def test_import_subscriptions_ndjson(client):
+    """Test bulk-importing users and subscriptions from NDJSON."""
+    body = (
+        '{"phone_number": "96170000003", "category": "Sports"}\n'
+        '\n'
+        '{"phone_number": "96170000004", "name": "Bob"}\n'
+    )
+    response = client.post('/subscriptions/import', data=body, content_type='application/x-ndjson')
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["rows"] == 2
+    assert data["users_created"] == 2
+    assert data["subscriptions_created"] == 1
+
+
+def test_import_subscriptions_updates_subscription_index(client):
+    """Imported subscribers are broadcast targets without waiting for the periodic reload."""
+    subscription_index.load()
+    body = "phone_number,category\n96170000007,debates\n96170000008,debates\n"
+    response = client.post('/subscriptions/import?format=csv', data=body, content_type='text/csv')
+    assert response.status_code == 200
+    assert set(subscription_index.subscribers("debates")) == {"96170000007", "96170000008"}
+
+
+def test_export_subscriptions_ndjson(client):
+    """Test exporting the subscriptions of a category as NDJSON."""
+    client.post('/subscriptions/import?format=csv', data="phone_number,category\n96170000005,clubs\n", content_type='text/csv')
+
+    response = client.get('/subscriptions/export?format=ndjson&category=clubs')
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    rows = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    assert {"phone_number": "96170000005", "name": None, "category": "clubs"} in rows
+    assert all(row["category"] == "clubs" for row in rows)
+
+
+def test_export_subscriptions_csv(client):
+    """Test exporting all users and subscriptions as CSV."""
+    client.post('/subscriptions/import?format=csv', data="phone_number,name\n96170000006,Carol\n", content_type='text/csv')
+
+    response = client.get('/subscriptions/export?format=csv')
+    assert response.status_code == 200
+    lines = response.get_data(as_text=True).splitlines()
+    assert lines[0] == "phone_number,name,category"
+    # Users without subscriptions are exported with an empty category
+    assert "96170000006,Carol," in lines
+
+
+def test_export_subscriptions_invalid_format(client):
+    """Test that an unknown export format is rejected."""
+    response = client.get('/subscriptions/export?format=xml')
+    assert response.status_code == 400
@@ -4,6 +4,9 @@ from shared.apis.azure_blob import AzureBlobManager
 import requests
 import time
 import logging
+import threading
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -25,11 +28,21 @@ class InstagramAPI:
         self.access_token = short_lived_token
         self.instagram_user_id = instagram_user_id
         self.azure_blob_manager = azure_blob_manager
+        # Publishing quota: the limit reported by Instagram (cached) and a rolling local window of publishes
+        self.publishing_limit_ttl = 300
+        self.quota_duration = 24 * 3600
+        self._publishing_limit = None
+        self._publishing_limit_fetched_at = 0
+        self._published_at = deque()
+        self._quota_lock = threading.Lock()
 
     def refresh_access_token(self):
         """
         Refreshes the Instagram access token.
         Raises an exception if the request fails.
+
+        Returns:
+            int | None: Lifetime of the new token in seconds, if the Graph API reports it.
         """
         url = "https://graph.facebook.com/v20.0/oauth/access_token"
         params = {
@@ -49,6 +62,7 @@ class InstagramAPI:
 
             self.access_token = new_access_token
             logging.info("Access token refreshed successfully.")
+            return response.json().get('expires_in')
 
         except requests.exceptions.RequestException as e:
             logging.error(f"Network error while refreshing access token: {e}")
@@ -60,6 +74,131 @@ class InstagramAPI:
             logging.error(f"Unexpected error while refreshing token: {e}")
             raise
 
+    def get_container_status(self, container_id):
+        """
+        Returns the processing status of a media container without waiting.
+
+        Args:
+            container_id (str): ID of the media container.
+
+        Returns:
+            str: The container's status_code (IN_PROGRESS, FINISHED, ERROR, EXPIRED or PUBLISHED).
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails.
+        """
+        status_url = f"https://graph.facebook.com/v20.0/{container_id}"
+        params = {"fields": "status_code", "access_token": self.access_token}
+        response = requests.get(status_url, params=params, timeout=10)
+        response.raise_for_status()
+        return response.json().get("status_code")
+
+    def wait_for_container(self, container_id, timeout=300, initial_interval=0.5, max_interval=10):
+        """
+        Polls a media container until Instagram finishes processing it.
+
+        The polling interval starts below a second and doubles up to `max_interval`,
+        so small images are published as soon as they are ready.
+
+        Args:
+            container_id (str): ID of the media container.
+            timeout (float): Overall deadline in seconds.
+            initial_interval (float): Seconds before the second check.
+            max_interval (float): Upper bound of the polling interval in seconds.
+
+        Raises:
+            Exception: If processing fails or the container expires.
+            TimeoutError: If the container is not ready before the deadline.
+        """
+        deadline = time.monotonic() + timeout
+        interval = initial_interval
+        while True:
+            status = self.get_container_status(container_id)
+            if status == "FINISHED":
+                logging.info(f"Media container {container_id} is ready.")
+                return
+            if status in ("ERROR", "EXPIRED"):
+                raise Exception(f"Media container {container_id} processing failed with status {status}")
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                raise TimeoutError(f"Media container {container_id} not ready after {timeout} seconds (status {status})")
+            time.sleep(min(interval, remaining))
+            interval = min(interval * 2, max_interval)
+
+    def get_publishing_limit(self, force=False):
+        """
+        Returns the content publishing limit reported by Instagram, cached for `publishing_limit_ttl` seconds.
+
+        Args:
+            force (bool): Bypass the cache.
+
+        Returns:
+            dict: quota_total, quota_usage and quota_duration (seconds) as reported by Instagram.
+
+        Raises:
+            requests.exceptions.RequestException: If the request fails.
+        """
+        with self._quota_lock:
+            if not force and self._publishing_limit and time.time() - self._publishing_limit_fetched_at < self.publishing_limit_ttl:
+                return dict(self._publishing_limit)
+
+        url = f"https://graph.facebook.com/v20.0/{self.instagram_user_id}/content_publishing_limit"
+        params = {"fields": "config,quota_usage", "access_token": self.access_token}
+        response = requests.get(url, params=params, timeout=10)
+        response.raise_for_status()
+
+        data = (response.json().get("data") or [{}])[0]
+        config = data.get("config") or {}
+        limit = {
+            "quota_total": config.get("quota_total", 50),
+            "quota_usage": data.get("quota_usage", 0),
+            "quota_duration": config.get("quota_duration", 24 * 3600)
+        }
+        with self._quota_lock:
+            self._publishing_limit = limit
+            self._publishing_limit_fetched_at = time.time()
+            self.quota_duration = limit["quota_duration"]
+        return dict(limit)
+
+    def remaining_publishes(self):
+        """
+        Estimates how many posts can still be published in the current window.
+
+        Combines the cached usage reported by Instagram (plus the posts published since it
+        was fetched) with the local rolling window, and keeps the more conservative value.
+        Falls back to the local window alone when Instagram cannot be queried.
+
+        Returns:
+            dict: quota_total, quota_usage and remaining.
+        """
+        try:
+            limit = self.get_publishing_limit()
+        except Exception as e:
+            logging.warning(f"Could not fetch the content publishing limit: {e}")
+            limit = self._publishing_limit or {"quota_total": 50, "quota_usage": 0}
+
+        with self._quota_lock:
+            self._expire_publishes()
+            published_since_fetch = sum(1 for published_at in self._published_at if published_at > self._publishing_limit_fetched_at)
+            usage = max(limit["quota_usage"] + published_since_fetch, len(self._published_at))
+        return {
+            "quota_total": limit["quota_total"],
+            "quota_usage": usage,
+            "remaining": max(limit["quota_total"] - usage, 0)
+        }
+
+    def record_publish(self):
+        """Records a published post in the local rolling window."""
+        with self._quota_lock:
+            self._published_at.append(time.time())
+            self._expire_publishes()
+
+    def _expire_publishes(self):
+        cutoff = time.time() - self.quota_duration
+        while self._published_at and self._published_at[0] <= cutoff:
+            self._published_at.popleft()
+
     def upload_and_publish_pic(self, blob_url, caption):
         """
         Uploads an image to Instagram and publishes it.
@@ -103,7 +242,7 @@ class InstagramAPI:
 
         # Wait for media processing
         logging.info("Waiting for media processing...")
-        time.sleep(10)
+        self.wait_for_container(media_object_id, timeout=120)
 
         # Step 2: Publish the media
         publish_url = f"https://graph.facebook.com/v20.0/{self.instagram_user_id}/media_publish"
@@ -115,6 +254,7 @@ class InstagramAPI:
         try:
             publish_response = requests.post(publish_url, params=publish_params, timeout=10)
             publish_response.raise_for_status()
+            self.record_publish()
 
             logging.info("Media successfully published!")
 
@@ -125,16 +265,20 @@ class InstagramAPI:
             logging.error(f"Unexpected error while publishing media: {e}")
             raise
 
-    def upload_and_publish_video(self, blob_url, caption="Automated video post via Instagram API"):
+    def create_video_container(self, blob_url, caption):
         """
-        Uploads a video to Instagram using the provided blob URL.
-        
-        :param blob_url: Public URL of the video stored in Azure Blob Storage.
-        :param caption: Caption for the Instagram post.
-        """
-        print(f"Uploading video from Azure Blob: {blob_url}")
+        Creates a Reels media container for a video. Instagram processes it asynchronously.
 
-        # Step 1: Create the video media object on Instagram
+        Args:
+            blob_url (str): Public URL of the video stored in Azure Blob Storage.
+            caption (str): Caption for the Instagram post.
+
+        Returns:
+            str: ID of the media container.
+
+        Raises:
+            Exception: If the container could not be created.
+        """
         url = f"https://graph.facebook.com/v20.0/{self.instagram_user_id}/media"
         params = {
             "video_url": blob_url,
@@ -142,45 +286,147 @@ class InstagramAPI:
             "media_type": "REELS",
             "access_token": self.access_token
         }
-        response = requests.post(url, params=params)
+        response = requests.post(url, params=params, timeout=30)
+        if response.status_code != 200 or not response.json().get('id'):
+            raise Exception(f"Error creating video media object: {response.status_code}, {response.text}")
 
-        if response.status_code == 200:
-            media_object_id = response.json().get('id')
-            print(f"Video media object created with ID: {media_object_id}")
-        else:
-            print(f"Error creating video media object: {response.status_code}, {response.text}")
-            return
+        media_object_id = response.json().get('id')
+        logging.info(f"Video media object created with ID: {media_object_id}")
+        return media_object_id
 
-        # Step 2: Check the status of the video upload
-        print("Waiting for video processing...")
-        while True:
-            status_url = f"https://graph.facebook.com/v20.0/{media_object_id}?fields=status_code"
-            status_params = {"access_token": self.access_token}
-            status_response = requests.get(status_url, params=status_params)
-
-            if status_response.status_code == 200:
-                status = status_response.json().get("status_code")
-                if status == "FINISHED":
-                    print("Video processing complete!")
-                    break
-                else:
-                    print("Video is still processing... Checking again in 10 seconds.")
-                    time.sleep(10)
-            else:
-                print(f"Error checking video status: {status_response.status_code}, {status_response.text}")
-                return
+    def publish_container(self, container_id):
+        """
+        Publishes a media container that has finished processing.
 
-        # Step 3: Publish the video
+        Args:
+            container_id (str): ID of the media container.
+
+        Returns:
+            str: ID of the published media.
+
+        Raises:
+            Exception: If publishing fails.
+        """
         publish_url = f"https://graph.facebook.com/v20.0/{self.instagram_user_id}/media_publish"
         publish_params = {
-            "creation_id": media_object_id,
+            "creation_id": container_id,
+            "access_token": self.access_token
+        }
+        publish_response = requests.post(publish_url, params=publish_params, timeout=30)
+        if publish_response.status_code != 200:
+            raise Exception(f"Error publishing media: {publish_response.status_code}, {publish_response.text}")
+
+        self.record_publish()
+        logging.info(f"Media container {container_id} successfully published!")
+        return publish_response.json().get('id')
+
+    def create_carousel_item(self, blob_url):
+        """
+        Creates the media container of one image of a carousel.
+
+        Args:
+            blob_url (str): Public URL of the image stored in Azure Blob Storage.
+
+        Returns:
+            str: ID of the child container.
+
+        Raises:
+            Exception: If the container could not be created.
+        """
+        url = f"https://graph.facebook.com/v20.0/{self.instagram_user_id}/media"
+        params = {
+            "image_url": blob_url,
+            "is_carousel_item": "true",
             "access_token": self.access_token
         }
-        publish_response = requests.post(publish_url, params=publish_params)
+        response = requests.post(url, params=params, timeout=30)
+        if response.status_code != 200 or not response.json().get('id'):
+            raise Exception(f"Error creating carousel item: {response.status_code}, {response.text}")
+        return response.json().get('id')
 
-        if publish_response.status_code == 200:
-            print("Video successfully published!")
-        else:
-            print(f"Error publishing video: {publish_response.status_code}, {publish_response.text}")
+    @staticmethod
+    def merge_captions(captions, max_length=2200):
+        """
+        Combines the captions of the images of a carousel into one post caption.
+
+        Distinct captions are kept in order, separated by blank lines. Captions that would
+        push the result past Instagram's caption limit are left out.
+
+        Args:
+            captions (iterable[str]): Captions of the images, in carousel order.
+            max_length (int): Maximum caption length accepted by Instagram.
 
+        Returns:
+            str: The merged caption.
+        """
+        merged = []
+        length = 0
+        for caption in dict.fromkeys(caption.strip() for caption in captions if caption and caption.strip()):
+            added = len(caption) + (2 if merged else 0)
+            if length + added > max_length:
+                continue
+            merged.append(caption)
+            length += added
+        return "\n\n".join(merged)
+
+    def upload_and_publish_carousel(self, blob_urls, caption):
+        """
+        Publishes several images as one carousel post.
 
+        The child containers are created and awaited concurrently, then a single
+        carousel container is created and published, which counts as one post
+        against the publishing limit.
+
+        Args:
+            blob_urls (list[str]): Public URLs of the images (2 to 10).
+            caption (str): Caption for the Instagram post.
+
+        Returns:
+            str: ID of the published media.
+
+        Raises:
+            Exception: If any step fails.
+        """
+        if not 2 <= len(blob_urls) <= 10:
+            raise ValueError("A carousel needs between 2 and 10 images")
+
+        logging.info(f"Uploading a carousel of {len(blob_urls)} images")
+        with ThreadPoolExecutor(max_workers=len(blob_urls)) as executor:
+            children = list(executor.map(self.create_carousel_item, blob_urls))
+            list(executor.map(lambda child_id: self.wait_for_container(child_id, timeout=120), children))
+
+        url = f"https://graph.facebook.com/v20.0/{self.instagram_user_id}/media"
+        params = {
+            "media_type": "CAROUSEL",
+            "children": ",".join(children),
+            "caption": caption,
+            "access_token": self.access_token
+        }
+        response = requests.post(url, params=params, timeout=30)
+        if response.status_code != 200 or not response.json().get('id'):
+            raise Exception(f"Error creating carousel container: {response.status_code}, {response.text}")
+
+        carousel_id = response.json().get('id')
+        logging.info(f"Carousel container created with ID: {carousel_id}")
+        self.wait_for_container(carousel_id, timeout=120)
+        return self.publish_container(carousel_id)
+
+    def upload_and_publish_video(self, blob_url, caption="Automated video post via Instagram API"):
+        """
+        Uploads a video to Instagram using the provided blob URL, waiting for it to be processed.
+        
+        :param blob_url: Public URL of the video stored in Azure Blob Storage.
+        :param caption: Caption for the Instagram post.
+        """
+        print(f"Uploading video from Azure Blob: {blob_url}")
+
+        # Step 1: Create the video media object on Instagram
+        media_object_id = self.create_video_container(blob_url, caption)
+
+        # Step 2: Wait for the video to be processed
+        print("Waiting for video processing...")
+        self.wait_for_container(media_object_id, timeout=900)
+        print("Video processing complete!")
+
+        # Step 3: Publish the video
+        self.publish_container(media_object_id)
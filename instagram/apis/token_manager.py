@@ -0,0 +1,106 @@
+import datetime
+import threading
+import time
+import logging
+
+# Long-lived tokens last about 60 days; assumed when the Graph API does not report a lifetime
+DEFAULT_TOKEN_LIFETIME = 60 * 24 * 3600
+
+
+class TokenManager:
+    """
+    Keeps the Instagram access token valid without refreshing it on every post.
+
+    The token and its expiry are stored in Azure Key Vault so every replica uses the
+    same token. A background thread picks up tokens refreshed by other replicas and
+    exchanges the token shortly before it expires; posting only calls `ensure_fresh`,
+    which does not reach the network while the token is valid.
+    """
+
+    def __init__(self, instagram_api, key_vault, secret_name="INSTAGRAM-ACCESS-TOKEN",
+                 refresh_margin=7 * 24 * 3600, check_interval=3600):
+        """
+        Args:
+            instagram_api (InstagramAPI): Client whose access token is managed.
+            key_vault (AzureKeyVault): Vault the token is persisted to.
+            secret_name (str): Name of the secret holding the token.
+            refresh_margin (int): Seconds before expiry at which the token is refreshed.
+            check_interval (int): Seconds between two background checks.
+        """
+        self.instagram_api = instagram_api
+        self.key_vault = key_vault
+        self.secret_name = secret_name
+        self.refresh_margin = refresh_margin
+        self.check_interval = check_interval
+        self.expires_at = None  # Unix time, None when unknown
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+
+    def load(self):
+        """
+        Loads the current token and its expiry from the vault.
+        """
+        token, expires_on = self.key_vault.get_secret_with_expiry(self.secret_name)
+        with self._lock:
+            if token and token != self.instagram_api.access_token:
+                logging.info("Loaded Instagram access token from the vault")
+                self.instagram_api.access_token = token
+            self.expires_at = expires_on.timestamp() if expires_on else None
+
+    def ensure_fresh(self):
+        """
+        Makes sure the token is usable before a post. Refreshes it synchronously only if
+        it already expired (e.g. the background thread could not refresh it in time).
+        """
+        if self.expires_at is None or self.expires_at <= time.time():
+            self.refresh()
+
+    def needs_refresh(self):
+        """
+        Returns:
+            bool: Whether the token expires within the refresh margin (or its expiry is unknown).
+        """
+        return self.expires_at is None or self.expires_at - time.time() <= self.refresh_margin
+
+    def refresh(self):
+        """
+        Exchanges the token for a new one and persists it to the vault.
+        """
+        with self._lock:
+            # Another thread may have refreshed it while we waited for the lock
+            if self.expires_at is not None and self.expires_at - time.time() > self.refresh_margin:
+                return
+
+            expires_in = self.instagram_api.refresh_access_token() or DEFAULT_TOKEN_LIFETIME
+            self.expires_at = time.time() + int(expires_in)
+            expires_on = datetime.datetime.fromtimestamp(self.expires_at, tz=datetime.timezone.utc)
+            try:
+                self.key_vault.set_secret(self.secret_name, self.instagram_api.access_token, expires_on=expires_on)
+            except Exception as e:
+                logging.error("Error while persisting the Instagram access token: %s", e)
+            logging.info("Instagram access token valid until %s", expires_on.isoformat())
+
+    def start(self):
+        """Loads the token and starts the background refresh thread."""
+        try:
+            self.load()
+        except Exception as e:
+            logging.error("Error while loading the Instagram access token: %s", e)
+        threading.Thread(target=self._run, name="instagram-token", daemon=True).start()
+
+    def stop(self):
+        """Stops the background refresh thread."""
+        self._stop.set()
+
+    def _run(self):
+        while True:
+            try:
+                if self.needs_refresh():
+                    # Another replica may already have refreshed the token
+                    self.load()
+                    if self.needs_refresh():
+                        self.refresh()
+            except Exception as e:
+                logging.error("Error while refreshing the Instagram access token: %s", e)
+            if self._stop.wait(self.check_interval):
+                return
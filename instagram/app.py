@@ -6,6 +6,7 @@ from shared.models.base import Base
 from shared.apis.azure_key_vault import AzureKeyVault
 from shared.apis.azure_blob import AzureBlobManager
 from apis.instagram_api import InstagramAPI
+from apis.token_manager import TokenManager
 from shared.models.job import Job
 from shared.database import engine, SessionLocal
 from sqlalchemy.sql import text
@@ -25,12 +26,23 @@ AZURE_STORAGE_CONNECTION_STRING =key_vault.get_secret("posting-connection-key")
 # Initialize NovitaAI and ChatGPT API instances
 azureBlob = AzureBlobManager(AZURE_STORAGE_CONNECTION_STRING)
 instagram_api = InstagramAPI(APP_ID, APP_SECRET, ACCESS_TOKEN, INSTAGRAM_USER_ID, azureBlob)
+# Refreshes the access token in the background and shares it through the vault
+token_manager = TokenManager(instagram_api, key_vault)
+token_manager.start()
 
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 # Create tables if not created
 Base.metadata.create_all(bind=engine)
 
+@app.route("/publishing-quota", methods=["GET"])
+def publishing_quota_route():
+    """
+    Route returning the Instagram content publishing quota: the limit, the usage in the
+    current window and the number of posts that can still be published.
+    """
+    return jsonify(instagram_api.remaining_publishes()), 200
+
 @app.route("/post-image/<int:job_id>", methods=["POST"])
 def post_image_route(job_id):
     """
@@ -55,6 +67,10 @@ def post_image_route(job_id):
         if job.task_name.lower() != "post image instagram" or job.status != 1:
             raise Exception("Job is not valid for posting an image")
 
+        # Defer the post while the publishing quota is used up; the scheduler retries it later
+        if instagram_api.remaining_publishes()["remaining"] <= 0:
+            return jsonify({"error": "Instagram publishing quota exhausted"}), 429
+
         asset_id = job.task_id
         asset = db_session.query(MediaAsset).filter_by(id=asset_id).first()
         if not asset:
@@ -63,7 +79,7 @@ def post_image_route(job_id):
         if not asset.media_blob_url or not asset.caption:
             raise Exception("No URL or Caption for this asset")
 
-        instagram_api.refresh_access_token()
+        token_manager.ensure_fresh()
 
         # Call the Instagram API to upload and publish the picture
         instagram_api.upload_and_publish_pic(asset.media_blob_url, caption=asset.caption)
@@ -73,7 +89,7 @@ def post_image_route(job_id):
         job.updated_at = datetime.datetime.now().date()
         db_session.commit()
 
-        return jsonify({"message": "Image posted successfully", "job_id": job.id}), 200
+        return jsonify({"message": "Image posted successfully", "job_id": job.id, "published": True}), 200
 
     except Exception as e:
         db_session.rollback()
@@ -84,11 +100,11 @@ def post_image_route(job_id):
 @app.route("/post-video/<int:job_id>", methods=["POST"])
 def post_video_instagram(job_id):
     """
-    Route to post a video to Instagram.
-    - Expects a JSON payload with an optional "caption".
+    Route to start posting a video to Instagram.
     - Queries the job with the given job_id and verifies that its task_name is "post video instagram" and its status is 1.
     - Retrieves the media asset using the job's task_id.
-    - Calls the Instagram API to post the video.
+    - Creates the Reels media container; Instagram then processes the video asynchronously.
+    - Creates a "publish video instagram" job that publishes the container once it is ready.
     - Updates the job's status to 2 and commits the changes.
     In case of an error, updates the job status to -1 and records the error message.
     """
@@ -112,26 +128,187 @@ def post_video_instagram(job_id):
         if not asset.media_blob_url or not asset.caption:
             raise Exception("No URL or Caption for this asset")
 
-        # Refresh the Instagram access token before posting
-        instagram_api.refresh_access_token()
+        # Make sure the Instagram access token is still valid before posting
+        token_manager.ensure_fresh()
+
+        # Create the media container; the video is processed by Instagram in the background
+        container_id = instagram_api.create_video_container(asset.media_blob_url, caption=asset.caption)
+
+        # Create a job to publish the container once processing is finished
+        publish_job = Job(
+            task_name="publish video instagram",
+            task_id=container_id,  # Store the Instagram container ID
+            scheduled_date=datetime.datetime.now(),
+            status=0,  # Pending
+            error_message=f"asset_id:{asset.id}",  # Store the asset ID (temporary storage)
+            created_at=datetime.datetime.now(),
+            updated_at=datetime.datetime.now()
+        )
+        db_session.add(publish_job)
 
-        # Call the Instagram API to upload and publish the video
-        instagram_api.upload_and_publish_video(asset.media_blob_url, caption=asset.caption)
-        
         # Update the job status to indicate it has been processed (status 2)
         job.status = 2
         job.updated_at = datetime.datetime.now().date()
         db_session.commit()
 
-        return jsonify({"message": "Video posted successfully to Instagram", "job_id": job.id}), 200
+        return jsonify({
+            "message": "Video container created on Instagram",
+            "job_id": job.id,
+            "container_id": container_id,
+            "publish_job_id": publish_job.id
+        }), 200
 
     except Exception as e:
         # If there was an error, update the job status to indicate failure
+        db_session.rollback()
         if job:
             job.status = -1  # Error status
             job.error_message = str(e)[:255]  # Limit error message to field size
             db_session.commit()
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db_session.close()
+
+@app.route("/publish-video/<int:job_id>", methods=["POST"])
+def publish_video_instagram(job_id):
+    """
+    Route to publish a video container once Instagram has processed it.
+    - Queries the job with the given job_id and verifies that its task_name is "publish video instagram" and its status is 1.
+    - Checks the container status once, without waiting.
+    - If the container is ready, publishes it and updates the job's status to 2.
+    - If it is still processing, returns the job to pending (status 0) so the scheduler checks it again.
+    The response's "published" field tells the scheduler whether the call used up publishing quota.
+    In case of an error, updates the job status to -1 and records the error message.
+    """
+    db_session = SessionLocal()
+    job = None
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception("Job not found")
+
+        if job.task_name.lower() != "publish video instagram" or job.status != 1:
+            raise Exception("Job is not valid for publishing a video")
+
+        container_id = job.task_id
+        asset_id = None
+        if job.error_message and "asset_id:" in job.error_message:
+            asset_id = int(job.error_message.split("asset_id:")[1])
+
+        # Check the container status - just a single check, not waiting
+        status = instagram_api.get_container_status(container_id)
+
+        if status == "FINISHED":
+            # Defer the post while the publishing quota is used up; the scheduler retries it later
+            if instagram_api.remaining_publishes()["remaining"] <= 0:
+                job.status = 0
+                db_session.commit()
+                return jsonify({"error": "Instagram publishing quota exhausted"}), 429
+
+            token_manager.ensure_fresh()
+            media_id = instagram_api.publish_container(container_id)
+
+            job.status = 2
+            job.updated_at = datetime.datetime.now()
+            db_session.commit()
+            return jsonify({
+                "message": "Video posted successfully to Instagram",
+                "job_id": job.id,
+                "published": True,
+                "media_asset_id": asset_id,
+                "instagram_media_id": media_id
+            }), 200
+        elif status in ("ERROR", "EXPIRED"):
+            raise Exception(f"Video container processing failed with status {status}")
+        else:
+            job.status = 0
+            job.updated_at = datetime.datetime.now()
+            db_session.commit()
+            return jsonify({
+                "message": "Video is still processing",
+                "published": False,
+                "state": status,
+                "media_asset_id": asset_id
+            }), 200
+
+    except Exception as e:
+        db_session.rollback()
+        if job:
+            job.status = -1  # Error status
+            job.error_message = str(e)[:255]  # Limit error message to field size
+            db_session.commit()
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db_session.close()
+
+@app.route("/post-carousel/<int:job_id>", methods=["POST"])
+def post_carousel_instagram(job_id):
+    """
+    Route to post several image assets as one Instagram carousel.
+    - Queries the job with the given job_id and verifies that its task_name is "post carousel instagram" and its status is 1.
+    - Retrieves the "post image instagram" jobs grouped into this carousel by the scheduler
+      (held at status 1, with error_message "carousel:<job_id>") and their assets.
+    - Calls the Instagram API to post the carousel, with the captions of all assets merged into one.
+    - Updates the status of the carousel job and of the grouped jobs to 2.
+    In case of an error, updates the carousel job and the grouped jobs to -1 and records the error message.
+    """
+    db_session = SessionLocal()
+    job = None
+    children = []
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception("Job not found")
+
+        if job.task_name.lower() != "post carousel instagram" or job.status != 1:
+            raise Exception("Job is not valid for posting a carousel")
+
+        # Defer the post while the publishing quota is used up; the scheduler retries it later
+        if instagram_api.remaining_publishes()["remaining"] <= 0:
+            return jsonify({"error": "Instagram publishing quota exhausted"}), 429
+
+        children = (
+            db_session.query(Job)
+            .filter(Job.error_message == f"carousel:{job.id}", Job.status == 1)
+            .order_by(Job.id)
+            .all()
+        )
+        assets_by_id = {
+            str(asset.id): asset
+            for asset in db_session.query(MediaAsset).filter(MediaAsset.id.in_([child.task_id for child in children]))
+        }
+        assets = [assets_by_id[child.task_id] for child in children if child.task_id in assets_by_id]
+        if len(assets) < 2:
+            raise Exception("Not enough assets found for this carousel")
+
+        token_manager.ensure_fresh()
+
+        # Call the Instagram API to upload and publish the carousel
+        media_id = instagram_api.upload_and_publish_carousel(
+            [asset.media_blob_url for asset in assets],
+            caption=instagram_api.merge_captions(asset.caption for asset in assets)
+        )
+
+        for posted_job in [job] + children:
+            posted_job.status = 2
+            posted_job.updated_at = datetime.datetime.now().date()
+        db_session.commit()
+
+        return jsonify({
+            "message": "Carousel posted successfully",
+            "job_id": job.id,
+            "published": True,
+            "media_asset_ids": [asset.id for asset in assets],
+            "instagram_media_id": media_id
+        }), 200
+
+    except Exception as e:
         db_session.rollback()
+        if job:
+            for failed_job in [job] + children:
+                failed_job.status = -1  # Error status
+                failed_job.error_message = str(e)[:255]  # Limit error message to field size
+            db_session.commit()
         return jsonify({"error": str(e)}), 400
     finally:
         db_session.close()
@@ -0,0 +1,99 @@
+import os, sys
+import pytest
+
+pytest.importorskip("requests")
+pytest.importorskip("azure.storage.blob")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import instagram.apis.instagram_api as instagram_api_module
+from instagram.apis.instagram_api import InstagramAPI
+
+
+@pytest.fixture
+def api():
+    return InstagramAPI("app-id", "app-secret", "token", "user-id", azure_blob_manager=None)
+
+@pytest.fixture
+def sleeps(monkeypatch):
+    """
+    Records the polling intervals instead of sleeping.
+    """
+    recorded = []
+    monkeypatch.setattr(instagram_api_module.time, "sleep", recorded.append)
+    return recorded
+
+def container_statuses(monkeypatch, api, statuses):
+    statuses = iter(statuses)
+    monkeypatch.setattr(api, "get_container_status", lambda container_id: next(statuses))
+
+# ---------------------------
+# Tests for wait_for_container
+# ---------------------------
+
+def test_ready_container_is_not_waited_for(monkeypatch, api, sleeps):
+    """A container that is already finished returns without sleeping."""
+    container_statuses(monkeypatch, api, ["FINISHED"])
+    api.wait_for_container("container-1")
+    assert sleeps == []
+
+def test_polling_interval_backs_off(monkeypatch, api, sleeps):
+    """The polling interval doubles up to max_interval."""
+    container_statuses(monkeypatch, api, ["IN_PROGRESS"] * 5 + ["FINISHED"])
+    api.wait_for_container("container-1", initial_interval=0.5, max_interval=3)
+    assert sleeps == [0.5, 1, 2, 3, 3]
+
+def test_failed_container_raises(monkeypatch, api, sleeps):
+    """A container whose processing failed raises immediately."""
+    container_statuses(monkeypatch, api, ["IN_PROGRESS", "ERROR"])
+    with pytest.raises(Exception, match="ERROR"):
+        api.wait_for_container("container-1")
+
+def test_container_not_ready_before_deadline(monkeypatch, api, sleeps):
+    """A container still processing at the deadline raises TimeoutError."""
+    container_statuses(monkeypatch, api, ["IN_PROGRESS"] * 3)
+    with pytest.raises(TimeoutError):
+        api.wait_for_container("container-1", timeout=0)
+
+# ---------------------------
+# Tests for merge_captions
+# ---------------------------
+
+def test_merge_captions_keeps_distinct_captions_in_order():
+    """Every distinct caption appears once, in carousel order."""
+    captions = ["First", "Second", "First", "", None, " Third "]
+    assert InstagramAPI.merge_captions(captions) == "First\n\nSecond\n\nThird"
+
+def test_merge_captions_respects_length_limit():
+    """Captions that would exceed the limit are left out."""
+    merged = InstagramAPI.merge_captions(["a" * 10, "b" * 10, "c" * 3], max_length=17)
+    assert merged == "a" * 10 + "\n\n" + "c" * 3
+    assert len(merged) <= 17
+
+# ---------------------------
+# Tests for the publishing quota
+# ---------------------------
+
+def test_remaining_publishes_counts_local_publishes(monkeypatch, api):
+    """Posts published since the limit was fetched are subtracted from the remaining quota."""
+    monkeypatch.setattr(api, "get_publishing_limit",
+                        lambda force=False: {"quota_total": 50, "quota_usage": 10, "quota_duration": 86400})
+    api.record_publish()
+    api.record_publish()
+    assert api.remaining_publishes() == {"quota_total": 50, "quota_usage": 12, "remaining": 38}
+
+def test_remaining_publishes_without_instagram(monkeypatch, api):
+    """The local rolling window is used when Instagram cannot be queried."""
+    def unavailable(force=False):
+        raise RuntimeError("Graph API unavailable")
+
+    monkeypatch.setattr(api, "get_publishing_limit", unavailable)
+    api.record_publish()
+    assert api.remaining_publishes()["remaining"] == 49
+
+def test_old_publishes_expire(monkeypatch, api):
+    """Publishes older than the quota window no longer count."""
+    monkeypatch.setattr(api, "get_publishing_limit",
+                        lambda force=False: {"quota_total": 50, "quota_usage": 0, "quota_duration": 86400})
+    api.quota_duration = 0
+    api.record_publish()
+    assert api.remaining_publishes()["remaining"] == 50
@@ -0,0 +1,154 @@
+import os, sys
+import datetime
+import pytest
+
+pytest.importorskip("flask")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+import instagram.app as instagram_app
+from shared.database import SessionLocal
+from shared.models.job import Job
+from shared.models.media_asset import MediaAsset
+
+
+@pytest.fixture(scope='module')
+def client():
+    """
+    Provides a test client for the Instagram service.
+    """
+    instagram_app.app.config["TESTING"] = True
+    return instagram_app.app.test_client()
+
+@pytest.fixture
+def db_session():
+    """
+    Provides a database session; the jobs and assets it creates are removed afterwards.
+    """
+    db_session = SessionLocal()
+    created = []
+    db_session.created = created
+    yield db_session
+    db_session.rollback()
+    for row in reversed(created):
+        db_session.delete(db_session.merge(row))
+    db_session.commit()
+    db_session.close()
+
+@pytest.fixture(autouse=True)
+def instagram(monkeypatch):
+    """
+    Replaces the Instagram Graph API calls with recorded fakes.
+    """
+    calls = {"published": [], "containers": [], "carousels": []}
+    api = instagram_app.instagram_api
+    monkeypatch.setattr(instagram_app.token_manager, "ensure_fresh", lambda: None)
+    monkeypatch.setattr(api, "remaining_publishes", lambda: {"quota_total": 50, "quota_usage": 0, "remaining": 50})
+    monkeypatch.setattr(api, "publish_container", lambda container_id: calls["published"].append(container_id) or "media-1")
+    monkeypatch.setattr(api, "create_video_container",
+                        lambda blob_url, caption: calls["containers"].append((blob_url, caption)) or "container-1")
+    monkeypatch.setattr(api, "upload_and_publish_carousel",
+                        lambda blob_urls, caption: calls["carousels"].append((blob_urls, caption)) or "media-2")
+    calls["status"] = "FINISHED"
+    monkeypatch.setattr(api, "get_container_status", lambda container_id: calls["status"])
+    return calls
+
+def add_job(db_session, task_name, task_id, status=1, error_message=None):
+    now = datetime.datetime.now()
+    job = Job(task_name=task_name, task_id=str(task_id), status=status, scheduled_date=now,
+              error_message=error_message, created_at=now, updated_at=now)
+    db_session.add(job)
+    db_session.commit()
+    db_session.created.append(job)
+    return job
+
+def add_asset(db_session, caption="A caption", media_type="image"):
+    asset = MediaAsset(media_blob_url="https://example.blob.core.windows.net/media-gen/sports/images/test.png",
+                       caption=caption, media_type=media_type)
+    db_session.add(asset)
+    db_session.commit()
+    db_session.created.insert(0, asset)
+    return asset
+
+def job_status(db_session, job_id):
+    db_session.expire_all()
+    return db_session.get(Job, job_id).status
+
+# ---------------------------
+# Tests for video create/publish jobs
+# ---------------------------
+
+def test_post_video_creates_publish_job(client, db_session, instagram):
+    """Posting a video creates its container and a pending publish job, without waiting for processing."""
+    asset = add_asset(db_session, media_type="video")
+    job = add_job(db_session, "post video instagram", asset.id)
+
+    response = client.post(f"/post-video/{job.id}")
+    data = response.get_json()
+    assert response.status_code == 200
+    assert data["container_id"] == "container-1"
+    assert job_status(db_session, job.id) == 2
+
+    publish_job = db_session.get(Job, data["publish_job_id"])
+    db_session.created.append(publish_job)
+    assert publish_job.task_name == "publish video instagram"
+    assert publish_job.task_id == "container-1"
+    assert publish_job.status == 0
+
+def test_publish_video_still_processing(client, db_session, instagram):
+    """A container still processing returns the publish job to pending."""
+    instagram["status"] = "IN_PROGRESS"
+    job = add_job(db_session, "publish video instagram", "container-1", error_message="asset_id:1")
+
+    response = client.post(f"/publish-video/{job.id}")
+    assert response.status_code == 200
+    assert job_status(db_session, job.id) == 0
+    assert instagram["published"] == []
+
+def test_publish_video_when_ready(client, db_session, instagram):
+    """A processed container is published and the job completed."""
+    job = add_job(db_session, "publish video instagram", "container-1", error_message="asset_id:1")
+
+    response = client.post(f"/publish-video/{job.id}")
+    assert response.status_code == 200
+    assert response.get_json()["instagram_media_id"] == "media-1"
+    assert job_status(db_session, job.id) == 2
+    assert instagram["published"] == ["container-1"]
+
+def test_publish_video_failed_container(client, db_session, instagram):
+    """A container whose processing failed fails the job."""
+    instagram["status"] = "ERROR"
+    job = add_job(db_session, "publish video instagram", "container-1", error_message="asset_id:1")
+
+    response = client.post(f"/publish-video/{job.id}")
+    assert response.status_code == 400
+    assert job_status(db_session, job.id) == -1
+
+# ---------------------------
+# Tests for carousel posts
+# ---------------------------
+
+def test_carousel_posts_merged_captions(client, db_session, instagram):
+    """A carousel is posted with the captions of all its images and completes the grouped jobs."""
+    carousel = add_job(db_session, "post carousel instagram", "sports")
+    assets = [add_asset(db_session, caption=caption) for caption in ("Goal!", "Full time")]
+    children = [add_job(db_session, "post image instagram", asset.id, error_message=f"carousel:{carousel.id}")
+                for asset in assets]
+
+    response = client.post(f"/post-carousel/{carousel.id}")
+    assert response.status_code == 200
+    blob_urls, caption = instagram["carousels"][0]
+    assert len(blob_urls) == 2
+    assert caption == "Goal!\n\nFull time"
+    assert [job_status(db_session, job.id) for job in [carousel] + children] == [2, 2, 2]
+
+def test_publish_reports_whether_it_published(client, db_session, instagram):
+    """The scheduler is told whether a publish call used up quota."""
+    instagram["status"] = "IN_PROGRESS"
+    job = add_job(db_session, "publish video instagram", "container-1", error_message="asset_id:1")
+    assert client.post(f"/publish-video/{job.id}").get_json()["published"] is False
+
+    instagram["status"] = "FINISHED"
+    db_session.get(Job, job.id).status = 1
+    db_session.commit()
+    assert client.post(f"/publish-video/{job.id}").get_json()["published"] is True
@@ -0,0 +1,94 @@
+import os, sys
+import datetime
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from instagram.apis.token_manager import TokenManager
+
+
+class FakeInstagramAPI:
+    def __init__(self, expires_in=3600):
+        self.access_token = "old-token"
+        self.expires_in = expires_in
+        self.refreshes = 0
+
+    def refresh_access_token(self):
+        self.refreshes += 1
+        self.access_token = f"token-{self.refreshes}"
+        return self.expires_in
+
+
+class FakeKeyVault:
+    def __init__(self, token=None, expires_on=None):
+        self.token = token
+        self.expires_on = expires_on
+        self.writes = 0
+
+    def get_secret_with_expiry(self, name):
+        return self.token, self.expires_on
+
+    def set_secret(self, name, value, expires_on=None):
+        self.writes += 1
+        self.token, self.expires_on = value, expires_on
+
+
+def in_seconds(seconds):
+    return datetime.datetime.fromtimestamp(time.time() + seconds, tz=datetime.timezone.utc)
+
+
+# ---------------------------
+# TokenManager Tests
+# ---------------------------
+
+def test_load_takes_token_from_vault():
+    """The token and its expiry are read from the vault."""
+    api = FakeInstagramAPI()
+    manager = TokenManager(api, FakeKeyVault("vault-token", in_seconds(30 * 24 * 3600)))
+    manager.load()
+    assert api.access_token == "vault-token"
+    assert not manager.needs_refresh()
+
+def test_ensure_fresh_does_not_refresh_valid_token():
+    """A post does not reach the network while the token is valid."""
+    api = FakeInstagramAPI()
+    manager = TokenManager(api, FakeKeyVault("vault-token", in_seconds(3600)))
+    manager.load()
+    manager.ensure_fresh()
+    assert api.refreshes == 0
+
+def test_ensure_fresh_refreshes_expired_token():
+    """An expired token is refreshed synchronously and persisted."""
+    api = FakeInstagramAPI(expires_in=60 * 24 * 3600)
+    vault = FakeKeyVault("vault-token", in_seconds(-60))
+    manager = TokenManager(api, vault)
+    manager.load()
+    manager.ensure_fresh()
+    assert api.refreshes == 1
+    assert vault.token == "token-1"
+    assert vault.writes == 1
+
+def test_refresh_skipped_when_another_thread_refreshed():
+    """A token refreshed while waiting for the lock is not refreshed again."""
+    api = FakeInstagramAPI(expires_in=60 * 24 * 3600)
+    manager = TokenManager(api, FakeKeyVault())
+    manager.refresh()
+    manager.refresh()
+    assert api.refreshes == 1
+
+def test_token_expiring_within_margin_needs_refresh():
+    """The background thread refreshes tokens shortly before they expire."""
+    manager = TokenManager(FakeInstagramAPI(), FakeKeyVault("vault-token", in_seconds(3600)), refresh_margin=7200)
+    manager.load()
+    assert manager.needs_refresh()
+
+def test_vault_write_failure_keeps_new_token():
+    """A failure to persist the token does not lose the refreshed token."""
+    class FailingVault(FakeKeyVault):
+        def set_secret(self, name, value, expires_on=None):
+            raise RuntimeError("vault unavailable")
+
+    api = FakeInstagramAPI(expires_in=60 * 24 * 3600)
+    manager = TokenManager(api, FailingVault())
+    manager.refresh()
+    assert api.access_token == "token-1"
+    assert not manager.needs_refresh()
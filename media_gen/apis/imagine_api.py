@@ -1,6 +1,6 @@
 import requests
 import logging
-import os
+from shared.apis.http_client import get_http_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -15,6 +15,7 @@ class ImagineArtAI:
         """
         self.api_key = api_key
         self.base_url = "https://api.vyro.ai/v2"
+        self.http = get_http_client("imagine", read_timeout=300)
 
     def generate_image(
         self,
@@ -39,7 +40,7 @@ class ImagineArtAI:
             guidance_scale (float): Strength of adherence to the prompt (default: 7.5).
 
         Returns:
-            Tuple[str, str | None]: Status message and file path of the generated image.
+            bytes: The generated PNG image.
         """
         url = f"{self.base_url}/image/generations"
         headers = {
@@ -49,7 +50,7 @@ class ImagineArtAI:
         # Validate input values
         if not prompt or not isinstance(prompt, str):
             logging.error("Invalid prompt provided for image generation.")
-            return "Invalid prompt", None
+            raise ValueError("Invalid prompt")
 
         # Prepare payload for multipart/form-data
         print(style)
@@ -66,8 +67,8 @@ class ImagineArtAI:
         }
 
         try:
-            # Send request to the API with a timeout
-            response = requests.post(url, headers=headers, files=payload, timeout=300)
+            # Send request to the API through the pooled session
+            response = self.http.post(url, headers=headers, files=payload)
             response.raise_for_status()  # Raise an HTTPError if the response status is 4xx or 5xx
         except requests.exceptions.Timeout:
             logging.error("Request to ImagineArtAI API timed out.")
@@ -84,17 +85,6 @@ class ImagineArtAI:
             logging.error(f"API error: {response.status_code}, {response.text}")
             raise
 
-        # Define where to save the image
-        image_path = os.path.join(os.getcwd(), "generated_image.png")
-
-        try:
-            with open(image_path, "wb") as file:
-                file.write(response.content)
-            logging.info(f"Image successfully saved at {image_path}")
-            return image_path
-        except OSError as e:
-            logging.error(f"File system error while saving image: {e}")
-            raise
-        except Exception as e:
-            logging.error(f"Unexpected error while saving image: {e}")
-            raise
\ No newline at end of file
+        # Keep the image in memory: concurrent generations never share a file
+        logging.info(f"Image successfully generated ({len(response.content)} bytes)")
+        return response.content
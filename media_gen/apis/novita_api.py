@@ -3,11 +3,13 @@ import time
 import os
 from azure.identity import DefaultAzureCredential
 from azure.keyvault.secrets import SecretClient
+from shared.apis.http_client import get_http_client
 
 class NovitaAI:
     def __init__(self, api_key):
         self.api_key = api_key
         self.base_url = "https://api.novita.ai/v3"
+        self.http = get_http_client("novita", read_timeout=30)
 
     def generate_video(self, model_name, prompts, height=512, width=512, steps=20):
         """Sends a request to Novita AI API to generate a video."""
@@ -28,7 +30,7 @@ class NovitaAI:
             "closed_loop": False
         }
 
-        response = requests.post(url, headers=headers, json=payload)
+        response = self.http.post(url, headers=headers, json=payload)
 
         if response.status_code == 200:
             task_id = response.json().get("task_id")
@@ -47,7 +49,7 @@ class NovitaAI:
         start_time = time.time()
 
         while True:
-            response = requests.get(url, headers=headers, params=params)
+            response = self.http.get(url, headers=headers, params=params)
             if response.status_code == 200:
                 result = response.json()
                 print(f"API Response: {result}")  # Debugging
@@ -85,7 +87,7 @@ class NovitaAI:
     @staticmethod
     def download_video(url, save_path):
         """Downloads video from Novita AI and saves it locally."""
-        response = requests.get(url)
+        response = get_http_client("novita-download", read_timeout=120).get(url)
         if response.status_code == 200:
             with open(save_path, "wb") as file:
                 file.write(response.content)
@@ -3,6 +3,7 @@ import requests
 import logging
 import time
 import os
+from shared.apis.http_client import get_http_client
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
@@ -10,16 +11,20 @@ logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(
 class RunwayAPI:
     """Client for Runway AI video generation API."""
     
-    def __init__(self, api_key: str):
+    def __init__(self, api_key: str, base_url: str = None, callback_url: str = None):
         """
         Initialize the Runway API client.
         
         Args:
             api_key (str): Your API key for Runway API.
+            base_url (str, optional): Override of the API URL (e.g. a local stub).
+            callback_url (str, optional): URL Runway calls when a video task finishes.
         """
         self.api_key = api_key
-        self.base_url = "https://api.aivideoapi.com"
+        self.base_url = base_url or "https://api.aivideoapi.com"
+        self.callback_url = callback_url
         self.headers = {"Authorization": f"Bearer {self.api_key}"}
+        self.http = get_http_client("runway", read_timeout=30)
     
     def generate_video(self, prompt: str, model: str = "gen3", 
                        height: int = 768, width: int = 1280, 
@@ -38,9 +43,11 @@ class RunwayAPI:
             "seed": 0,
             "time": seconds
         }
+        if self.callback_url:
+            payload["callback_url"] = self.callback_url
         
         try:
-            response = requests.post(url, headers=self.headers, json=payload, timeout=30)
+            response = self.http.post(url, headers=self.headers, json=payload)
             response.raise_for_status()
             data = response.json()
             
@@ -73,7 +80,7 @@ class RunwayAPI:
         params = {"uuid": uuid}
         
         try:
-            response = requests.get(url, headers=self.headers, params=params, timeout=30)
+            response = self.http.get(url, headers=self.headers, params=params)
             response.raise_for_status()
             data = response.json()
             
@@ -14,36 +14,188 @@ from sqlalchemy.sql import text
 from media_gen.apis.imagine_api import ImagineArtAI
 from shared.models.media_asset import MediaAsset
 from media_gen.apis.runway_api import RunwayAPI 
+from media_gen.pipeline import StagePipeline
+from media_gen.job_runner import BackgroundJobRunner
+from media_gen.runway_monitor import RunwayMonitor
+from media_gen.meme_renderer import MemeRenderer
 from shared.apis.chatgpt_api import ChatGptApi
+from shared.apis.http_client import get_http_client, http_client_stats
 from datetime import timedelta
 import datetime
 import random
 from chromadb import HttpClient
+from concurrent.futures import ThreadPoolExecutor
 import requests
 import logging
+import hmac
+import time
 
 #Set up Azure Key Vault credentials
 key_vault = AzureKeyVault()
 IMAGINE_API_KEY = key_vault.get_secret("IMAGINE-API-KEY")
 OPENAI_API_KEY = key_vault.get_secret("OPENAI-API-KEY")
 RUNWAY_API_KEY = key_vault.get_secret("AI-VIDEO-API-KEY")
-runway_api = RunwayAPI(api_key=RUNWAY_API_KEY)
+# Runway calls RUNWAY_CALLBACK_URL (this service's /runway-callback) when a video is ready, with
+# RUNWAY_CALLBACK_SECRET in the X-Callback-Token header (added by the gateway exposing the route);
+# RUNWAY_BASE_URL points the client at a local stub for testing
+RUNWAY_CALLBACK_SECRET = os.environ.get("RUNWAY_CALLBACK_SECRET", "")
+RUNWAY_CALLBACK_URL = os.environ.get("RUNWAY_CALLBACK_URL")
+runway_api = RunwayAPI(api_key=RUNWAY_API_KEY, base_url=os.environ.get("RUNWAY_BASE_URL"), callback_url=RUNWAY_CALLBACK_URL)
 AZURE_STORAGE_CONNECTION_STRING =key_vault.get_secret("posting-connection-key")
 
 # Initialize NovitaAI and ChatGPT API instances
 chatgpt_api = ChatGptApi(api_key=OPENAI_API_KEY, model="gpt-4o-mini")
 azureBlob = AzureBlobManager(AZURE_STORAGE_CONNECTION_STRING)
+# Renders memes on templates stored under meme-templates/<roast_level>/ (uploaded with seed_meme_templates.py)
+meme_renderer = MemeRenderer(azureBlob)
 # Initialize the vector database client and get the collection
 vector_client = HttpClient(host='20.203.61.164', port=8000)
 collection = vector_client.get_collection(name="aub_embeddings")
 
+# Shared executor for the stages of generation pipelines
+pipeline_executor = ThreadPoolExecutor(max_workers=8, thread_name_prefix="pipeline")
+# Executor for the items of image batches (kept separate so items can use the pipeline executor)
+batch_executor = ThreadPoolExecutor(max_workers=4, thread_name_prefix="image-batch")
+IMAGE_BATCH_SIZE = int(os.environ.get("MEDIA_GEN_IMAGE_BATCH_SIZE", "4"))
+MAX_IMAGE_BATCH_SIZE = 10
+
 app = Flask(__name__)
 CORS(app, resources={r"/*": {"origins": "*"}})
 # Create tables if not created
 Base.metadata.create_all(bind=engine)
 
+def mark_job_failed(job_id, error):
+    """
+    Marks a job as failed (status -1) unless its job function already recorded the outcome.
+
+    Args:
+        job_id (int): ID of the job.
+        error (str): Description of the failure.
+    """
+    db_session = SessionLocal()
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id, Job.status == 1).first()
+        if job:
+            job.status = -1
+            job.error_message = str(error)[:255]
+            job.updated_at = datetime.datetime.now()
+            db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logging.error("Error while marking job %s as failed: %s", job_id, e)
+    finally:
+        db_session.close()
+
+job_runner = BackgroundJobRunner(
+    app,
+    max_workers=int(os.environ.get("MEDIA_GEN_WORKERS", "4")),
+    max_pending=int(os.environ.get("MEDIA_GEN_MAX_PENDING", "16")),
+    on_failure=mark_job_failed
+)
+
+def run_job(job_id, task_name, job_fn):
+    """
+    Runs a job inline, or validates it and hands it to the background runner when the
+    request asks for `?mode=async`.
+
+    Args:
+        job_id (int): ID of the job.
+        task_name (str): Task name the job must have.
+        job_fn (callable): The job function, called as job_fn(job_id).
+
+    Returns:
+        tuple: The job function's response, or 202 once the job is accepted
+        (400 if the job is not valid, 503 if the runner is full).
+    """
+    if request.args.get("mode") != "async":
+        return job_fn(job_id)
+
+    db_session = SessionLocal()
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception("Job not found")
+        if job.task_name.lower() != task_name or job.status != 1:
+            raise Exception(f"Job is not valid for {task_name}")
+    except Exception as e:
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db_session.close()
+
+    if not job_runner.submit(job_id, job_fn):
+        return jsonify({"error": "Job is already running or the service is busy"}), 503
+
+    return jsonify({"message": "Job accepted", "job_id": job_id}), 202
+
+@app.route("/jobs", methods=["GET"])
+def jobs_route():
+    """
+    Returns the jobs currently running in the background and the state of the vendor clients.
+    """
+    return jsonify(dict(job_runner.stats(), vendors=http_client_stats(), runway=runway_monitor.stats())), 200
+
+def retrieve_context(question_embedding):
+    """
+    Queries ChromaDB for the document closest to the embedding.
+
+    Args:
+        question_embedding (list[float]): Embedding of the question.
+
+    Returns:
+        str: The retrieved context.
+    """
+    results = collection.query(
+        query_embeddings=[question_embedding],
+        n_results=1,  # Get the best match
+        where={"id": {"$ne": "none"}}  # Ensure we're not matching empty results
+    )
+
+    # Validate the Retrieved Documents
+    if "documents" not in results or not results["documents"]:
+        raise Exception("No relevant documents found in vector database.")
+
+    retrieved_docs = results["documents"][0]
+    return "\n".join(retrieved_docs) if retrieved_docs else "No context available."
+
+def generate_image(image_prompt):
+    """
+    Generates an image with ImagineArtAI using a random allowed style.
+
+    Args:
+        image_prompt (str): The image prompt.
+
+    Returns:
+        bytes: The generated image.
+    """
+    allowed_styles = ["flux-dev"]
+    random_style = random.choice(allowed_styles)
+    logging.info("Calling ImagineArtAI.generate_image with style: %s", random_style)
+    return ImagineArtAI(api_key=IMAGINE_API_KEY).generate_image(image_prompt, style=random_style)
+
+def upload_image(image_data, safe_category):
+    """
+    Uploads a generated image to Azure Blob Storage under its category.
+
+    Args:
+        image_data (bytes): The image.
+        safe_category (str): Category name usable in a blob name.
+
+    Returns:
+        str: URL of the uploaded blob.
+    """
+    upload_result = azureBlob.upload_bytes(image_data, "generated_image.png", f"{safe_category}/image", "image/png")
+    if not upload_result:
+        raise Exception("Failed to upload image to Azure Blob Storage")
+    return upload_result.get("blob_url")
+
 @app.route("/generate-image/<int:job_id>", methods=["POST"])
 def generate_image_route(job_id):
+    """
+    Runs the "create image" job, in the background when called with `?mode=async`.
+    """
+    return run_job(job_id, "create image", generate_image_job)
+
+def generate_image_job(job_id):
     """
     Generate an image using ImagineArt AI by:
     - Retrieving the related `question` from `media_gen_options`.
@@ -52,6 +204,8 @@ def generate_image_route(job_id):
     - Using ChatGPT to generate an enhanced image prompt.
     - Sending the prompt to ImagineArtAI to generate an image.
     - Uploading the generated image to Azure Blob Storage.
+    - Generating a caption from the retrieved context, concurrently with the image generation.
+    The response includes the duration of every stage.
     """
 
     db_session = SessionLocal()
@@ -85,54 +239,23 @@ def generate_image_route(job_id):
         selected_option = random.choice(category_options)
         chroma_query = selected_option.chroma_query
 
-        # Step 3: Generate an Embedding for the Question
-        question_embedding = chatgpt_api.get_openai_embedding(chroma_query)
-
-        # Step 4: Query ChromaDB for the Most Relevant Context
-        results = collection.query(
-            query_embeddings=[question_embedding],
-            n_results=1,  # Get the best match
-            where={"id": {"$ne": "none"}}  # Ensure we're not matching empty results
-        )
-
-        # Step 5: Validate the Retrieved Documents
-        if "documents" not in results or not results["documents"]:
-            raise Exception("No relevant documents found in vector database.")
-
-        retrieved_docs = results["documents"][0]
-        context = "\n".join(retrieved_docs) if retrieved_docs else "No context available."
-
-        # Step 6: Generate a More Detailed AI Image Prompt Using ChatGPT
-        image_prompt = chatgpt_api.generate_image_generation_prompt_informal(
-            f"Context: {context}\nOriginal Question: {chroma_query}"
-        )
-        # Step 7: Ask ChatGPT to Recommend a Style
-        allowed_styles = ["flux-dev"]
-
-        random_style = random.choice(allowed_styles)
-        logging.info("Random Style: %s", random_style)
-
-
-        # Step 8: Generate the Image Using ImagineArtAI
-        
-        imagine = ImagineArtAI(api_key=IMAGINE_API_KEY)
-        try:
-            logging.info("Calling ImagineArtAI.generate_image with style: %s", random_style)
-            image_path = imagine.generate_image(image_prompt, style=random_style)
-            logging.info("Image generated at path: %s", image_path)
-        except Exception as e:
-            logging.exception("Error while generating image")
-            raise
-
-        # Step 9: Upload the Generated Image to Azure Blob Storage
+        # Steps 3-9 run as a stage graph: image generation and caption generation only
+        # depend on the retrieved context, so they run concurrently
         safe_category = media_gen_option.category.lower().replace(" ", "_")
-
-        # Add the category as part of the filename
-        upload_result = azureBlob.upload_file(image_path, f"{safe_category}/image", "image/png")
-
-        media_blob_url = upload_result.get("blob_url")
-
-        caption = chatgpt_api.generate_caption(context, chroma_query)
+        pipeline = (
+            StagePipeline(pipeline_executor)
+            .add_stage("question_embedding", lambda chroma_query: chatgpt_api.get_openai_embedding(chroma_query), ["chroma_query"])
+            .add_stage("context", retrieve_context, ["question_embedding"])
+            .add_stage("image_prompt", lambda context, chroma_query: chatgpt_api.generate_image_generation_prompt_informal(
+                f"Context: {context}\nOriginal Question: {chroma_query}"
+            ), ["context", "chroma_query"])
+            .add_stage("image_data", generate_image, ["image_prompt"])
+            .add_stage("media_blob_url", lambda image_data: upload_image(image_data, safe_category), ["image_data"])
+            .add_stage("caption", lambda context, chroma_query: chatgpt_api.generate_caption(context, chroma_query), ["context", "chroma_query"])
+        )
+        stage_results, stage_timings = pipeline.run(chroma_query=chroma_query)
+        media_blob_url = stage_results["media_blob_url"]
+        caption = stage_results["caption"]
 
         # Step 10: Update the Current Job Status
         job.status = 2
@@ -179,7 +302,8 @@ def generate_image_route(job_id):
             "category": media_gen_option.category,  
             "job_id": job.id,
             "insta_job_id": insta_job.id,
-            "whats_job_id": whats_job.id
+            "whats_job_id": whats_job.id,
+            "stage_timings": stage_timings
         }), 200
 
     except Exception as e:
@@ -188,8 +312,143 @@ def generate_image_route(job_id):
     finally:
         db_session.close()
 
+@app.route("/generate-image-batch/<int:job_id>", methods=["POST"])
+def generate_image_batch_route(job_id):
+    """
+    Runs the "create image batch" job, in the background when called with `?mode=async`.
+    The number of images is taken from the `count` query parameter or JSON field; it must be a
+    whole number of at least 1 (400 otherwise) and is capped at MAX_IMAGE_BATCH_SIZE.
+    """
+    payload = request.get_json(silent=True)
+    if not isinstance(payload, dict):
+        payload = {}
+    count = request.args.get("count", payload.get("count", IMAGE_BATCH_SIZE))
+    try:
+        # Reject 2.5 or true rather than silently truncating them
+        if isinstance(count, (bool, float)):
+            raise ValueError(count)
+        count = int(count)
+    except (TypeError, ValueError):
+        return jsonify({"error": "count must be a whole number"}), 400
+    if count < 1:
+        return jsonify({"error": "count must be at least 1"}), 400
+    count = min(count, MAX_IMAGE_BATCH_SIZE)
+    return run_job(job_id, "create image batch", lambda batch_job_id: generate_image_batch_job(batch_job_id, count))
+
+def generate_image_batch_job(job_id, count):
+    """
+    Generate several images for one media generation option by:
+    - Retrieving the option and selecting one category option, once.
+    - Generating one embedding and querying ChromaDB once for the context.
+    - Generating the image prompts, images, uploads and captions of all items concurrently.
+    - Inserting every MediaAsset and its posting jobs in a single transaction.
+    Items that fail are reported; the job fails only if no image could be generated.
+    """
+    db_session = SessionLocal()
+    job = None
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception("Job not found")
+
+        if job.task_name.lower() != "create image batch" or job.status != 1:
+            raise Exception("Job is not valid for image batch generation")
+
+        media_gen_option = (
+            db_session.query(MediaGenOptions)
+            .options(joinedload(MediaGenOptions.category_options))
+            .filter_by(id=job.task_id)
+            .first()
+        )
+        if not media_gen_option:
+            raise Exception("Media Generation Option not found")
+
+        category_options = media_gen_option.category_options
+        if not category_options:
+            raise Exception("No category options found for this media generation option")
+
+        chroma_query = random.choice(category_options).chroma_query
+        safe_category = media_gen_option.category.lower().replace(" ", "_")
+
+        # Shared by every item of the batch
+        context = retrieve_context(chatgpt_api.get_openai_embedding(chroma_query))
+
+        def generate_item(index):
+            # Each item gets its own prompt and caption so the posts are not identical
+            image_prompt = chatgpt_api.generate_image_generation_prompt_informal(
+                f"Context: {context}\nOriginal Question: {chroma_query}"
+            )
+            caption_future = pipeline_executor.submit(chatgpt_api.generate_caption, context, chroma_query)
+            media_blob_url = upload_image(generate_image(image_prompt), safe_category)
+            return media_blob_url, caption_future.result()
+
+        futures = [batch_executor.submit(generate_item, index) for index in range(count)]
+        generated, errors = [], []
+        for future in futures:
+            try:
+                generated.append(future.result())
+            except Exception as e:
+                logging.exception("Error while generating a batch image for job %s", job_id)
+                errors.append(str(e))
+
+        if not generated:
+            raise Exception(f"No image could be generated: {errors[0]}")
+
+        # Insert the assets and their posting jobs in one transaction
+        new_assets = [
+            MediaAsset(media_blob_url=media_blob_url, caption=caption, media_type='image')
+            for media_blob_url, caption in generated
+        ]
+        db_session.add_all(new_assets)
+        db_session.flush()
+
+        post_jobs = [
+            Job(
+                task_name=task_name,
+                task_id=asset.id,
+                scheduled_date=(datetime.datetime.now() - timedelta(days=1)).date(),
+                status=0,
+                error_message=None,
+                created_at=datetime.datetime.now().date(),
+                updated_at=datetime.datetime.now().date()
+            )
+            for asset in new_assets
+            for task_name in ("post image instagram", "post image whatsapp")
+        ]
+        db_session.add_all(post_jobs)
+
+        job.status = 2
+        job.error_message = f"{len(errors)} of {count} images failed" if errors else None
+        job.updated_at = datetime.datetime.now().date()
+        db_session.commit()
+
+        return jsonify({
+            "message": "Image batch generated successfully",
+            "media_asset_ids": [asset.id for asset in new_assets],
+            "job_id": job.id,
+            "post_job_ids": [post_job.id for post_job in post_jobs],
+            "failed": len(errors),
+            "errors": errors
+        }), 200
+
+    except Exception as e:
+        db_session.rollback()
+        if job:
+            job.status = -1  # Error
+            job.error_message = str(e)[:255]
+            db_session.commit()
+        return jsonify({"error": str(e)}), 400
+    finally:
+        db_session.close()
+
 @app.route("/generate-video/<int:job_id>", methods=["POST"])
 def generate_video_route(job_id):
+    """
+    Runs the "create video" job, in the background when called with `?mode=async`.
+    """
+    return run_job(job_id, "create video", generate_video_job)
+
+def generate_video_job(job_id):
     """
     Generate a video using Runway AI by:
     - Retrieving the related category option from media_gen_options
@@ -278,7 +537,7 @@ def generate_video_route(job_id):
             task_name="monitor video",
             task_id=uuid,  # Store the Runway task ID
             scheduled_date=datetime.datetime.now(),
-            status=0,  # Pending
+            status=1,  # In progress, owned by the Runway monitor
             error_message=None,
             created_at=datetime.datetime.now(),
             updated_at=datetime.datetime.now()
@@ -312,8 +571,338 @@ def generate_video_route(job_id):
     finally:
         db_session.close()
 
+def copy_runway_video(uuid, data):
+    """
+    Copies a finished Runway video to Azure Blob Storage straight from memory.
+
+    Args:
+        uuid (str): The Runway task ID.
+        data (dict): The task status returned by Runway.
+
+    Returns:
+        str: URL of the uploaded blob.
+    """
+    video_url = data.get("url")
+    if not video_url:
+        raise Exception("Video completed but no URL provided")
+
+    video_response = get_http_client("runway-download", read_timeout=120).get(video_url)
+    video_response.raise_for_status()
+    upload_result = azureBlob.upload_bytes(video_response.content, f"runway_video_{uuid}.mp4", "videos", "video/mp4")
+
+    if not upload_result or "blob_url" not in upload_result:
+        raise Exception("Failed to upload video to Azure Blob Storage")
+    return upload_result["blob_url"]
+
+def record_video_status(db_session, job, data, video_blob_url=None):
+    """
+    Records a finished Runway task on its "monitor video" job, without committing.
+
+    On success the asset gets the video URL and the jobs posting it to social media are
+    created; on failure the job is marked as failed.
+
+    Args:
+        db_session (Session): Session the job was loaded in.
+        job (Job): The monitoring job (task_id holds the Runway uuid, error_message the asset ID).
+        data (dict): The task status returned by Runway (status check or callback).
+        video_blob_url (str, optional): URL of the copied video, required on success.
+
+    Returns:
+        tuple[dict, int] | None: The response and status code once the task finished,
+        None while it is still processing.
+    """
+    asset_id = None
+
+    # Extract asset_id from error_message field where we temporarily stored it
+    if job.error_message and "asset_id:" in job.error_message:
+        asset_id = int(job.error_message.split("asset_id:")[1])
+
+    if not asset_id:
+        raise Exception("Asset ID not found in monitoring job")
+
+    asset = db_session.query(MediaAsset).filter_by(id=asset_id).first()
+    if not asset:
+        raise Exception("Media asset not found")
+
+    status = (data.get("status") or "").lower()
+
+    if status == "success":
+        # Video is ready - update the asset with the video URL
+        asset.media_blob_url = video_blob_url
+
+        # Create jobs to post the video to social media
+        insta_job = Job(
+            task_name="post video instagram",
+            task_id=asset.id,
+            scheduled_date=datetime.datetime.now(),
+            status=0,  # Pending
+            error_message=None,
+            created_at=datetime.datetime.now(),
+            updated_at=datetime.datetime.now()
+        )
+        db_session.add(insta_job)
+
+        whats_job = Job(
+            task_name="post video whatsapp",
+            task_id=asset.id,
+            scheduled_date=datetime.datetime.now(),
+            status=0,  # Pending
+            error_message=None,
+            created_at=datetime.datetime.now(),
+            updated_at=datetime.datetime.now()
+        )
+        db_session.add(whats_job)
+
+        # Mark the monitoring job as completed
+        job.status = 2  # Completed
+        job.updated_at = datetime.datetime.now()
+        db_session.flush()
+
+        return {
+            "message": "Video generation completed successfully",
+            "media_asset_id": asset.id,
+            "video_url": asset.media_blob_url,
+            "instagram_job_id": insta_job.id,
+            "whatsapp_job_id": whats_job.id
+        }, 200
+    elif status == "failed":
+        # Video generation failed
+        job.status = -1  # Error
+        job.error_message = f"Video generation failed: {data.get('error', 'Unknown error')}"[:255]
+        job.updated_at = datetime.datetime.now()
+
+        return {
+            "error": "Video generation failed",
+            "details": data.get('error', 'Unknown error')
+        }, 400
+
+    return None
+
+# A "monitor video" job being completed holds a claim in its error_message
+# ("claimed:<unix time>:asset_id:<id>") while its video is copied outside any transaction.
+# Claims older than this (e.g. left by a process that stopped mid-copy) can be taken over.
+RUNWAY_CLAIM_TIMEOUT = int(os.environ.get("RUNWAY_CLAIM_TIMEOUT", "600"))
+
+def claim_runway_jobs(uuids):
+    """
+    Claims the pending "monitor video" jobs of finished Runway tasks, so only one caller
+    copies each video.
+
+    Each claim is a conditional update of error_message; all of them are committed at once
+    and no row lock is held while the videos are copied.
+
+    Args:
+        uuids (list[str]): The Runway task IDs.
+
+    Returns:
+        dict: (job ID, claim marker) by task ID, for the tasks whose job is pending and not
+        claimed by another caller.
+    """
+    now = int(time.time())
+    claims = {}
+    db_session = SessionLocal()
+    try:
+        jobs = (
+            db_session.query(Job)
+            .filter(Job.task_name == "monitor video", Job.task_id.in_(list(uuids)), Job.status.in_((0, 1)))
+            .all()
+        )
+        for job in jobs:
+            current = job.error_message or ""
+            if current.startswith("claimed:"):
+                claimed_at = int(current.split(":")[1])
+                if now - claimed_at < RUNWAY_CLAIM_TIMEOUT:
+                    continue
+                current = current.split(":", 2)[2]
+
+            marker = f"claimed:{now}:{current}"
+            claimed = (
+                db_session.query(Job)
+                .filter(Job.id == job.id, Job.status == job.status, Job.error_message == job.error_message)
+                .update({Job.error_message: marker, Job.updated_at: datetime.datetime.now()}, synchronize_session=False)
+            )
+            if claimed:
+                claims[job.task_id] = (job.id, marker)
+        db_session.commit()
+        return claims
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+def release_runway_claims(claims):
+    """
+    Releases claims without recording anything, leaving the jobs pending.
+
+    Args:
+        claims (list[tuple[int, str]]): (job ID, claim marker) pairs returned by claim_runway_jobs.
+    """
+    db_session = SessionLocal()
+    try:
+        for job_id, marker in claims:
+            (
+                db_session.query(Job)
+                .filter(Job.id == job_id, Job.error_message == marker)
+                .update({Job.error_message: marker.split(":", 2)[2]}, synchronize_session=False)
+            )
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logging.error("Error while releasing claims on Runway jobs: %s", e)
+    finally:
+        db_session.close()
+
+def record_runway_results(results):
+    """
+    Records finished Runway tasks on the jobs claimed for them, in one transaction.
+    A job whose update fails is marked as failed without affecting the others.
+
+    Args:
+        results (dict): (claim, task status, copied video URL or None) by task ID.
+
+    Returns:
+        dict: The response and status code by task ID. Tasks whose claim was taken over
+        meanwhile are left out.
+    """
+    claimed = {claim[0]: uuid for uuid, (claim, _, _) in results.items()}
+    outcomes = {}
+    db_session = SessionLocal()
+    try:
+        jobs = db_session.query(Job).filter(Job.id.in_(list(claimed)), Job.status.in_((0, 1))).all()
+        for job in jobs:
+            uuid = claimed[job.id]
+            (_, marker), data, video_blob_url = results[uuid]
+            if job.error_message != marker:
+                continue
+            try:
+                with db_session.begin_nested():
+                    outcomes[uuid] = record_video_status(db_session, job, data, video_blob_url)
+                    if job.status == 2:
+                        job.error_message = marker.split(":", 2)[2]
+            except Exception as e:
+                logging.error("Error while recording Runway task %s: %s", uuid, e)
+                job.status = -1  # Error
+                job.error_message = str(e)[:255]
+                job.updated_at = datetime.datetime.now()
+                outcomes[uuid] = {"error": str(e)}, 400
+        db_session.commit()
+        return outcomes
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+def complete_runway_task(uuid, data):
+    """
+    Completes the "monitor video" job of a finished Runway task: claims the job, copies the
+    video without holding any lock or transaction, then records the result.
+
+    Args:
+        uuid (str): The Runway task ID.
+        data (dict): The task status, "success" or "failed".
+
+    Returns:
+        tuple[dict, int] | None: The response and status code, or None if no job is waiting
+        for the task or another caller is completing it.
+
+    Raises:
+        Exception: If the video could not be copied. The claim is released and the job
+        left pending, so the copy is retried.
+    """
+    claim = claim_runway_jobs([uuid]).get(uuid)
+    if not claim:
+        return None
+
+    video_blob_url = None
+    if (data.get("status") or "").lower() == "success":
+        try:
+            video_blob_url = copy_runway_video(uuid, data)
+        except Exception:
+            release_runway_claims([claim])
+            raise
+
+    return record_runway_results({uuid: (claim, data, video_blob_url)}).get(uuid)
+
+def list_runway_tasks():
+    """
+    Lists the Runway tasks of every outstanding "monitor video" job in one query.
+
+    Jobs still pending for the scheduler (status 0) are taken over by the monitor, so
+    they are no longer checked one by one.
+
+    Returns:
+        list[str]: The Runway task IDs.
+    """
+    db_session = SessionLocal()
+    try:
+        (
+            db_session.query(Job)
+            .filter(Job.task_name == "monitor video", Job.status == 0)
+            .update({Job.status: 1, Job.updated_at: datetime.datetime.now()}, synchronize_session=False)
+        )
+        uuids = [
+            task_id for (task_id,) in
+            db_session.query(Job.task_id).filter(Job.task_name == "monitor video", Job.status == 1).all()
+        ]
+        db_session.commit()
+        return uuids
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+# Checks and completes every outstanding Runway task, on its own executor
+runway_monitor = RunwayMonitor(
+    list_runway_tasks,
+    runway_api.check_video_status,
+    claim_runway_jobs,
+    copy_runway_video,
+    record_runway_results,
+    release_runway_claims,
+    max_workers=int(os.environ.get("RUNWAY_MONITOR_WORKERS", "4"))
+)
+
+@app.route("/monitor-videos", methods=["POST"])
+def monitor_videos_route():
+    """
+    Asks the Runway monitor to sweep every outstanding video generation now.
+    Returns at once with the monitor's stats; the sweep runs in the background.
+    """
+    runway_monitor.start()
+    runway_monitor.wake()
+    return jsonify(dict(runway_monitor.stats(), message="Sweep requested")), 202
+
+@app.route("/runway-callback", methods=["POST"])
+def runway_callback_route():
+    """
+    Receives the status of a finished Runway task and hands it to the Runway monitor.
+    The request must carry the shared secret in the `X-Callback-Token` header; tokens in the
+    query string are refused, since they end up in access logs.
+    """
+    token = request.headers.get("X-Callback-Token", "")
+    if not RUNWAY_CALLBACK_SECRET or not hmac.compare_digest(token, RUNWAY_CALLBACK_SECRET):
+        return jsonify({"error": "Invalid callback token"}), 403
+
+    data = request.get_json(silent=True) or {}
+    uuid = data.get("uuid")
+    if not uuid:
+        return jsonify({"error": "Request must include a 'uuid' field"}), 400
+
+    runway_monitor.start()
+    runway_monitor.submit(uuid, data)
+    return jsonify({"message": "Callback received", "uuid": uuid}), 200
+
 @app.route("/monitor-video/<int:job_id>", methods=["POST"])
 def monitor_video_route(job_id):
+    """
+    Runs the "monitor video" job, in the background when called with `?mode=async`.
+    """
+    return run_job(job_id, "monitor video", monitor_video_job)
+
+def monitor_video_job(job_id):
     """
     Check the status of a video generation task and update the asset if complete.
     When the video is ready, create jobs to post it to social media.
@@ -330,104 +919,30 @@ def monitor_video_route(job_id):
         if job.task_name.lower() != "monitor video" or job.status != 1:
             raise Exception("Job is not valid for video monitoring")
 
-        # Step 2: Extract the Runway task ID and asset ID
-        uuid = job.task_id
-        asset_id = None
-        
-        # Extract asset_id from error_message field where we temporarily stored it
-        if job.error_message and "asset_id:" in job.error_message:
-            asset_id = int(job.error_message.split("asset_id:")[1])
-        
-        if not asset_id:
-            raise Exception("Asset ID not found in monitoring job")
-            
-        # Step 3: Query the media asset
-        asset = db_session.query(MediaAsset).filter_by(id=asset_id).first()
-        if not asset:
-            raise Exception("Media asset not found")
-
-        # Step 4: Check video status - just a single check, not waiting
-        data = runway_api.check_video_status(uuid)
-        status = data.get("status", "").lower()
-
-        if status == "success":
-            # Video is ready - update the asset with the video URL
-            video_url = data.get("url")
-            if not video_url:
-                raise Exception("Video completed but no URL provided")
-              
-            # Upload to Azure Blob Storage
-            video_data = requests.get(video_url).content
-            temp_path = f"/tmp/runway_video_{uuid}.mp4"
-            
-            with open(temp_path, "wb") as f:
-                f.write(video_data)
-                
-            upload_result = azureBlob.upload_file(temp_path, "videos", "video/mp4")
-            os.remove(temp_path)  # Clean up temp file
-            
-            if not upload_result or "blob_url" not in upload_result:
-                raise Exception("Failed to upload video to Azure Blob Storage")
-                
-            # Update asset with the blob URL
-            asset.media_blob_url = upload_result["blob_url"]
-            db_session.commit()
-            
-            # Create jobs to post the video to social media
-            insta_job = Job(
-                task_name="post video instagram",
-                task_id=asset.id,
-                scheduled_date=datetime.datetime.now(),
-                status=0,  # Pending
-                error_message=None,
-                created_at=datetime.datetime.now(),
-                updated_at=datetime.datetime.now()
-            )
-            db_session.add(insta_job)
-            
-            whats_job = Job(
-                task_name="post video whatsapp",
-                task_id=asset.id,
-                scheduled_date=datetime.datetime.now(),
-                status=0,  # Pending
-                error_message=None,
-                created_at=datetime.datetime.now(),
-                updated_at=datetime.datetime.now()
-            )
-            db_session.add(whats_job)
-            
-            # Mark the monitoring job as completed
-            job.status = 2  # Completed
-            job.updated_at = datetime.datetime.now()
-            db_session.commit()
-            
-            return jsonify({
-                "message": "Video generation completed successfully",
-                "media_asset_id": asset.id,
-                "video_url": asset.media_blob_url,
-                "instagram_job_id": insta_job.id,
-                "whatsapp_job_id": whats_job.id
-            }), 200        
-        elif status == "failed":
-            # Video generation failed
-            job.status = -1  # Error
-            job.error_message = f"Video generation failed: {status.get('error', 'Unknown error')}"
-            job.updated_at = datetime.datetime.now()
-            db_session.commit()
-            
-            return jsonify({
-                "error": "Video generation failed", 
-                "details": status.get('error', 'Unknown error')
-            }), 400         
-        else:
-            job.status = 0 
-            job.updated_at = datetime.datetime.now()
-            db_session.commit()
-            return jsonify({
-                "message": "Video is still processing",
-                "state": data,
-                "media_asset_id": asset.id
-            }), 200
+        # Step 2: Check video status - just a single check, not waiting
+        data = runway_api.check_video_status(job.task_id)
+
+        # Step 3: Complete the job if the video is ready, otherwise leave it pending
+        if (data.get("status") or "").lower() in ("success", "failed"):
+            # Release our snapshot before copying, the job is claimed and recorded on its own
+            db_session.rollback()
+            try:
+                result = complete_runway_task(job.task_id, data)
+            except Exception as e:
+                logging.error("Error while copying the video of job %s, will retry: %s", job_id, e)
+                result = None
+            if result:
+                return jsonify(result[0]), result[1]
+
+        # Hand the job back to the scheduler, unless it was completed meanwhile
+        db_session.query(Job).filter(Job.id == job_id, Job.status == 1).update(
+            {Job.status: 0, Job.updated_at: datetime.datetime.now()}, synchronize_session=False
+        )
+        db_session.commit()
+        return jsonify({
+            "message": "Video is still processing",
+            "state": data
+        }), 200
 
     except Exception as e:
         db_session.rollback()
@@ -539,11 +1054,17 @@ def test_chroma_query_route():
 @app.route("/generate-meme/<int:job_id>", methods=["POST"])
 def generate_meme_route(job_id):
     """
-    Generate a meme using the meme.py script by:
+    Runs the "create meme" job, in the background when called with `?mode=async`.
+    """
+    return run_job(job_id, "create meme", generate_meme_job)
+
+def generate_meme_job(job_id):
+    """
+    Generate a meme by:
     - Retrieving the related media_gen_option and category_option
     - Querying ChromaDB to get relevant context
     - Using ChatGPT to generate meme content
-    - Calling the meme generation script
+    - Rendering the meme in-process with MemeRenderer
     - Uploading the generated meme to Azure Blob Storage
     - Creating jobs to post the meme to social media platforms
     """
@@ -563,23 +1084,21 @@ def generate_meme_route(job_id):
         # Step 6: Use ChatGPT to generate meme content
         meme_content = chatgpt_api.generate_meme_content()
 
-        # Step 7: Use MemeService to generate a meme
-        from media_gen.apis.meme_service import MemeService
-        
+        # Step 7: Render the meme in-process
         try:
-            # Initialize MemeService and generate the meme
-            meme_service = MemeService()
-            image_path = meme_service.generate_meme(
+            meme_data = meme_renderer.render(
                 sentence=meme_content["sentence"],
                 roast_level=meme_content["roast_level"]
             )
-            logging.info("Meme generated at path: %s", image_path)
+            logging.info("Meme rendered (%d bytes)", len(meme_data))
         except Exception as e:
             logging.exception("Error while generating meme")
             raise
 
-        # Step 8: Upload the Generated Meme to Azure Blob Storage
-        upload_result = azureBlob.upload_file(image_path, f"memes/meme", "image/jpeg")
+        # Step 8: Upload the Generated Meme to Azure Blob Storage straight from memory
+        upload_result = azureBlob.upload_bytes(meme_data, "meme.jpg", f"memes/meme", "image/jpeg")
+        if not upload_result:
+            raise Exception("Failed to upload meme to Azure Blob Storage")
         media_blob_url = upload_result.get("blob_url")
 
         # Generate a caption for the meme
@@ -644,4 +1163,5 @@ def generate_meme_route(job_id):
         db_session.close()
 
 if __name__ == '__main__':
+    runway_monitor.start()
     app.run(host="0.0.0.0", port=3002)
\ No newline at end of file
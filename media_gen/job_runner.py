@@ -0,0 +1,80 @@
+import threading
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+
+class BackgroundJobRunner:
+    """
+    Bounded pool that runs accepted media generation jobs in the background.
+
+    A route hands the job over and returns immediately; the job function is the
+    same one the synchronous route uses and updates `Job.status` itself. A job ID
+    can only be in flight once, and new jobs are refused when the pool is full.
+    """
+
+    def __init__(self, app, max_workers=4, max_pending=16, on_failure=None):
+        """
+        Args:
+            app (Flask): The application, whose context the jobs run in.
+            max_workers (int): Number of jobs running at once.
+            max_pending (int): Maximum number of jobs accepted (running and waiting).
+            on_failure (callable, optional): Called as on_failure(job_id, error) when a job fails.
+        """
+        self.app = app
+        self.max_pending = max_pending
+        self.on_failure = on_failure
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="media-job")
+        self._in_flight = set()
+        self._lock = threading.Lock()
+
+    def submit(self, job_id, job_fn):
+        """
+        Accepts a job for background execution.
+
+        Args:
+            job_id (int): ID of the job.
+            job_fn (callable): Called as job_fn(job_id); returns a Flask response or a (response, status_code) tuple.
+
+        Returns:
+            bool: True if the job was accepted, False if it is already running or the pool is full.
+        """
+        with self._lock:
+            if job_id in self._in_flight or len(self._in_flight) >= self.max_pending:
+                return False
+            self._in_flight.add(job_id)
+
+        self._executor.submit(self._run, job_id, job_fn)
+        return True
+
+    def stats(self):
+        """
+        Returns:
+            dict: IDs of the jobs in flight and the capacity of the pool.
+        """
+        with self._lock:
+            return {"in_flight": sorted(self._in_flight), "max_pending": self.max_pending}
+
+    def _run(self, job_id, job_fn):
+        try:
+            with self.app.app_context():
+                response = job_fn(job_id)
+            response, status_code = response if isinstance(response, tuple) else (response, response.status_code)
+            if status_code >= 400:
+                error = (response.get_json(silent=True) or {}).get("error", f"HTTP {status_code}")
+                self._fail(job_id, error)
+            else:
+                logging.info("Background job %s finished", job_id)
+        except Exception as e:
+            logging.exception("Background job %s crashed", job_id)
+            self._fail(job_id, str(e))
+        finally:
+            with self._lock:
+                self._in_flight.discard(job_id)
+
+    def _fail(self, job_id, error):
+        logging.error("Background job %s failed: %s", job_id, error)
+        if self.on_failure:
+            try:
+                self.on_failure(job_id, error)
+            except Exception as e:
+                logging.exception("Error while recording failure of job %s: %s", job_id, e)
@@ -0,0 +1,155 @@
+import io
+import os
+import random
+import threading
+import logging
+from PIL import Image, ImageDraw, ImageFont
+
+VALID_ROAST_LEVELS = ("wholesome", "spicy", "savage")
+
+# Background used for a roast level that has no template in blob storage
+FALLBACK_BACKGROUNDS = {"wholesome": (255, 196, 87), "spicy": (231, 111, 81), "savage": (38, 38, 38)}
+
+
+class MemeRenderer:
+    """
+    Renders memes in-process with Pillow.
+
+    Template images are read from blob storage (under `<template_prefix>/<roast_level>/`,
+    see seed_meme_templates.py) the first time a roast level is used and kept in memory,
+    and the fonts are loaded once at start-up, so rendering a meme only costs drawing the
+    text and encoding the JPEG. A roast level whose templates could not be listed or
+    downloaded is not cached, and is fetched again for the next meme.
+    """
+
+    def __init__(self, azure_blob_manager, template_prefix="meme-templates",
+                 font_path=None, font_sizes=range(20, 81, 4), max_width=1080):
+        """
+        Args:
+            azure_blob_manager (AzureBlobManager): Client used to fetch the templates.
+            template_prefix (str): Blob prefix under which the templates are stored per roast level.
+            font_path (str, optional): TrueType font used for the text (DejaVu Sans Bold by default).
+            font_sizes (iterable[int]): Font sizes preloaded, the largest that fits is used.
+            max_width (int): Templates wider than this are downscaled when cached.
+        """
+        self.azure_blob_manager = azure_blob_manager
+        self.template_prefix = template_prefix.rstrip("/")
+        self.max_width = max_width
+        self.fonts = self._load_fonts(
+            font_path or os.environ.get("MEME_FONT_PATH", "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf"),
+            sorted(font_sizes, reverse=True)
+        )
+        self._templates = {}  # roast_level -> list of RGB images
+        self._lock = threading.Lock()
+
+    def render(self, sentence, roast_level):
+        """
+        Renders a meme.
+
+        Args:
+            sentence (str): The text of the meme.
+            roast_level (str): The roast level (wholesome, spicy or savage).
+
+        Returns:
+            bytes: The meme as a JPEG image.
+        """
+        roast_level = roast_level.lower() if roast_level and roast_level.lower() in VALID_ROAST_LEVELS else "wholesome"
+        logging.info(f"Rendering meme with sentence: {sentence}, roast level: {roast_level}")
+
+        templates = self._get_templates(roast_level)
+        if templates:
+            image = random.choice(templates).copy()
+        else:
+            image = Image.new("RGB", (1080, 1080), FALLBACK_BACKGROUNDS[roast_level])
+
+        self._draw_caption(image, sentence)
+
+        output = io.BytesIO()
+        image.save(output, format="JPEG", quality=90)
+        return output.getvalue()
+
+    def _get_templates(self, roast_level):
+        with self._lock:
+            if roast_level in self._templates:
+                return self._templates[roast_level]
+
+        blob_names = self.azure_blob_manager.list_blobs(f"{self.template_prefix}/{roast_level}/")
+        if blob_names is None:
+            logging.warning(f"Could not list meme templates for '{roast_level}', using a plain background")
+            return []
+
+        templates = []
+        complete = True
+        for blob_name in blob_names:
+            data = self.azure_blob_manager.get_blob(blob_name)
+            if not data:
+                complete = False
+                continue
+            try:
+                template = Image.open(io.BytesIO(data)).convert("RGB")
+                if template.width > self.max_width:
+                    template = template.resize(
+                        (self.max_width, round(template.height * self.max_width / template.width)),
+                        Image.LANCZOS
+                    )
+                templates.append(template)
+            except Exception as e:
+                logging.error(f"Invalid meme template {blob_name}: {e}")
+
+        if not templates:
+            logging.warning(
+                f"No meme templates found for '{roast_level}', using a plain background "
+                f"(upload some with media_gen/seed_meme_templates.py)"
+            )
+            return templates
+
+        # If a download failed, the set is only used for this meme and fetched again for the next one
+        if complete:
+            with self._lock:
+                self._templates[roast_level] = templates
+        return templates
+
+    def _draw_caption(self, image, sentence):
+        # Bottom-aligned text in the classic meme style, using the largest font that fits
+        draw = ImageDraw.Draw(image)
+        margin = image.width // 20
+        max_text_width = image.width - 2 * margin
+        max_text_height = image.height * 0.4
+
+        for font in self.fonts:
+            lines = self._wrap(sentence.upper(), font, max_text_width)
+            stroke = max(font.size // 15, 1)
+            line_height = font.size + 2 * stroke + font.size // 5
+            if len(lines) * line_height <= max_text_height:
+                break
+
+        y = image.height - margin - len(lines) * line_height
+        for line in lines:
+            line_width = font.getlength(line)
+            draw.text(
+                ((image.width - line_width) / 2, y), line, font=font,
+                fill="white", stroke_width=stroke, stroke_fill="black"
+            )
+            y += line_height
+
+    @staticmethod
+    def _wrap(text, font, max_width):
+        lines, current = [], ""
+        for word in text.split():
+            candidate = f"{current} {word}".strip()
+            if current and font.getlength(candidate) > max_width:
+                lines.append(current)
+                current = word
+            else:
+                current = candidate
+        if current:
+            lines.append(current)
+        return lines
+
+    @staticmethod
+    def _load_fonts(font_path, sizes):
+        try:
+            return [ImageFont.truetype(font_path, size) for size in sizes]
+        except OSError:
+            logging.warning(f"Font {font_path} not found, using Pillow's default font")
+            return [ImageFont.load_default(size) for size in sizes]
@@ -0,0 +1,93 @@
+import time
+import logging
+from concurrent.futures import FIRST_COMPLETED, wait
+
+
+class StagePipeline:
+    """
+    Small DAG executor for the steps of a media generation job.
+
+    Each stage declares the stages it depends on and receives their results as
+    keyword arguments. Stages whose dependencies are satisfied run concurrently
+    on the given executor, so independent steps (e.g. image generation and caption
+    generation) overlap. The duration of every stage is recorded.
+    """
+
+    def __init__(self, executor):
+        """
+        Args:
+            executor (concurrent.futures.Executor): Executor the stages run on.
+        """
+        self.executor = executor
+        self.stages = {}
+
+    def add_stage(self, name, fn, depends_on=()):
+        """
+        Adds a stage to the pipeline.
+
+        Args:
+            name (str): Unique name of the stage; its result is passed to dependents under this name.
+            fn (callable): Called with the results of its dependencies as keyword arguments.
+            depends_on (iterable[str]): Names of the stages (or inputs) this stage needs.
+
+        Returns:
+            StagePipeline: The pipeline, so calls can be chained.
+        """
+        if name in self.stages:
+            raise ValueError(f"Stage '{name}' is already defined")
+        self.stages[name] = (fn, tuple(depends_on))
+        return self
+
+    def run(self, **inputs):
+        """
+        Runs every stage, as early as its dependencies allow.
+
+        Args:
+            **inputs: Initial values, available to stages as if they were stage results.
+
+        Returns:
+            tuple[dict, dict]: The results of all stages (and inputs) by name, and the duration
+            of every stage in seconds.
+
+        Raises:
+            Exception: The first exception raised by a stage; stages not yet started are skipped.
+        """
+        results = dict(inputs)
+        timings = {}
+        remaining = dict(self.stages)
+        running = {}
+
+        for name, (_, depends_on) in remaining.items():
+            missing = [dep for dep in depends_on if dep not in self.stages and dep not in inputs]
+            if missing:
+                raise ValueError(f"Stage '{name}' depends on unknown stages: {missing}")
+
+        while remaining or running:
+            for name, (fn, depends_on) in list(remaining.items()):
+                if all(dep in results for dep in depends_on):
+                    kwargs = {dep: results[dep] for dep in depends_on}
+                    running[self.executor.submit(self._timed, fn, kwargs)] = name
+                    del remaining[name]
+
+            if not running:
+                raise ValueError(f"Stages have circular dependencies: {sorted(remaining)}")
+
+            done, _ = wait(running, return_when=FIRST_COMPLETED)
+            for future in done:
+                name = running.pop(future)
+                try:
+                    results[name], timings[name] = future.result()
+                except Exception:
+                    logging.exception("Pipeline stage '%s' failed", name)
+                    for other in running:
+                        other.cancel()
+                    raise
+
+        logging.info("Pipeline stage timings: %s", timings)
+        return results, timings
+
+    @staticmethod
+    def _timed(fn, kwargs):
+        started = time.monotonic()
+        result = fn(**kwargs)
+        return result, round(time.monotonic() - started, 3)
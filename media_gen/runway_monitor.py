@@ -0,0 +1,198 @@
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor
+
+FINISHED_STATUSES = ("success", "failed")
+
+
+def is_finished(data):
+    """
+    Returns:
+        bool: Whether a Runway task status is final.
+    """
+    return bool(data) and (data.get("status") or "").lower() in FINISHED_STATUSES
+
+
+class RunwayMonitor:
+    """
+    Watches every outstanding Runway video task from one background loop.
+
+    Each sweep lists the pending tasks with one query and checks the due ones
+    concurrently. Finished tasks are claimed together, their videos copied
+    concurrently without holding any lock, and their results recorded in one
+    transaction. A task whose copy fails is released and stays pending, so it is
+    retried. Each task is checked with its own exponential backoff; statuses
+    received through the Runway callback are applied on the next sweep without
+    another status call.
+
+    Status checks and copies run on the monitor's own executor, so they never
+    wait behind generation pipelines.
+    """
+
+    def __init__(self, list_fn, check_fn, claim_fn, copy_fn, record_fn, release_fn, max_workers=4,
+                 sweep_interval=10, initial_interval=10, max_interval=120, max_age=2 * 3600):
+        """
+        Args:
+            list_fn (callable): Called as list_fn(); returns the uuids of the pending tasks.
+            check_fn (callable): Called as check_fn(uuid); returns the Runway status data.
+            claim_fn (callable): Called as claim_fn(uuids); returns {uuid: claim} for the tasks
+                this monitor may complete.
+            copy_fn (callable): Called as copy_fn(uuid, data); copies a finished video and returns its URL.
+            record_fn (callable): Called as record_fn({uuid: (claim, data, video_url)}); records the
+                results in one transaction and returns {uuid: (response, status_code)}.
+            release_fn (callable): Called as release_fn(claims); releases claims, leaving the tasks pending.
+            max_workers (int): Number of status checks and copies running at once.
+            sweep_interval (float): Seconds between two sweeps.
+            initial_interval (float): Seconds before the first check of a task.
+            max_interval (float): Upper bound of the interval between two checks of a task.
+            max_age (float): Seconds after which a task is reported as failed.
+        """
+        self.list_fn = list_fn
+        self.check_fn = check_fn
+        self.claim_fn = claim_fn
+        self.copy_fn = copy_fn
+        self.record_fn = record_fn
+        self.release_fn = release_fn
+        self.sweep_interval = sweep_interval
+        self.initial_interval = initial_interval
+        self.max_interval = max_interval
+        self.max_age = max_age
+        self.last_sweep = None
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="runway")
+        self._tasks = {}  # uuid -> {"first_seen", "next_check", "interval"}
+        self._received = {}  # uuid -> status data from the callback
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread = None
+
+    def submit(self, uuid, data):
+        """
+        Hands over a status received through the Runway callback.
+
+        Args:
+            uuid (str): The Runway task ID.
+            data (dict): The task status.
+        """
+        with self._lock:
+            self._received[uuid] = data
+        self._wake.set()
+
+    def wake(self):
+        """Runs the next sweep now."""
+        self._wake.set()
+
+    def stats(self):
+        """
+        Returns:
+            dict: Number of tasks tracked, callback statuses waiting, and the summary of the last sweep.
+        """
+        with self._lock:
+            return {"tracked": len(self._tasks), "received": len(self._received), "last_sweep": self.last_sweep}
+
+    def start(self):
+        """Starts the monitoring thread, unless it is already running."""
+        with self._lock:
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="runway-monitor", daemon=True)
+                self._thread.start()
+
+    def stop(self):
+        """Stops the monitoring thread."""
+        self._stop.set()
+        self._wake.set()
+
+    def sweep(self):
+        """
+        Checks the due tasks and records the finished ones.
+
+        Returns:
+            dict: Number of tasks pending, checked, completed, failed and left to retry.
+        """
+        uuids = set(self.list_fn())
+        now = time.monotonic()
+        with self._lock:
+            for uuid in set(self._tasks) - uuids:
+                del self._tasks[uuid]
+            for uuid in uuids:
+                self._tasks.setdefault(uuid, {
+                    "first_seen": now,
+                    "next_check": now + self.initial_interval,
+                    "interval": self.initial_interval
+                })
+            received = {uuid: data for uuid, data in self._received.items() if uuid in uuids}
+            self._received.clear()
+            due = [uuid for uuid, task in self._tasks.items() if task["next_check"] <= now and uuid not in received]
+            expired = {
+                uuid: {"status": "failed", "error": "Timed out waiting for Runway"}
+                for uuid in due if now - self._tasks[uuid]["first_seen"] > self.max_age
+            }
+
+        to_check = [uuid for uuid in due if uuid not in expired]
+        statuses = dict(zip(to_check, self._executor.map(self._check, to_check)))
+        finished = {uuid: data for uuid, data in {**statuses, **received, **expired}.items() if is_finished(data)}
+
+        outcomes = {}
+        retried = set()
+        if finished:
+            claims = self.claim_fn(list(finished))
+            copies = dict(zip(claims, self._executor.map(lambda uuid: self._copy(uuid, finished[uuid]), claims)))
+            retried = {uuid for uuid, copied in copies.items() if isinstance(copied, Exception)}
+            if retried:
+                self.release_fn([claims[uuid] for uuid in retried])
+            results = {uuid: (claims[uuid], finished[uuid], copies[uuid]) for uuid in claims if uuid not in retried}
+            if results:
+                try:
+                    outcomes = self.record_fn(results)
+                except Exception as e:
+                    logging.error("Error while recording Runway results, will retry: %s", e)
+                    self.release_fn([claim for claim, _, _ in results.values()])
+                    retried |= set(results)
+
+        with self._lock:
+            for uuid in set(due) | set(received):
+                task = self._tasks.get(uuid)
+                if not task:
+                    continue
+                if uuid in outcomes:
+                    del self._tasks[uuid]
+                else:
+                    task["interval"] = min(task["interval"] * 2, self.max_interval)
+                    task["next_check"] = time.monotonic() + task["interval"]
+
+            self.last_sweep = summary = {
+                "pending": len(uuids),
+                "checked": len(to_check),
+                "completed": sum(1 for _, status_code in outcomes.values() if status_code < 400),
+                "failed": sum(1 for _, status_code in outcomes.values() if status_code >= 400),
+                "retried": len(retried)
+            }
+        if to_check or finished:
+            logging.info("Runway sweep: %s", summary)
+        return summary
+
+    def _run(self):
+        while not self._stop.is_set():
+            try:
+                self.sweep()
+            except Exception as e:
+                logging.exception("Error while sweeping Runway tasks: %s", e)
+            self._wake.wait(self.sweep_interval)
+            self._wake.clear()
+
+    def _check(self, uuid):
+        try:
+            return self.check_fn(uuid)
+        except Exception as e:
+            logging.error("Error while checking Runway task %s: %s", uuid, e)
+            return None
+
+    def _copy(self, uuid, data):
+        if (data.get("status") or "").lower() != "success":
+            return None
+        try:
+            return self.copy_fn(uuid, data)
+        except Exception as e:
+            logging.error("Error while copying the video of Runway task %s, will retry: %s", uuid, e)
+            return e
@@ -0,0 +1,89 @@
+"""
+Uploads meme templates to blob storage, where MemeRenderer reads them.
+
+The local directory holds one folder per roast level:
+
+    templates/
+        wholesome/cat.jpg
+        spicy/drake.png
+        savage/...
+
+Usage:
+    python media_gen/seed_meme_templates.py <directory> [--overwrite]
+
+Templates already in blob storage are skipped unless --overwrite is given. The
+running media_gen service picks new templates up for any roast level that had
+none; restart it to refresh a roast level that already had templates.
+"""
+import os
+import sys
+import argparse
+import logging
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
+from media_gen.meme_renderer import VALID_ROAST_LEVELS
+
+TEMPLATE_CONTENT_TYPES = {".jpg": "image/jpeg", ".jpeg": "image/jpeg", ".png": "image/png", ".webp": "image/webp"}
+
+
+def seed_templates(azure_blob_manager, directory, template_prefix="meme-templates", overwrite=False):
+    """
+    Uploads the templates found in a local directory.
+
+    Args:
+        azure_blob_manager (AzureBlobManager): Client used to upload the templates.
+        directory (str): Directory holding one folder of images per roast level.
+        template_prefix (str): Blob prefix under which the templates are stored per roast level.
+        overwrite (bool): Whether to upload templates that already exist.
+
+    Returns:
+        dict: Number of templates uploaded, skipped and failed.
+
+    Raises:
+        Exception: If the templates already in blob storage could not be listed.
+    """
+    summary = {"uploaded": 0, "skipped": 0, "failed": 0}
+    for roast_level in VALID_ROAST_LEVELS:
+        level_directory = os.path.join(directory, roast_level)
+        if not os.path.isdir(level_directory):
+            logging.warning(f"No '{roast_level}' folder in {directory}")
+            continue
+
+        prefix = f"{template_prefix.rstrip('/')}/{roast_level}/"
+        existing = azure_blob_manager.list_blobs(prefix)
+        if existing is None:
+            raise Exception(f"Could not list the existing templates under {prefix}")
+
+        for file_name in sorted(os.listdir(level_directory)):
+            content_type = TEMPLATE_CONTENT_TYPES.get(os.path.splitext(file_name)[1].lower())
+            if not content_type:
+                continue
+
+            blob_name = prefix + file_name
+            if blob_name in existing and not overwrite:
+                summary["skipped"] += 1
+                continue
+
+            with open(os.path.join(level_directory, file_name), "rb") as f:
+                data = f.read()
+            if azure_blob_manager.put_blob(blob_name, data, content_type):
+                summary["uploaded"] += 1
+            else:
+                summary["failed"] += 1
+
+    return summary
+
+
+if __name__ == "__main__":
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s - %(levelname)s - %(message)s")
+    parser = argparse.ArgumentParser(description="Upload meme templates to blob storage.")
+    parser.add_argument("directory", help="Directory holding one folder of images per roast level")
+    parser.add_argument("--overwrite", action="store_true", help="Upload templates that already exist")
+    args = parser.parse_args()
+
+    from shared.apis.azure_key_vault import AzureKeyVault
+    from shared.apis.azure_blob import AzureBlobManager
+    azure_blob = AzureBlobManager(AzureKeyVault().get_secret("posting-connection-key"))
+
+    result = seed_templates(azure_blob, args.directory, overwrite=args.overwrite)
+    logging.info(f"Meme templates: {result}")
+    sys.exit(1 if result["failed"] else 0)
@@ -0,0 +1,87 @@
+import os, sys
+import contextlib
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from media_gen.job_runner import BackgroundJobRunner
+
+
+class FakeApp:
+    @contextlib.contextmanager
+    def app_context(self):
+        yield
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+
+    def get_json(self, silent=False):
+        return self.payload
+
+
+def make_runner(**kwargs):
+    failures = []
+    finished = threading.Event()
+
+    def on_failure(job_id, error):
+        failures.append((job_id, error))
+        finished.set()
+
+    return BackgroundJobRunner(FakeApp(), on_failure=on_failure, **kwargs), failures, finished
+
+
+# ---------------------------
+# BackgroundJobRunner Tests
+# ---------------------------
+
+def test_successful_job_is_not_reported():
+    """A job returning a 2xx response finishes without calling on_failure."""
+    runner, failures, _ = make_runner()
+    done = threading.Event()
+    assert runner.submit(1, lambda job_id: done.set() or FakeResponse(200))
+    assert done.wait(5)
+    runner._executor.shutdown(wait=True)
+    assert failures == []
+    assert runner.stats()["in_flight"] == []
+
+def test_error_response_reports_failure():
+    """A job returning an error response is reported with the response's error."""
+    runner, failures, finished = make_runner()
+    runner.submit(1, lambda job_id: (FakeResponse(400, {"error": "No prompt"}), 400))
+    assert finished.wait(5)
+    assert failures == [(1, "No prompt")]
+
+def test_crashing_job_reports_failure():
+    """A job that raises is reported with the exception message."""
+    runner, failures, finished = make_runner()
+
+    def crash(job_id):
+        raise RuntimeError("vendor down")
+
+    runner.submit(1, crash)
+    assert finished.wait(5)
+    assert failures == [(1, "vendor down")]
+
+def test_job_accepted_once_while_in_flight():
+    """The same job ID is refused while it is running, and accepted again afterwards."""
+    runner, _, _ = make_runner()
+    release = threading.Event()
+    assert runner.submit(1, lambda job_id: release.wait(5) and FakeResponse(200))
+    assert not runner.submit(1, lambda job_id: FakeResponse(200))
+    assert runner.stats()["in_flight"] == [1]
+    release.set()
+    runner._executor.shutdown(wait=True)
+    assert runner.stats()["in_flight"] == []
+
+def test_full_runner_refuses_jobs():
+    """New jobs are refused once max_pending jobs are accepted."""
+    runner, _, _ = make_runner(max_workers=1, max_pending=2)
+    release = threading.Event()
+    job_fn = lambda job_id: release.wait(5) and FakeResponse(200)
+    assert runner.submit(1, job_fn)
+    assert runner.submit(2, job_fn)
+    assert not runner.submit(3, job_fn)
+    release.set()
+    runner._executor.shutdown(wait=True)
@@ -0,0 +1,225 @@
+import os, sys
+import datetime
+import pytest
+
+pytest.importorskip("flask")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import media_gen.app as media_gen_app
+from flask import jsonify
+from shared.database import SessionLocal
+from shared.models.job import Job
+from shared.models.media_asset import MediaAsset
+
+
+@pytest.fixture
+def client():
+    """
+    Provides a test client for the media generation service.
+    """
+    media_gen_app.app.config["TESTING"] = True
+    return media_gen_app.app.test_client()
+
+@pytest.fixture
+def batch_counts(monkeypatch):
+    """
+    Runs batch jobs inline and records the image count they are given instead of generating images.
+    """
+    counts = []
+    monkeypatch.setattr(media_gen_app, "run_job", lambda job_id, task_name, job_fn: job_fn(job_id))
+    monkeypatch.setattr(media_gen_app, "generate_image_batch_job",
+                        lambda job_id, count: counts.append(count) or (jsonify({"count": count}), 200))
+    return counts
+
+@pytest.fixture
+def monitor_job():
+    """
+    Creates a video asset and the "monitor video" job waiting for its Runway task; both are
+    removed afterwards, with the posting jobs created for the asset.
+    """
+    db_session = SessionLocal()
+    now = datetime.datetime.now()
+    asset = MediaAsset(media_blob_url="", caption="caption", media_type="video")
+    db_session.add(asset)
+    db_session.commit()
+    job = Job(task_name="monitor video", task_id="runway-test-uuid", status=1, scheduled_date=now,
+              error_message=f"asset_id:{asset.id}", created_at=now, updated_at=now)
+    db_session.add(job)
+    db_session.commit()
+    yield job.id, asset.id
+    db_session.query(Job).filter(Job.task_name.like("post video%"), Job.task_id == str(asset.id)).delete(synchronize_session=False)
+    db_session.query(Job).filter(Job.id == job.id).delete(synchronize_session=False)
+    db_session.query(MediaAsset).filter(MediaAsset.id == asset.id).delete(synchronize_session=False)
+    db_session.commit()
+    db_session.close()
+
+def load_job(job_id):
+    db_session = SessionLocal()
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id).first()
+        return job.status, job.error_message
+    finally:
+        db_session.close()
+
+# ---------------------------
+# Tests for image batch count
+# ---------------------------
+
+@pytest.mark.parametrize("count", ["abc", "2.5", "", "0", "-3"])
+def test_invalid_count_query_is_rejected(client, batch_counts, count):
+    """A count that is not a whole number of at least 1 is refused with 400."""
+    response = client.post(f"/generate-image-batch/1?count={count}")
+    assert response.status_code == 400
+    assert "error" in response.get_json()
+    assert batch_counts == []
+
+@pytest.mark.parametrize("count", [True, 2.5, None, "many", [3]])
+def test_invalid_count_json_is_rejected(client, batch_counts, count):
+    """A JSON count that is not a whole number is refused with 400."""
+    response = client.post("/generate-image-batch/1", json={"count": count})
+    assert response.status_code == 400
+    assert batch_counts == []
+
+def test_large_count_is_clamped(client, batch_counts):
+    """Counts above the maximum batch size are capped."""
+    response = client.post("/generate-image-batch/1?count=1000")
+    assert response.status_code == 200
+    assert batch_counts == [media_gen_app.MAX_IMAGE_BATCH_SIZE]
+
+def test_default_count(client, batch_counts):
+    """Without a count, the configured batch size is used."""
+    client.post("/generate-image-batch/1")
+    assert batch_counts == [media_gen_app.IMAGE_BATCH_SIZE]
+
+# ---------------------------
+# Tests for Runway results
+# ---------------------------
+
+def test_callback_token_in_query_is_refused(client, monkeypatch):
+    """The callback secret is only accepted in the X-Callback-Token header."""
+    handled = []
+    monkeypatch.setattr(media_gen_app, "RUNWAY_CALLBACK_SECRET", "secret")
+    monkeypatch.setattr(media_gen_app.runway_monitor, "start", lambda: None)
+    monkeypatch.setattr(media_gen_app.runway_monitor, "submit", lambda uuid, data: handled.append(uuid))
+
+    response = client.post("/runway-callback?token=secret", json={"uuid": "abc", "status": "success"})
+    assert response.status_code == 403
+    response = client.post("/runway-callback", json={"uuid": "abc", "status": "success"},
+                           headers={"X-Callback-Token": "secret"})
+    assert response.status_code == 200
+    assert handled == ["abc"]
+
+def test_claim_is_exclusive(monitor_job):
+    """A job claimed by one caller can not be claimed by another until released."""
+    job_id, asset_id = monitor_job
+    job_id_claimed, marker = media_gen_app.claim_runway_jobs(["runway-test-uuid"])["runway-test-uuid"]
+    assert job_id_claimed == job_id
+    assert marker.endswith(f"asset_id:{asset_id}")
+    assert media_gen_app.claim_runway_jobs(["runway-test-uuid"]) == {}
+
+    media_gen_app.release_runway_claims([(job_id, marker)])
+    assert load_job(job_id) == (1, f"asset_id:{asset_id}")
+
+def test_stale_claim_is_taken_over(monitor_job, monkeypatch):
+    """A claim older than the timeout is taken over."""
+    job_id, asset_id = monitor_job
+    media_gen_app.claim_runway_jobs(["runway-test-uuid"])
+    monkeypatch.setattr(media_gen_app, "RUNWAY_CLAIM_TIMEOUT", -1)
+    job_id_claimed, marker = media_gen_app.claim_runway_jobs(["runway-test-uuid"])["runway-test-uuid"]
+    assert job_id_claimed == job_id
+    assert marker.count("claimed:") == 1
+
+def test_video_is_copied_outside_any_lock(monitor_job, monkeypatch):
+    """The claim is committed before the copy starts, and the result recorded afterwards."""
+    job_id, asset_id = monitor_job
+    seen = []
+
+    def copy(uuid, data):
+        # Another session can read and update the row while the copy runs
+        db_session = SessionLocal()
+        try:
+            job = db_session.query(Job).filter(Job.id == job_id).with_for_update(nowait=True).first()
+            seen.append(job.error_message)
+            db_session.rollback()
+        finally:
+            db_session.close()
+        return "https://blob/video.mp4"
+
+    monkeypatch.setattr(media_gen_app, "copy_runway_video", copy)
+    result, status_code = media_gen_app.complete_runway_task("runway-test-uuid", {"status": "success", "url": "u"})
+
+    assert status_code == 200
+    assert seen[0].startswith("claimed:")
+    assert load_job(job_id) == (2, f"asset_id:{asset_id}")
+    db_session = SessionLocal()
+    try:
+        assert db_session.query(MediaAsset).filter(MediaAsset.id == asset_id).first().media_blob_url == "https://blob/video.mp4"
+    finally:
+        db_session.close()
+
+def test_failed_copy_leaves_job_pending(monitor_job, monkeypatch):
+    """A copy error releases the claim and leaves the job to be retried."""
+    job_id, asset_id = monitor_job
+
+    def copy(uuid, data):
+        raise Exception("download timed out")
+
+    monkeypatch.setattr(media_gen_app, "copy_runway_video", copy)
+    with pytest.raises(Exception):
+        media_gen_app.complete_runway_task("runway-test-uuid", {"status": "success", "url": "u"})
+    assert load_job(job_id) == (1, f"asset_id:{asset_id}")
+
+def test_failed_generation_is_recorded(monitor_job):
+    """A failed Runway task marks its job as failed without copying anything."""
+    job_id, asset_id = monitor_job
+    result, status_code = media_gen_app.complete_runway_task("runway-test-uuid", {"status": "failed", "error": "nsfw"})
+    assert status_code == 400
+    status, error_message = load_job(job_id)
+    assert status == -1
+    assert "nsfw" in error_message
+
+def test_results_are_recorded_together(monitor_job):
+    """A job whose update fails is marked as failed without affecting the others."""
+    job_id, asset_id = monitor_job
+    db_session = SessionLocal()
+    now = datetime.datetime.now()
+    broken = Job(task_name="monitor video", task_id="runway-test-broken", status=1, scheduled_date=now,
+                 error_message="asset_id:0", created_at=now, updated_at=now)
+    db_session.add(broken)
+    db_session.commit()
+    try:
+        claims = media_gen_app.claim_runway_jobs(["runway-test-uuid", "runway-test-broken"])
+        outcomes = media_gen_app.record_runway_results({
+            "runway-test-uuid": (claims["runway-test-uuid"], {"status": "success"}, "https://blob/video.mp4"),
+            "runway-test-broken": (claims["runway-test-broken"], {"status": "success"}, "https://blob/other.mp4")
+        })
+        assert outcomes["runway-test-uuid"][1] == 200
+        assert outcomes["runway-test-broken"][1] == 400
+        assert load_job(job_id)[0] == 2
+        assert load_job(broken.id)[0] == -1
+    finally:
+        db_session.query(Job).filter(Job.id == broken.id).delete(synchronize_session=False)
+        db_session.commit()
+        db_session.close()
+
+def test_legacy_pending_jobs_are_taken_over(monitor_job):
+    """Monitor jobs left pending for the scheduler are listed and moved to in progress."""
+    job_id, asset_id = monitor_job
+    db_session = SessionLocal()
+    try:
+        db_session.query(Job).filter(Job.id == job_id).update({Job.status: 0})
+        db_session.commit()
+    finally:
+        db_session.close()
+
+    assert "runway-test-uuid" in media_gen_app.list_runway_tasks()
+    assert load_job(job_id)[0] == 1
+
+def test_monitor_videos_wakes_the_monitor(client, monkeypatch):
+    """The sweep route returns at once and leaves the sweep to the monitor."""
+    woken = []
+    monkeypatch.setattr(media_gen_app.runway_monitor, "start", lambda: None)
+    monkeypatch.setattr(media_gen_app.runway_monitor, "wake", lambda: woken.append(True))
+    response = client.post("/monitor-videos")
+    assert response.status_code == 202
+    assert woken == [True]
@@ -0,0 +1,209 @@
+import os, sys
+import io
+import pytest
+
+pytest.importorskip("PIL")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from PIL import Image
+from media_gen.meme_renderer import MemeRenderer, FALLBACK_BACKGROUNDS
+from media_gen.seed_meme_templates import seed_templates
+
+
+class FakeBlobManager:
+    """
+    Serves templates from memory; `blobs` maps blob names to their content.
+    """
+
+    def __init__(self, blobs=None):
+        self.blobs = dict(blobs or {})
+        self.list_calls = 0
+        self.list_error = False
+        self.missing = set()
+        self.uploads = {}
+
+    def list_blobs(self, prefix):
+        self.list_calls += 1
+        if self.list_error:
+            return None
+        return [name for name in self.blobs if name.startswith(prefix)]
+
+    def get_blob(self, blob_name):
+        return None if blob_name in self.missing else self.blobs.get(blob_name)
+
+    def put_blob(self, blob_name, data, content_type="image/png"):
+        self.uploads[blob_name] = (data, content_type)
+        return True
+
+
+def image_bytes(color, size=(400, 300), format="JPEG"):
+    output = io.BytesIO()
+    Image.new("RGB", size, color).save(output, format=format)
+    return output.getvalue()
+
+
+@pytest.fixture
+def font():
+    """
+    Provides a preloaded font of the renderer.
+    """
+    return MemeRenderer(FakeBlobManager(), font_sizes=[24]).fonts[0]
+
+# ---------------------------
+# Tests for caption layout
+# ---------------------------
+
+def test_wrap_keeps_lines_within_width(font):
+    """Words are wrapped so that no line is wider than the maximum width."""
+    text = "WHEN THE CAFETERIA RUNS OUT OF MANAKISH BEFORE YOUR EIGHT AM CLASS"
+    lines = MemeRenderer._wrap(text, font, 200)
+    assert len(lines) > 1
+    assert " ".join(lines) == text
+    assert all(font.getlength(line) <= 200 for line in lines if " " in line)
+
+def test_wrap_keeps_long_word_on_its_own_line(font):
+    """A word wider than the maximum width is not split or dropped."""
+    lines = MemeRenderer._wrap("A SUPERCALIFRAGILISTICEXPIALIDOCIOUS DAY", font, 50)
+    assert lines == ["A", "SUPERCALIFRAGILISTICEXPIALIDOCIOUS", "DAY"]
+
+def test_wrap_empty_text(font):
+    """Empty text gives no lines."""
+    assert MemeRenderer._wrap("   ", font, 200) == []
+
+def test_caption_is_drawn_at_the_bottom():
+    """The caption is drawn in the lower part of the image, leaving the top untouched."""
+    renderer = MemeRenderer(FakeBlobManager())
+    image = Image.new("RGB", (600, 600), (0, 128, 0))
+    renderer._draw_caption(image, "exams are next week")
+
+    top = image.crop((0, 0, 600, 300))
+    bottom = image.crop((0, 300, 600, 600))
+    assert top.getcolors() == [(600 * 300, (0, 128, 0))]
+    assert len(bottom.getcolors(maxcolors=100000)) > 1
+
+def test_long_caption_uses_smaller_font(monkeypatch):
+    """A caption that does not fit at the largest size is drawn with a smaller font."""
+    renderer = MemeRenderer(FakeBlobManager())
+    used = []
+    original_wrap = MemeRenderer._wrap
+    monkeypatch.setattr(MemeRenderer, "_wrap", staticmethod(
+        lambda text, font, max_width: used.append(font) or original_wrap(text, font, max_width)
+    ))
+
+    renderer._draw_caption(Image.new("RGB", (600, 600)), "short")
+    short_font = used[-1]
+    renderer._draw_caption(Image.new("RGB", (600, 600)), "a much longer caption " * 12)
+    long_font = used[-1]
+
+    assert short_font is renderer.fonts[0]
+    assert long_font.size < short_font.size
+
+# ---------------------------
+# Tests for templates
+# ---------------------------
+
+def test_render_uses_template():
+    """A meme is rendered on a template of its roast level, as a JPEG."""
+    blobs = FakeBlobManager({"meme-templates/spicy/a.jpg": image_bytes((0, 0, 255))})
+    renderer = MemeRenderer(blobs)
+
+    data = renderer.render("hello", "spicy")
+
+    image = Image.open(io.BytesIO(data))
+    assert image.format == "JPEG"
+    assert image.size == (400, 300)
+
+def test_templates_are_cached():
+    """Templates are listed and downloaded once per roast level."""
+    blobs = FakeBlobManager({"meme-templates/savage/a.png": image_bytes((255, 0, 0), format="PNG")})
+    renderer = MemeRenderer(blobs)
+
+    renderer.render("one", "savage")
+    renderer.render("two", "savage")
+
+    assert blobs.list_calls == 1
+
+def test_list_error_is_not_cached():
+    """Templates that could not be listed are listed again for the next meme."""
+    blobs = FakeBlobManager({"meme-templates/wholesome/a.jpg": image_bytes((0, 0, 255))})
+    blobs.list_error = True
+    renderer = MemeRenderer(blobs)
+
+    image = Image.open(io.BytesIO(renderer.render("one", "wholesome")))
+    assert image.size == (1080, 1080)
+
+    blobs.list_error = False
+    image = Image.open(io.BytesIO(renderer.render("two", "wholesome")))
+    assert image.size == (400, 300)
+
+def test_empty_folder_is_not_cached():
+    """A roast level without templates picks up templates seeded later."""
+    blobs = FakeBlobManager()
+    renderer = MemeRenderer(blobs)
+
+    image = Image.open(io.BytesIO(renderer.render("one", "spicy")))
+    assert image.getpixel((5, 5)) == pytest.approx(FALLBACK_BACKGROUNDS["spicy"], abs=8)
+
+    blobs.blobs["meme-templates/spicy/a.jpg"] = image_bytes((0, 0, 255))
+    renderer.render("two", "spicy")
+    assert blobs.list_calls == 2
+    assert len(renderer._templates["spicy"]) == 1
+
+def test_partial_download_is_not_cached():
+    """If a template could not be downloaded, the others are used but not cached."""
+    blobs = FakeBlobManager({
+        "meme-templates/spicy/a.jpg": image_bytes((0, 0, 255)),
+        "meme-templates/spicy/b.jpg": image_bytes((0, 255, 0))
+    })
+    blobs.missing.add("meme-templates/spicy/b.jpg")
+    renderer = MemeRenderer(blobs)
+
+    renderer.render("one", "spicy")
+    assert "spicy" not in renderer._templates
+
+    blobs.missing.clear()
+    renderer.render("two", "spicy")
+    assert len(renderer._templates["spicy"]) == 2
+
+# ---------------------------
+# Tests for template seeding
+# ---------------------------
+
+def test_seed_uploads_templates_per_roast_level(tmp_path):
+    """Images are uploaded under their roast level; other files and folders are ignored."""
+    (tmp_path / "spicy").mkdir()
+    (tmp_path / "spicy" / "drake.jpg").write_bytes(b"jpeg")
+    (tmp_path / "spicy" / "notes.txt").write_text("not a template")
+    (tmp_path / "savage").mkdir()
+    (tmp_path / "savage" / "cat.PNG").write_bytes(b"png")
+    (tmp_path / "unknown").mkdir()
+    (tmp_path / "unknown" / "dog.jpg").write_bytes(b"jpeg")
+    blobs = FakeBlobManager()
+
+    summary = seed_templates(blobs, str(tmp_path))
+
+    assert summary == {"uploaded": 2, "skipped": 0, "failed": 0}
+    assert blobs.uploads == {
+        "meme-templates/spicy/drake.jpg": (b"jpeg", "image/jpeg"),
+        "meme-templates/savage/cat.PNG": (b"png", "image/png")
+    }
+
+def test_seed_skips_existing_templates(tmp_path):
+    """Templates already in blob storage are only uploaded again with overwrite."""
+    (tmp_path / "wholesome").mkdir()
+    (tmp_path / "wholesome" / "a.jpg").write_bytes(b"new")
+    blobs = FakeBlobManager({"meme-templates/wholesome/a.jpg": b"old"})
+
+    assert seed_templates(blobs, str(tmp_path)) == {"uploaded": 0, "skipped": 1, "failed": 0}
+    assert seed_templates(blobs, str(tmp_path), overwrite=True)["uploaded"] == 1
+
+def test_seed_fails_when_listing_fails(tmp_path):
+    """Seeding stops instead of overwriting templates it could not list."""
+    (tmp_path / "wholesome").mkdir()
+    (tmp_path / "wholesome" / "a.jpg").write_bytes(b"new")
+    blobs = FakeBlobManager()
+    blobs.list_error = True
+
+    with pytest.raises(Exception):
+        seed_templates(blobs, str(tmp_path))
+    assert blobs.uploads == {}
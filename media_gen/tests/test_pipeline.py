@@ -0,0 +1,81 @@
+import os, sys
+import threading
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from media_gen.pipeline import StagePipeline
+
+
+@pytest.fixture
+def executor():
+    executor = ThreadPoolExecutor(max_workers=4)
+    yield executor
+    executor.shutdown(wait=True)
+
+
+# ---------------------------
+# StagePipeline Tests
+# ---------------------------
+
+def test_stages_receive_dependency_results(executor):
+    """Each stage gets the results of its dependencies (and inputs) as keyword arguments."""
+    pipeline = (
+        StagePipeline(executor)
+        .add_stage("prompt", lambda category: f"a {category} picture", depends_on=["category"])
+        .add_stage("image", lambda prompt: prompt.upper(), depends_on=["prompt"])
+        .add_stage("caption", lambda prompt: prompt + "!", depends_on=["prompt"])
+        .add_stage("post", lambda image, caption: (image, caption), depends_on=["image", "caption"])
+    )
+    results, timings = pipeline.run(category="sports")
+    assert results["post"] == ("A SPORTS PICTURE", "a sports picture!")
+    assert set(timings) == {"prompt", "image", "caption", "post"}
+
+def test_independent_stages_run_concurrently(executor):
+    """Stages without dependencies between them overlap."""
+    barrier = threading.Barrier(2, timeout=5)
+    pipeline = (
+        StagePipeline(executor)
+        .add_stage("image", lambda: barrier.wait())
+        .add_stage("caption", lambda: barrier.wait())
+    )
+    # Both stages must be running at once for the barrier to open
+    pipeline.run()
+
+def test_failing_stage_raises_and_skips_dependents(executor):
+    """The first stage error is raised and stages depending on it never run."""
+    ran = []
+
+    def fail():
+        raise RuntimeError("vendor down")
+
+    pipeline = (
+        StagePipeline(executor)
+        .add_stage("image", fail)
+        .add_stage("upload", lambda image: ran.append(image), depends_on=["image"])
+    )
+    with pytest.raises(RuntimeError):
+        pipeline.run()
+    assert ran == []
+
+def test_unknown_dependency_is_rejected(executor):
+    """A stage depending on an undefined stage or input is refused before anything runs."""
+    pipeline = StagePipeline(executor).add_stage("image", lambda prompt: prompt, depends_on=["prompt"])
+    with pytest.raises(ValueError):
+        pipeline.run()
+
+def test_circular_dependencies_are_rejected(executor):
+    """Stages that depend on each other are reported instead of hanging."""
+    pipeline = (
+        StagePipeline(executor)
+        .add_stage("a", lambda b: b, depends_on=["b"])
+        .add_stage("b", lambda a: a, depends_on=["a"])
+    )
+    with pytest.raises(ValueError):
+        pipeline.run()
+
+def test_duplicate_stage_is_rejected(executor):
+    """A stage name can only be defined once."""
+    pipeline = StagePipeline(executor).add_stage("image", lambda: None)
+    with pytest.raises(ValueError):
+        pipeline.add_stage("image", lambda: None)
@@ -0,0 +1,205 @@
+import os, sys
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from media_gen.runway_monitor import RunwayMonitor
+
+
+class FakeStore:
+    """
+    Stands in for the job table and Runway: tasks stay pending until recorded.
+    """
+
+    def __init__(self, statuses):
+        self.statuses = dict(statuses)
+        self.pending = set(statuses)
+        self.claimed = set()
+        self.checks = []
+        self.copies = []
+        self.recorded = {}
+        self.released = []
+        self.failing_copies = set()
+
+    def list(self):
+        return sorted(self.pending)
+
+    def check(self, uuid):
+        self.checks.append(uuid)
+        return self.statuses[uuid]
+
+    def claim(self, uuids):
+        claims = {uuid: (uuid, "marker") for uuid in uuids if uuid in self.pending and uuid not in self.claimed}
+        self.claimed |= set(claims)
+        return claims
+
+    def copy(self, uuid, data):
+        self.copies.append(uuid)
+        if uuid in self.failing_copies:
+            raise Exception("download timed out")
+        return f"https://blob/{uuid}.mp4"
+
+    def record(self, results):
+        outcomes = {}
+        for uuid, (claim, data, video_url) in results.items():
+            self.recorded[uuid] = (data["status"], video_url)
+            self.pending.discard(uuid)
+            self.claimed.discard(uuid)
+            outcomes[uuid] = ({}, 200 if data["status"] == "success" else 400)
+        return outcomes
+
+    def release(self, claims):
+        self.released.extend(claims)
+        self.claimed -= {uuid for uuid, _ in claims}
+
+
+def make_monitor(store, **kwargs):
+    kwargs.setdefault("initial_interval", 0)
+    return RunwayMonitor(store.list, store.check, store.claim, store.copy, store.record, store.release, **kwargs)
+
+
+# ---------------------------
+# RunwayMonitor Tests
+# ---------------------------
+
+def test_sweep_records_finished_tasks():
+    """Finished tasks are copied and recorded together; processing ones stay tracked."""
+    store = FakeStore({
+        "a": {"status": "success", "url": "u"},
+        "b": {"status": "failed", "error": "nsfw"},
+        "c": {"status": "processing"}
+    })
+    monitor = make_monitor(store)
+
+    summary = monitor.sweep()
+
+    assert summary == {"pending": 3, "checked": 3, "completed": 1, "failed": 1, "retried": 0}
+    assert store.recorded == {"a": ("success", "https://blob/a.mp4"), "b": ("failed", None)}
+    assert store.copies == ["a"]
+    assert monitor.stats()["tracked"] == 1
+
+def test_failed_copy_leaves_task_pending():
+    """A copy error releases the claim and the task is copied again on a later check."""
+    store = FakeStore({"a": {"status": "success", "url": "u"}})
+    store.failing_copies.add("a")
+    monitor = make_monitor(store, max_interval=0)
+
+    summary = monitor.sweep()
+    assert summary["retried"] == 1
+    assert store.released == [("a", "marker")]
+    assert store.recorded == {}
+    assert "a" in store.pending
+
+    store.failing_copies.clear()
+    monitor.sweep()
+    assert store.recorded == {"a": ("success", "https://blob/a.mp4")}
+
+def test_record_error_releases_claims():
+    """If the results can not be recorded, the claims are released for a retry."""
+    store = FakeStore({"a": {"status": "success", "url": "u"}})
+
+    def record(results):
+        raise Exception("database is unavailable")
+
+    monitor = RunwayMonitor(store.list, store.check, store.claim, store.copy, record, store.release, initial_interval=0)
+    summary = monitor.sweep()
+
+    assert summary["retried"] == 1
+    assert store.released == [("a", "marker")]
+    assert store.claimed == set()
+
+def test_task_claimed_elsewhere_is_skipped():
+    """A task claimed by another caller is neither copied nor recorded."""
+    store = FakeStore({"a": {"status": "success", "url": "u"}})
+    store.claimed.add("a")
+    monitor = make_monitor(store)
+
+    summary = monitor.sweep()
+
+    assert summary["completed"] == 0
+    assert store.copies == []
+
+def test_interval_backs_off():
+    """Each check of an unfinished task doubles its interval, up to the maximum."""
+    store = FakeStore({"a": {"status": "processing"}})
+    monitor = make_monitor(store, initial_interval=10, max_interval=25)
+    monitor._tasks["a"] = {"first_seen": time.monotonic(), "next_check": 0, "interval": 10}
+
+    monitor.sweep()
+    assert monitor._tasks["a"]["interval"] == 20
+    monitor.sweep()
+    assert store.checks == ["a"]  # not due again yet
+
+    monitor._tasks["a"]["next_check"] = 0
+    monitor.sweep()
+    assert monitor._tasks["a"]["interval"] == 25
+
+def test_new_task_waits_for_initial_interval():
+    """A task is first checked once the initial interval has passed."""
+    store = FakeStore({"a": {"status": "processing"}})
+    monitor = make_monitor(store, initial_interval=60)
+
+    summary = monitor.sweep()
+
+    assert summary["checked"] == 0
+    assert monitor.stats()["tracked"] == 1
+
+def test_callback_status_skips_the_check():
+    """A status received through the callback is applied without calling Runway."""
+    store = FakeStore({"a": {"status": "processing"}})
+    monitor = make_monitor(store, initial_interval=60)
+    monitor.sweep()
+
+    monitor.submit("a", {"status": "success", "url": "u"})
+    monitor.sweep()
+
+    assert store.checks == []
+    assert store.recorded == {"a": ("success", "https://blob/a.mp4")}
+
+def test_callback_for_unknown_task_is_ignored():
+    """A callback for a task without a pending job is dropped."""
+    store = FakeStore({})
+    monitor = make_monitor(store)
+
+    monitor.submit("unknown", {"status": "success", "url": "u"})
+    monitor.sweep()
+
+    assert store.copies == []
+    assert monitor.stats()["received"] == 0
+
+def test_old_task_is_failed():
+    """A task older than max_age is recorded as failed without another check."""
+    store = FakeStore({"a": {"status": "processing"}})
+    monitor = make_monitor(store, max_age=-1)
+
+    summary = monitor.sweep()
+
+    assert summary["failed"] == 1
+    assert store.checks == []
+    assert store.recorded == {"a": ("failed", None)}
+
+def test_task_gone_from_database_is_forgotten():
+    """Tasks completed elsewhere stop being tracked on the next sweep."""
+    store = FakeStore({"a": {"status": "processing"}})
+    monitor = make_monitor(store)
+    monitor.sweep()
+
+    store.pending.clear()
+    monitor.sweep()
+
+    assert monitor.stats()["tracked"] == 0
+
+def test_check_error_is_retried():
+    """A failing status check leaves the task tracked with a longer interval."""
+    store = FakeStore({"a": {"status": "processing"}})
+
+    def check(uuid):
+        raise Exception("Runway unavailable")
+
+    monitor = RunwayMonitor(store.list, check, store.claim, store.copy, store.record, store.release,
+                            initial_interval=5, max_interval=30)
+    monitor._tasks["a"] = {"first_seen": time.monotonic(), "next_check": 0, "interval": 5}
+    summary = monitor.sweep()
+
+    assert summary["checked"] == 1
+    assert summary["failed"] == 0
+    assert monitor._tasks["a"]["interval"] == 10
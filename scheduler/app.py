@@ -12,7 +12,9 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from shared.database import engine, SessionLocal
 from shared.models.base import Base
 from shared.models.job import Job  
+from shared.models.media_asset import MediaAsset
 from shared.models.scrape_target import ScrapeTarget
+from urllib.parse import urlparse
 
 # Configure logging to include timestamps, log level, and message.
 logging.basicConfig(
@@ -22,6 +24,14 @@ logging.basicConfig(
 
 Base.metadata.create_all(bind=engine)
 
+# Pending Instagram image posts of one category are grouped into carousels once there are
+# at least this many (set to 0 to post every image on its own)
+CAROUSEL_MIN_SIZE = int(os.environ.get("INSTAGRAM_CAROUSEL_MIN_SIZE", "2"))
+CAROUSEL_MAX_SIZE = 10
+
+# Instagram tasks that publish a post and count against the publishing quota
+INSTAGRAM_PUBLISH_TASKS = ("post image instagram", "post carousel instagram", "publish video instagram")
+
 def add_job(task_name: str, scheduled_date: datetime.datetime):
     """
     Creates a new job entry in the job_scheduler table.
@@ -59,6 +69,131 @@ def get_next_monday(today: datetime.date) -> datetime.date:
     return today + datetime.timedelta(days=days_ahead)
 
 
+def get_asset_category(blob_url: str) -> str:
+    """
+    Returns the category of an asset from its blob URL
+    (https://<account>.blob.core.windows.net/<container>/<category>/images/<name>).
+    """
+    parts = urlparse(blob_url).path.strip("/").split("/")
+    return parts[1] if len(parts) > 2 else None
+
+def get_instagram_remaining_quota():
+    """
+    Asks the Instagram service how many posts can still be published in the current window.
+    Returns None if the service cannot be reached, in which case jobs are not deferred.
+    """
+    try:
+        response = requests.get("http://localhost:3003/publishing-quota", timeout=10)
+        response.raise_for_status()
+        return response.json().get("remaining")
+    except Exception as e:
+        logging.warning("Could not fetch the Instagram publishing quota: %s", e)
+        return None
+
+def was_published(response):
+    """
+    Returns whether an Instagram publish call actually published a post (and so used up quota),
+    as reported by the "published" field of its response.
+    """
+    try:
+        return response.status_code == 200 and bool(response.json().get("published"))
+    except ValueError:
+        return False
+
+def batch_carousel_jobs():
+    """
+    Groups the pending "post image instagram" jobs by category into "post carousel instagram" jobs.
+
+    The grouped jobs are held at status 1 with error_message "carousel:<carousel job id>" so they are
+    not posted individually; the Instagram service sets their final status when the carousel is posted.
+    Groups smaller than CAROUSEL_MIN_SIZE are left to be posted on their own.
+    """
+    if CAROUSEL_MIN_SIZE < 2:
+        return
+
+    now = datetime.datetime.now()
+    db_session = SessionLocal()
+    try:
+        pending_jobs = db_session.query(Job).filter(
+            Job.status == 0,
+            Job.scheduled_date <= now,
+            Job.task_name == "post image instagram"
+        ).order_by(Job.id).all()
+        if len(pending_jobs) < CAROUSEL_MIN_SIZE:
+            return
+
+        assets = {
+            str(asset.id): asset
+            for asset in db_session.query(MediaAsset).filter(MediaAsset.id.in_([job.task_id for job in pending_jobs]))
+        }
+        jobs_by_category = {}
+        for job in pending_jobs:
+            asset = assets.get(job.task_id)
+            category = get_asset_category(asset.media_blob_url) if asset else None
+            if category:
+                jobs_by_category.setdefault(category, []).append(job)
+
+        for category, jobs in jobs_by_category.items():
+            for start in range(0, len(jobs), CAROUSEL_MAX_SIZE):
+                group = jobs[start:start + CAROUSEL_MAX_SIZE]
+                if len(group) < CAROUSEL_MIN_SIZE:
+                    continue
+
+                carousel_job = Job(
+                    task_name="post carousel instagram",
+                    task_id=category,
+                    scheduled_date=now.date(),
+                    status=0,
+                    error_message=None,
+                    created_at=now,
+                    updated_at=now
+                )
+                db_session.add(carousel_job)
+                db_session.flush()
+
+                for job in group:
+                    job.status = 1
+                    job.error_message = f"carousel:{carousel_job.id}"
+                    job.updated_at = now
+                db_session.commit()
+                logging.info("Grouped %d '%s' images into carousel job %d", len(group), category, carousel_job.id)
+
+    except SQLAlchemyError as e:
+        db_session.rollback()
+        logging.error("Database error in batch_carousel_jobs: %s", e)
+    finally:
+        db_session.close()
+
+
+def fail_carousel_children(db_session, carousel_job_id, error):
+    """
+    Fails the "post image instagram" jobs grouped into a carousel job that could not be started,
+    so they do not stay held at status 1. The caller commits.
+    """
+    failed = db_session.query(Job).filter(
+        Job.error_message == f"carousel:{carousel_job_id}",
+        Job.status == 1
+    ).update({
+        Job.status: -1,
+        Job.error_message: f"Carousel {carousel_job_id} failed: {error}"[:255],
+        Job.updated_at: datetime.datetime.now()
+    }, synchronize_session=False)
+    if failed:
+        logging.error("Failed %d image jobs grouped into carousel job %d", failed, carousel_job_id)
+
+
+def sweep_video_generations():
+    """
+    Wakes media_gen's Runway monitor, which sweeps every outstanding video generation in the
+    background. The call returns at once, well within the one-minute interval.
+    """
+    try:
+        response = requests.post("http://localhost:3002/monitor-videos", timeout=30)
+        logging.info("Video sweep: HTTP %d %s", response.status_code, response.text)
+    except Exception as e:
+        logging.error("Exception while sweeping video generations: %s", e)
+
+
 def initiate_tasks():
     """
     Every 30 minutes, check the job_scheduler table for pending jobs whose scheduled date is now (or in the past).
@@ -66,6 +201,9 @@ def initiate_tasks():
     the job id as a path parameter. It then sends an HTTP GET request to the endpoint. On success, the job's status
     is updated to indicate completion; on failure, an error message is recorded.
     """
+    # Group pending Instagram image posts into carousels before dispatching.
+    batch_carousel_jobs()
+
     now = datetime.datetime.now()
     db_session = SessionLocal()
     try:
@@ -76,10 +214,23 @@ def initiate_tasks():
         ).all()
 
         logging.info("Found %d pending jobs to initiate.", len(pending_jobs))
+
+        # Fetched on the first Instagram post of the round
+        instagram_quota = None
+        instagram_quota_fetched = False
         
         for job in pending_jobs:
             task_lower = job.task_name.lower()
             url_to_call = None
+
+            # Leave Instagram posts pending while the publishing quota is used up
+            if task_lower in INSTAGRAM_PUBLISH_TASKS:
+                if not instagram_quota_fetched:
+                    instagram_quota = get_instagram_remaining_quota()
+                    instagram_quota_fetched = True
+                if instagram_quota is not None and instagram_quota <= 0:
+                    logging.info("Instagram publishing quota used up, deferring '%s' (ID: %d)", job.task_name, job.id)
+                    continue
             
             logging.info("Starting '%s' (ID: %d)", job.task_name, job.id)
             
@@ -95,21 +246,27 @@ def initiate_tasks():
             elif "insta scrape" == task_lower:
                 url_to_call = f"https://scraper.bluedune-c06522b4.uaenorth.azurecontainerapps.io/instagram_scrape/{job.id}"
             elif "create image" == task_lower:
-                url_to_call = f"http://localhost:3002/generate-image/{job.id}"
+                url_to_call = f"http://localhost:3002/generate-image/{job.id}?mode=async"
+            elif "create image batch" == task_lower:
+                url_to_call = f"http://localhost:3002/generate-image-batch/{job.id}?mode=async"
             elif "create video" == task_lower:
-                url_to_call = f"http://localhost:3002/generate-video/{job.id}"
+                url_to_call = f"http://localhost:3002/generate-video/{job.id}?mode=async"
             elif "monitor video" == task_lower:
-                url_to_call = f"http://localhost:3002/monitor-video/{job.id}"
+                url_to_call = f"http://localhost:3002/monitor-video/{job.id}?mode=async"
             elif "post image whatsapp" == task_lower:
                 url_to_call = f"http://localhost:3000/post-image/{job.id}"
             elif "post image instagram" == task_lower:
                     url_to_call = f"http://localhost:3003/post-image/{job.id}"
+            elif "post carousel instagram" == task_lower:
+                url_to_call = f"http://localhost:3003/post-carousel/{job.id}"
             elif "post video whatsapp" == task_lower:
                 url_to_call = f"http://localhost:3000/post-video/{job.id}"
             elif "post video instagram" == task_lower:
                     url_to_call = f"http://localhost:3003/post-video/{job.id}"      
+            elif "publish video instagram" == task_lower:
+                url_to_call = f"http://localhost:3003/publish-video/{job.id}"
             elif "create meme" == task_lower:
-                    url_to_call = f"http://localhost:3002/generate-meme/{job.id}" 
+                    url_to_call = f"http://localhost:3002/generate-meme/{job.id}?mode=async" 
             else:
                 logging.info("No matching endpoint for task: %s", job.task_name)
                 continue
@@ -118,15 +275,27 @@ def initiate_tasks():
             try:
                 response = requests.post(url_to_call)
 
-                if response.status_code != 200:
+                # Only posts that were actually published use up quota (a video may still be processing)
+                if task_lower in INSTAGRAM_PUBLISH_TASKS and instagram_quota is not None and was_published(response):
+                    instagram_quota -= 1
+
+                # 202 means the service accepted the job and will update its status itself
+                if response.status_code in (429, 503):
+                    # The service is busy or out of quota: leave the job pending for the next round
+                    job.status = 0
+                    logging.info("Service busy, deferring '%s' (ID: %d)", job.task_name, job.id)
+                elif response.status_code not in (200, 202):
                     job.status = -1
                     job.error_message = f"HTTP {response.status_code}"
-                    logging.error("Failed to initiate '%s' (ID: %d). HTTP %d", job.task_name, job.id, response.status_code, response.json())
+                    logging.error("Failed to initiate '%s' (ID: %d). HTTP %d %s", job.task_name, job.id, response.status_code, response.text)
             
             except Exception as e:
                 job.status = -1
-                job.error_message = str(e)
+                job.error_message = str(e)[:255]
                 logging.error("Exception while initiating '%s' (ID: %d): %s", job.task_name, job.id, e)
+
+            if job.status == -1 and task_lower == "post carousel instagram":
+                fail_carousel_children(db_session, job.id, job.error_message)
             
             job.updated_at = datetime.datetime.now()
             db_session.commit()
@@ -145,6 +314,7 @@ if __name__ == "__main__":
     # scheduler.add_job(create_weekly_instagram_jobs, 'cron', day_of_week='sun', hour=0, minute=0)
     # scheduler.add_job(create_weekly_scrape_jobs, 'cron', day_of_week='sun', hour=0, minute=0)
     scheduler.add_job(initiate_tasks, 'interval', minutes=0.5)
+    scheduler.add_job(sweep_video_generations, 'interval', minutes=1)
     
     # Optionally, run tasks immediately at startup for testing:
     # create_weekly_instagram_jobs()
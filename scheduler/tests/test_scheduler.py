@@ -0,0 +1,173 @@
+import os, sys
+import datetime
+import pytest
+
+pytest.importorskip("apscheduler")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+import scheduler.app as scheduler_app
+from shared.database import engine, SessionLocal
+from shared.models.base import Base
+from shared.models.job import Job
+from shared.models.media_asset import MediaAsset
+
+
+class FakeResponse:
+    def __init__(self, status_code, payload=None):
+        self.status_code = status_code
+        self.payload = payload or {}
+        self.text = str(self.payload)
+
+    def json(self):
+        return self.payload
+
+
+@pytest.fixture(scope='module', autouse=True)
+def database():
+    """
+    Creates the database tables for the tests and drops them afterwards.
+    """
+    Base.metadata.drop_all(bind=engine)
+    Base.metadata.create_all(bind=engine)
+    yield
+    Base.metadata.drop_all(bind=engine)
+
+@pytest.fixture
+def db_session():
+    """
+    Provides a database session.
+    """
+    db_session = SessionLocal()
+    yield db_session
+    db_session.close()
+
+@pytest.fixture
+def posts(monkeypatch):
+    """
+    Records the service calls made by the scheduler and answers them with `posts.status_code`.
+    """
+    class Posts(list):
+        status_code = 200
+        payload = {}
+    calls = Posts()
+    monkeypatch.setattr(scheduler_app.requests, "post",
+                        lambda url, **kwargs: calls.append(url) or FakeResponse(calls.status_code, calls.payload))
+    return calls
+
+def add_image_post(db_session, category):
+    now = datetime.datetime.now()
+    asset = MediaAsset(media_blob_url=f"https://account.blob.core.windows.net/media-gen/{category}/images/test.png",
+                       caption="caption", media_type="image")
+    db_session.add(asset)
+    db_session.flush()
+    job = Job(task_name="post image instagram", task_id=str(asset.id), status=0, scheduled_date=now,
+              error_message=None, created_at=now, updated_at=now)
+    db_session.add(job)
+    db_session.commit()
+    return job
+
+def reload(db_session, job):
+    db_session.expire_all()
+    return db_session.get(Job, job.id)
+
+# ---------------------------
+# Tests for carousel batching
+# ---------------------------
+
+def test_get_asset_category():
+    """The category is the first folder of the blob path."""
+    assert scheduler_app.get_asset_category("https://a.blob.core.windows.net/media-gen/sports/images/x.png") == "sports"
+    assert scheduler_app.get_asset_category("https://a.blob.core.windows.net/x.png") is None
+
+def test_images_grouped_by_category(monkeypatch, db_session):
+    """Pending image posts of one category are held at status 1 behind a carousel job."""
+    monkeypatch.setattr(scheduler_app, "CAROUSEL_MIN_SIZE", 2)
+    grouped = [add_image_post(db_session, "test-carousel-a") for _ in range(3)]
+    alone = add_image_post(db_session, "test-carousel-b")
+
+    scheduler_app.batch_carousel_jobs()
+
+    grouped = [reload(db_session, job) for job in grouped]
+    assert {job.status for job in grouped} == {1}
+    assert len({job.error_message for job in grouped}) == 1
+    carousel_id = int(grouped[0].error_message.split("carousel:")[1])
+    carousel = db_session.get(Job, carousel_id)
+    assert carousel.task_name == "post carousel instagram"
+    assert carousel.status == 0
+    assert reload(db_session, alone).status == 0
+
+def test_failed_carousel_fails_grouped_images(monkeypatch, db_session, posts):
+    """Image jobs held by a carousel that fails to start do not stay at status 1."""
+    monkeypatch.setattr(scheduler_app, "CAROUSEL_MIN_SIZE", 2)
+    monkeypatch.setattr(scheduler_app, "get_instagram_remaining_quota", lambda: None)
+    grouped = [add_image_post(db_session, "test-carousel-c") for _ in range(2)]
+    posts.status_code = 500
+
+    scheduler_app.initiate_tasks()
+
+    grouped = [reload(db_session, job) for job in grouped]
+    assert [job.status for job in grouped] == [-1, -1]
+    assert all(job.error_message.startswith("Carousel") for job in grouped)
+
+def test_busy_carousel_keeps_grouped_images(monkeypatch, db_session, posts):
+    """A carousel deferred by a busy service keeps its images grouped for the next round."""
+    monkeypatch.setattr(scheduler_app, "CAROUSEL_MIN_SIZE", 2)
+    monkeypatch.setattr(scheduler_app, "get_instagram_remaining_quota", lambda: None)
+    grouped = [add_image_post(db_session, "test-carousel-d") for _ in range(2)]
+    posts.status_code = 503
+
+    scheduler_app.initiate_tasks()
+
+    grouped = [reload(db_session, job) for job in grouped]
+    assert [job.status for job in grouped] == [1, 1]
+    carousel = db_session.get(Job, int(grouped[0].error_message.split("carousel:")[1]))
+    assert carousel.status == 0
+
+# ---------------------------
+# Tests for the Instagram publishing quota
+# ---------------------------
+
+def add_job(db_session, task_name, task_id="1"):
+    now = datetime.datetime.now()
+    job = Job(task_name=task_name, task_id=task_id, status=0, scheduled_date=now,
+              error_message=None, created_at=now, updated_at=now)
+    db_session.add(job)
+    db_session.commit()
+    return job
+
+def dispatched(posts, jobs):
+    return [job.id for job in jobs if any(url.split("?")[0].endswith(f"/{job.id}") for url in posts)]
+
+def test_published_posts_use_up_quota(monkeypatch, db_session, posts):
+    """Once the quota is used up by published posts, the remaining posts stay pending."""
+    monkeypatch.setattr(scheduler_app, "CAROUSEL_MIN_SIZE", 0)
+    monkeypatch.setattr(scheduler_app, "get_instagram_remaining_quota", lambda: 1)
+    jobs = [add_job(db_session, "publish video instagram", f"container-{index}") for index in range(2)]
+    posts.payload = {"published": True}
+
+    scheduler_app.initiate_tasks()
+
+    assert dispatched(posts, jobs) == [jobs[0].id]
+    assert reload(db_session, jobs[1]).status == 0
+
+def test_unpublished_polls_keep_quota(monkeypatch, db_session, posts):
+    """Publish polls of videos still processing do not use up quota."""
+    monkeypatch.setattr(scheduler_app, "CAROUSEL_MIN_SIZE", 0)
+    monkeypatch.setattr(scheduler_app, "get_instagram_remaining_quota", lambda: 1)
+    jobs = [add_job(db_session, "publish video instagram", f"container-{index}") for index in range(3)]
+    posts.payload = {"published": False}
+
+    scheduler_app.initiate_tasks()
+
+    assert dispatched(posts, jobs) == [job.id for job in jobs]
+
+def test_unknown_quota_does_not_defer(monkeypatch, db_session, posts):
+    """Posts are not deferred when the quota cannot be fetched."""
+    monkeypatch.setattr(scheduler_app, "CAROUSEL_MIN_SIZE", 0)
+    monkeypatch.setattr(scheduler_app, "get_instagram_remaining_quota", lambda: None)
+    jobs = [add_job(db_session, "publish video instagram", f"container-{index}") for index in range(2)]
+    posts.payload = {"published": True}
+
+    scheduler_app.initiate_tasks()
+
+    assert dispatched(posts, jobs) == [job.id for job in jobs]
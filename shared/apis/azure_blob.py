@@ -71,6 +71,47 @@ class AzureBlobManager:
             logging.error(f"Unexpected error during file upload: {e}")
             return None
 
+    def upload_bytes(self, data: bytes, file_name: str, file_type: str = "image", content_type: str = "image/png") -> dict:
+        """
+        Uploads in-memory content to Azure Blob Storage, without going through a local file.
+        Returns the same dictionary as `upload_file`.
+
+        :param data: The content to upload.
+        :param file_name: The name given to the file (used at the end of the blob name).
+        :param file_type: The type of file being uploaded (used for folder-like structuring). Default is "image".
+        :param content_type: The MIME type of the content.
+        :return: A dictionary with the blob details, or None if an error occurs.
+        """
+        if not data:
+            logging.error("No data provided for upload.")
+            return None
+
+        try:
+            blob_name = f"{file_type}s/{uuid.uuid4().hex}_{file_name}"
+            blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+            blob_client.upload_blob(data,
+                                    content_settings=ContentSettings(content_type=content_type),
+                                    overwrite=True)
+
+            blob_url = (
+                f"https://{self.blob_service_client.account_name}.blob.core.windows.net/"
+                f"{self.container_name}/{blob_name}"
+            )
+
+            logging.info(f"Data uploaded successfully: {blob_url}")
+
+            return {
+                "blob_url": blob_url,
+                "blob_id": blob_name,
+                "file_name": file_name
+            }
+        except AzureError as e:
+            logging.error(f"Azure Upload Error: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error during data upload: {e}")
+            return None
+
     def get_blob(self, blob_id: str) -> bytes:
         """
         Retrieves the blob content from Azure Blob Storage.
@@ -94,6 +135,51 @@ class AzureBlobManager:
             logging.error(f"Unexpected error during blob retrieval: {e}")
             return None
 
+    def list_blobs(self, prefix: str) -> list:
+        """
+        Lists the blobs whose name starts with a prefix.
+
+        :param prefix: The prefix (folder-like path) to list, e.g. "meme-templates/spicy/".
+        :return: The blob names, or None if an error occurs (so callers can tell it from an empty folder).
+        """
+        try:
+            container_client = self.blob_service_client.get_container_client(self.container_name)
+            return [blob.name for blob in container_client.list_blobs(name_starts_with=prefix)]
+        except AzureError as e:
+            logging.error(f"Azure List Error: {e}")
+            return None
+        except Exception as e:
+            logging.error(f"Unexpected error while listing blobs: {e}")
+            return None
+
+    def put_blob(self, blob_name: str, data: bytes, content_type: str = "image/png") -> bool:
+        """
+        Uploads in-memory content under an exact blob name, e.g. a meme template.
+        An existing blob with the same name is overwritten.
+
+        :param blob_name: The full name of the blob, e.g. "meme-templates/spicy/drake.jpg".
+        :param data: The content to upload.
+        :param content_type: The MIME type of the content.
+        :return: True if the upload is successful, False otherwise.
+        """
+        if not blob_name or not data:
+            logging.error("Invalid blob name or no data provided for upload.")
+            return False
+
+        try:
+            blob_client = self.blob_service_client.get_blob_client(container=self.container_name, blob=blob_name)
+            blob_client.upload_blob(data,
+                                    content_settings=ContentSettings(content_type=content_type),
+                                    overwrite=True)
+            logging.info(f"Blob uploaded successfully: {blob_name}")
+            return True
+        except AzureError as e:
+            logging.error(f"Azure Upload Error: {e}")
+            return False
+        except Exception as e:
+            logging.error(f"Unexpected error during blob upload: {e}")
+            return False
+
     def delete_blob(self, blob_id: str) -> bool:
         """
         Deletes the specified blob from Azure Blob Storage.
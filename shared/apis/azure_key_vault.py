@@ -17,3 +17,24 @@ class AzureKeyVault:
         secret_bundle = self.client.get_secret(secret_name)
         return secret_bundle.value
 
+
+
+    def get_secret_with_expiry(self, secret_name: str):
+        """
+        Retrieve a secret and its expiry date from the Azure Key Vault.
+
+        :param secret_name: The name of the secret to retrieve.
+        :return: A (value, expires_on) tuple; expires_on is a datetime or None.
+        """
+        secret_bundle = self.client.get_secret(secret_name)
+        return secret_bundle.value, secret_bundle.properties.expires_on
+
+    def set_secret(self, secret_name: str, value: str, expires_on=None):
+        """
+        Store a new version of a secret in the Azure Key Vault.
+
+        :param secret_name: The name of the secret to store.
+        :param value: The value of the secret.
+        :param expires_on: Optional datetime at which the secret expires.
+        """
+        self.client.set_secret(secret_name, value, expires_on=expires_on)
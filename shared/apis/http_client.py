@@ -0,0 +1,206 @@
+import threading
+import time
+import logging
+import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+
+class CircuitOpenError(requests.exceptions.RequestException):
+    """Raised instead of calling a vendor whose circuit breaker is open."""
+
+
+class RateLimitRetry(Retry):
+    """
+    Retry policy that never sends a request twice once the vendor may have processed it.
+
+    Connection errors and 429 responses are retried for every method, since the request
+    was not processed. Read errors and 5xx responses are only retried for the methods in
+    `allowed_methods`.
+    """
+
+    def is_retry(self, method, status_code, has_retry_after=False):
+        if status_code == 429 and self.total:
+            return True
+        return super().is_retry(method, status_code, has_retry_after)
+
+
+class CircuitBreaker:
+    """
+    Stops calls to a failing vendor for a while, so callers fail fast instead of
+    tying up workers on requests that are likely to time out.
+
+    After `failure_threshold` consecutive failures the circuit opens. Once
+    `reset_timeout` seconds have passed, one trial call is let through: the circuit
+    closes if it succeeds and opens again if it fails.
+    """
+
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        """
+        Args:
+            name (str): Name of the vendor, used in logs and errors.
+            failure_threshold (int): Consecutive failures that open the circuit.
+            reset_timeout (float): Seconds the circuit stays open before a trial call.
+        """
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.failures = 0
+        self.opened_at = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    def before_request(self):
+        """
+        Raises:
+            CircuitOpenError: If the circuit is open and no trial call is due.
+        """
+        with self._lock:
+            if self.opened_at is None:
+                return
+            if time.monotonic() - self.opened_at >= self.reset_timeout and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+        raise CircuitOpenError(f"Circuit open for {self.name}, not calling the vendor")
+
+    def record_success(self):
+        """Closes the circuit."""
+        with self._lock:
+            if self.opened_at is not None:
+                logging.info("Circuit for %s closed", self.name)
+            self.failures = 0
+            self.opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self):
+        """Counts a failure and opens the circuit once the threshold is reached."""
+        with self._lock:
+            self.failures += 1
+            if self._trial_in_flight or (self.opened_at is None and self.failures >= self.failure_threshold):
+                logging.warning("Circuit for %s opened after %d failures", self.name, self.failures)
+                self.opened_at = time.monotonic()
+                self._trial_in_flight = False
+
+    @property
+    def state(self):
+        """str: "closed", "open" or "half-open"."""
+        with self._lock:
+            if self.opened_at is None:
+                return "closed"
+            return "half-open" if self._trial_in_flight else "open"
+
+
+class VendorHttpClient:
+    """
+    Pooled HTTP session for one outbound vendor, with default timeouts, a retry budget
+    and a circuit breaker.
+
+    Connections (and TLS sessions) are kept alive and reused across calls. Connection
+    errors and 429 responses are retried for every method; read errors and 5xx responses
+    only for idempotent methods, so a paid generation request is never sent twice.
+    """
+
+    def __init__(self, name, pool_size=10, connect_timeout=5, read_timeout=60, max_retries=2,
+                 backoff_factor=0.5, failure_threshold=5, reset_timeout=30):
+        """
+        Args:
+            name (str): Name of the vendor, used in logs and errors.
+            pool_size (int): Maximum number of keep-alive connections per host.
+            connect_timeout (float): Seconds to wait when opening a connection.
+            read_timeout (float): Seconds to wait for a response.
+            max_retries (int): Retry budget per call.
+            backoff_factor (float): Base of the exponential backoff between retries.
+            failure_threshold (int): Consecutive failures that open the circuit breaker.
+            reset_timeout (float): Seconds the circuit stays open before a trial call.
+        """
+        self.name = name
+        self.timeout = (connect_timeout, read_timeout)
+        self.breaker = CircuitBreaker(name, failure_threshold, reset_timeout)
+
+        retry = RateLimitRetry(
+            total=max_retries,
+            backoff_factor=backoff_factor,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+            raise_on_status=False
+        )
+        adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+
+    def request(self, method, url, **kwargs):
+        """
+        Sends a request through the pooled session, with the client's timeouts unless given.
+
+        Args:
+            method (str): HTTP method.
+            url (str): URL to call.
+            **kwargs: Passed to requests.Session.request.
+
+        Returns:
+            requests.Response: The response.
+
+        Raises:
+            CircuitOpenError: If the vendor's circuit breaker is open.
+            requests.exceptions.RequestException: If the request fails.
+        """
+        self.breaker.before_request()
+        kwargs.setdefault("timeout", self.timeout)
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except requests.exceptions.RequestException:
+            self.breaker.record_failure()
+            raise
+
+        if response.status_code >= 500:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        return response
+
+    def get(self, url, **kwargs):
+        """Sends a GET request. See `request`."""
+        return self.request("GET", url, **kwargs)
+
+    def post(self, url, **kwargs):
+        """Sends a POST request. See `request`."""
+        return self.request("POST", url, **kwargs)
+
+    def stats(self):
+        """
+        Returns:
+            dict: The state of the circuit breaker and the current failure count.
+        """
+        return {"circuit": self.breaker.state, "failures": self.breaker.failures}
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def get_http_client(name, **kwargs):
+    """
+    Returns the shared client of a vendor, creating it on first use.
+
+    Args:
+        name (str): Name of the vendor.
+        **kwargs: Passed to VendorHttpClient when the client is created.
+
+    Returns:
+        VendorHttpClient: The vendor's client.
+    """
+    with _clients_lock:
+        if name not in _clients:
+            _clients[name] = VendorHttpClient(name, **kwargs)
+        return _clients[name]
+
+
+def http_client_stats():
+    """
+    Returns:
+        dict: The stats of every vendor client, by name.
+    """
+    with _clients_lock:
+        return {name: client.stats() for name, client in _clients.items()}
@@ -0,0 +1,11 @@
+from sqlalchemy import Column, Integer, String, DateTime, ForeignKey
+from shared.models.base import Base
+
+class BroadcastDelivery(Base):
+    __tablename__ = 'broadcast_delivery'
+
+    job_id = Column(Integer, ForeignKey('job.id', ondelete="CASCADE"), primary_key=True)
+    phone_number = Column(String(255), primary_key=True)
+    status = Column(Integer, nullable=False)  # 2 = delivered, -1 = failed
+    attempt = Column(Integer, nullable=False, default=1)
+    updated_at = Column(DateTime, nullable=False)
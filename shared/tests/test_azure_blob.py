@@ -0,0 +1,107 @@
+import os, sys
+import pytest
+
+pytest.importorskip("azure.storage.blob")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from azure.core.exceptions import AzureError
+from shared.apis.azure_blob import AzureBlobManager
+
+
+class FakeBlobClient:
+    def __init__(self, uploads, blob):
+        self.uploads = uploads
+        self.blob = blob
+
+    def upload_blob(self, data, content_settings=None, overwrite=False):
+        self.uploads[self.blob] = (data, content_settings.content_type)
+
+
+class FakeBlob:
+    def __init__(self, name):
+        self.name = name
+
+
+class FakeContainerClient:
+    def __init__(self, names, error):
+        self.names = names
+        self.error = error
+
+    def list_blobs(self, name_starts_with=None):
+        if self.error:
+            raise self.error
+        return [FakeBlob(name) for name in self.names if name.startswith(name_starts_with)]
+
+
+class FakeBlobServiceClient:
+    account_name = "account"
+
+    def __init__(self):
+        self.uploads = {}
+        self.names = []
+        self.list_error = None
+
+    def get_blob_client(self, container, blob):
+        return FakeBlobClient(self.uploads, f"{container}/{blob}")
+
+    def get_container_client(self, container):
+        return FakeContainerClient(self.names, self.list_error)
+
+
+@pytest.fixture
+def blob_manager():
+    """
+    Provides a blob manager whose storage account is replaced by an in-memory fake.
+    """
+    blob_manager = AzureBlobManager.__new__(AzureBlobManager)
+    blob_manager.container_name = "media-gen"
+    blob_manager.blob_service_client = FakeBlobServiceClient()
+    return blob_manager
+
+# ---------------------------
+# Tests for upload_bytes
+# ---------------------------
+
+def test_upload_bytes_without_local_file(blob_manager):
+    """In-memory content is uploaded with its content type under the file type folder."""
+    result = blob_manager.upload_bytes(b"png-bytes", "image.png", "sports/image", "image/png")
+    assert result["blob_id"].startswith("sports/images/")
+    assert result["blob_id"].endswith("_image.png")
+    assert result["blob_url"] == f"https://account.blob.core.windows.net/media-gen/{result['blob_id']}"
+    assert blob_manager.blob_service_client.uploads[f"media-gen/{result['blob_id']}"] == (b"png-bytes", "image/png")
+
+def test_upload_bytes_names_are_unique(blob_manager):
+    """Two uploads with the same file name never overwrite each other."""
+    first = blob_manager.upload_bytes(b"1", "image.png")
+    second = blob_manager.upload_bytes(b"2", "image.png")
+    assert first["blob_id"] != second["blob_id"]
+
+def test_upload_bytes_rejects_empty_content(blob_manager):
+    """Nothing is uploaded when there is no content."""
+    assert blob_manager.upload_bytes(b"", "image.png") is None
+    assert blob_manager.blob_service_client.uploads == {}
+
+# ---------------------------
+# Tests for list_blobs and put_blob
+# ---------------------------
+
+def test_list_blobs_by_prefix(blob_manager):
+    """Only the blobs under the prefix are listed."""
+    blob_manager.blob_service_client.names = ["meme-templates/spicy/a.jpg", "meme-templates/savage/b.jpg"]
+    assert blob_manager.list_blobs("meme-templates/spicy/") == ["meme-templates/spicy/a.jpg"]
+    assert blob_manager.list_blobs("meme-templates/wholesome/") == []
+
+def test_list_blobs_error_is_not_an_empty_folder(blob_manager):
+    """A listing error gives None, so callers do not mistake it for an empty folder."""
+    blob_manager.blob_service_client.list_error = AzureError("unavailable")
+    assert blob_manager.list_blobs("meme-templates/spicy/") is None
+
+def test_put_blob_keeps_the_name(blob_manager):
+    """Content is uploaded under the exact blob name given."""
+    assert blob_manager.put_blob("meme-templates/spicy/a.jpg", b"jpeg", "image/jpeg") is True
+    assert blob_manager.blob_service_client.uploads["media-gen/meme-templates/spicy/a.jpg"] == (b"jpeg", "image/jpeg")
+
+def test_put_blob_rejects_empty_content(blob_manager):
+    """Nothing is uploaded when there is no content."""
+    assert blob_manager.put_blob("meme-templates/spicy/a.jpg", b"") is False
+    assert blob_manager.blob_service_client.uploads == {}
@@ -0,0 +1,84 @@
+import os, sys
+import time
+import pytest
+
+pytest.importorskip("requests")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from shared.apis.http_client import CircuitBreaker, CircuitOpenError, VendorHttpClient, get_http_client
+
+
+# ---------------------------
+# CircuitBreaker Tests
+# ---------------------------
+
+def test_circuit_opens_after_threshold():
+    """Consecutive failures open the circuit and calls fail fast."""
+    breaker = CircuitBreaker("vendor", failure_threshold=2, reset_timeout=60)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+def test_success_resets_failure_count():
+    """A success between failures keeps the circuit closed."""
+    breaker = CircuitBreaker("vendor", failure_threshold=2)
+    breaker.record_failure()
+    breaker.record_success()
+    breaker.record_failure()
+    assert breaker.state == "closed"
+
+def test_single_trial_call_after_reset_timeout():
+    """Once the reset timeout passes, exactly one trial call goes through."""
+    breaker = CircuitBreaker("vendor", failure_threshold=1, reset_timeout=0.01)
+    breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_request()
+    assert breaker.state == "half-open"
+    with pytest.raises(CircuitOpenError):
+        breaker.before_request()
+
+def test_trial_success_closes_circuit():
+    """A successful trial call closes the circuit."""
+    breaker = CircuitBreaker("vendor", failure_threshold=1, reset_timeout=0)
+    breaker.record_failure()
+    breaker.before_request()
+    breaker.record_success()
+    assert breaker.state == "closed"
+    breaker.before_request()
+
+def test_trial_failure_reopens_circuit():
+    """A failed trial call opens the circuit again."""
+    breaker = CircuitBreaker("vendor", failure_threshold=3, reset_timeout=0.01)
+    for _ in range(3):
+        breaker.record_failure()
+    time.sleep(0.02)
+    breaker.before_request()
+    breaker.record_failure()
+    assert breaker.state == "open"
+
+
+# ---------------------------
+# VendorHttpClient Tests
+# ---------------------------
+
+def test_paid_requests_are_not_retried_on_server_errors():
+    """POSTs are retried on 429 only; GETs also on 5xx."""
+    retry = VendorHttpClient("test-vendor").session.get_adapter("https://vendor.example").max_retries
+    assert retry.is_retry("POST", 429)
+    assert not retry.is_retry("POST", 502)
+    assert retry.is_retry("GET", 502)
+
+def test_open_circuit_skips_the_network():
+    """A client whose circuit is open raises without sending the request."""
+    client = VendorHttpClient("test-open", failure_threshold=1)
+    client.breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        client.get("https://vendor.example")
+
+def test_clients_are_shared_by_name():
+    """The same vendor name returns the same pooled client."""
+    assert get_http_client("test-shared") is get_http_client("test-shared")
+    assert get_http_client("test-shared").stats() == {"circuit": "closed", "failures": 0}
@@ -0,0 +1,135 @@
+import threading
+import time
+import logging
+import numpy as np
+
+
+class SemanticAnswerCache:
+    """
+    Process-local cache of chatbot answers keyed by the meaning of the question.
+
+    Incoming questions are embedded and compared (cosine similarity) against the
+    questions answered recently. If a previous question is similar enough and its
+    answer is still fresh, that answer is returned instead of running the agent.
+    """
+
+    def __init__(self, embed_fn, similarity_threshold=0.95, ttl_seconds=3600, max_entries=2000):
+        """
+        Initializes the answer cache.
+
+        Args:
+            embed_fn (callable): Function that takes a string and returns its embedding (list of floats).
+            similarity_threshold (float): Minimum cosine similarity for a cached answer to be reused.
+            ttl_seconds (int): How long (in seconds) a cached answer stays fresh.
+            max_entries (int): Maximum number of answers kept; the oldest are evicted first.
+        """
+        self.embed_fn = embed_fn
+        self.similarity_threshold = similarity_threshold
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+
+        self._lock = threading.Lock()
+        self._entries = []  # [{"question", "answer", "created_at", "latency"}], oldest first
+        self._matrix = None  # Normalized embeddings, one row per entry
+
+        self.hits = 0
+        self.misses = 0
+        self.saved_seconds = 0.0
+
+    def embed(self, question):
+        """
+        Embeds a question and normalizes the vector so a dot product gives the cosine similarity.
+
+        Args:
+            question (str): The user's message.
+
+        Returns:
+            numpy.ndarray: The normalized embedding.
+        """
+        vector = np.asarray(self.embed_fn(question.strip().lower()), dtype=np.float32)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def lookup(self, embedding):
+        """
+        Returns the freshest cached answer whose question is similar enough to the given embedding.
+
+        Args:
+            embedding (numpy.ndarray): Normalized embedding returned by `embed`.
+
+        Returns:
+            str | None: The cached answer, or None on a miss.
+        """
+        started = time.monotonic()
+        with self._lock:
+            self._evict_expired()
+            if not self._entries:
+                self.misses += 1
+                return None
+
+            similarities = self._matrix @ embedding
+            best = int(np.argmax(similarities))
+            if similarities[best] < self.similarity_threshold:
+                self.misses += 1
+                return None
+
+            entry = self._entries[best]
+            self.hits += 1
+            self.saved_seconds += max(entry["latency"] - (time.monotonic() - started), 0.0)
+            logging.info("Answer cache hit (similarity %.3f) for question: %s", similarities[best], entry["question"])
+            return entry["answer"]
+
+    def store(self, embedding, question, answer, latency):
+        """
+        Adds an answer to the cache.
+
+        Args:
+            embedding (numpy.ndarray): Normalized embedding returned by `embed`.
+            question (str): The question that was answered.
+            answer (str): The agent's answer.
+            latency (float): How long (in seconds) the agent took to produce the answer.
+        """
+        with self._lock:
+            self._evict_expired()
+            self._entries.append({
+                "question": question,
+                "answer": answer,
+                "created_at": time.time(),
+                "latency": latency
+            })
+            row = embedding.reshape(1, -1)
+            self._matrix = row if self._matrix is None else np.vstack([self._matrix, row])
+
+            overflow = len(self._entries) - self.max_entries
+            if overflow > 0:
+                self._drop_oldest(overflow)
+
+    def stats(self):
+        """
+        Returns hit-rate and latency statistics for the cache.
+
+        Returns:
+            dict: Entry count, hits, misses, hit rate and total seconds saved.
+        """
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "entries": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+                "saved_seconds": round(self.saved_seconds, 3)
+            }
+
+    def _evict_expired(self):
+        # Entries are kept in insertion order, so expired ones are always at the front
+        cutoff = time.time() - self.ttl_seconds
+        expired = 0
+        while expired < len(self._entries) and self._entries[expired]["created_at"] < cutoff:
+            expired += 1
+        if expired:
+            self._drop_oldest(expired)
+
+    def _drop_oldest(self, count):
+        self._entries = self._entries[count:]
+        self._matrix = self._matrix[count:] if self._entries else None
@@ -1,21 +1,61 @@
 import requests
 import logging
+import mimetypes
+import os
+from urllib.parse import urlparse
+from requests.adapters import HTTPAdapter
+from shared.apis.http_client import RateLimitRetry
 
 class WhatsAppAPI:
-    def __init__(self, graph_api_token):
+    def __init__(self, graph_api_token, pool_size=20, connect_timeout=5, read_timeout=30, max_retries=3):
+        """
+        Initializes the WhatsApp Cloud API client.
+
+        All calls share one pooled HTTP session, so connections (and TLS handshakes) to
+        graph.facebook.com are reused across messages.
+
+        Args:
+            graph_api_token (str): Access token for the Graph API.
+            pool_size (int): Maximum number of keep-alive connections to the Graph API.
+            connect_timeout (float): Seconds to wait when opening a connection.
+            read_timeout (float): Seconds to wait for a response.
+            max_retries (int): Retries (with exponential backoff) on connection errors and 429
+                responses. Messages are POSTs, so 5xx responses and read errors are not retried:
+                the message may already have been sent.
+        """
         self.graph_api_token = graph_api_token
         self.business_phone_number_id = '427471850458639'
+        self.timeout = (connect_timeout, read_timeout)
 
-    def mark_message_as_read(self, message_id):
-        requests.post(
-            f"https://graph.facebook.com/v18.0/{self.business_phone_number_id}/messages",
-            headers={"Authorization": f"Bearer {self.graph_api_token}"},
-            json={
-                "messaging_product": "whatsapp",
-                "status": "read",
-                "message_id": message_id
-            }
+        retry = RateLimitRetry(
+            total=max_retries,
+            backoff_factor=0.5,
+            status_forcelist=[429, 500, 502, 503, 504],
+            allowed_methods=["GET", "HEAD"],
+            respect_retry_after_header=True,
+            raise_on_status=False
         )
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, max_retries=retry)
+        self.session = requests.Session()
+        self.session.mount("https://", adapter)
+        self.session.headers.update({"Authorization": f"Bearer {self.graph_api_token}"})
+
+    def _post(self, url, **kwargs):
+        """Sends a POST request through the pooled session with the client's timeouts."""
+        return self.session.post(url, timeout=self.timeout, **kwargs)
+
+    def mark_message_as_read(self, message_id):
+        try:
+            self._post(
+                f"https://graph.facebook.com/v18.0/{self.business_phone_number_id}/messages",
+                json={
+                    "messaging_product": "whatsapp",
+                    "status": "read",
+                    "message_id": message_id
+                }
+            )
+        except requests.exceptions.RequestException as err:
+            logging.error(f"Failed to mark message {message_id} as read: {err}")
     def reply_to_user(self, user_number, reply, message_id):
         """
         Sends a reply to a user via WhatsApp using the Meta Graph API.
@@ -32,9 +72,8 @@ class WhatsAppAPI:
         Returns:
             None
         """
-        requests.post(
+        self._post(
             f"https://graph.facebook.com/v18.0/{self.business_phone_number_id}/messages",
-            headers={"Authorization": f"Bearer {self.graph_api_token}"},
             json={
                 "messaging_product": "whatsapp",
                 "to": user_number,
@@ -43,7 +82,51 @@ class WhatsAppAPI:
             }
         )
 
-    def send_image(self, phone_number, template, image_url, caption):
+    def upload_media(self, file_bytes, mime_type, file_name="media"):
+        """
+        Uploads a media file to WhatsApp so it can be referenced by ID in later messages.
+
+        Parameters:
+        - file_bytes (bytes): Content of the file.
+        - mime_type (str): MIME type of the file (e.g. "image/png", "video/mp4").
+        - file_name (str): Name of the uploaded file.
+
+        Returns:
+        - str: The WhatsApp media ID.
+        """
+        url = f"https://graph.facebook.com/v22.0/{self.business_phone_number_id}/media"
+        response = self._post(
+            url,
+            data={"messaging_product": "whatsapp", "type": mime_type},
+            files={"file": (file_name, file_bytes, mime_type)}
+        )
+        response.raise_for_status()
+
+        media_id = response.json().get("id")
+        if not media_id:
+            raise ValueError("No media ID returned in response.")
+        logging.info(f"Media uploaded to WhatsApp with ID: {media_id}")
+        return media_id
+
+    def upload_media_from_url(self, media_url):
+        """
+        Downloads a media file (e.g. from Azure Blob Storage) and uploads it to WhatsApp.
+
+        Parameters:
+        - media_url (str): Public URL of the media file.
+
+        Returns:
+        - str: The WhatsApp media ID.
+        """
+        # Downloaded without the pooled session, which carries the Graph API token
+        response = requests.get(media_url, timeout=(self.timeout[0], 120))
+        response.raise_for_status()
+
+        file_name = os.path.basename(urlparse(media_url).path) or "media"
+        mime_type = response.headers.get("Content-Type") or mimetypes.guess_type(file_name)[0] or "application/octet-stream"
+        return self.upload_media(response.content, mime_type.split(";")[0], file_name)
+
+    def send_image(self, phone_number, template, image_url, caption, media_id=None):
         """
         Sends a WhatsApp message with an image to a user.
 
@@ -52,6 +135,7 @@ class WhatsAppAPI:
         - template (str): The name of the WhatsApp message template.
         - image_url (str): URL of the image to be included in the message header.
         - caption (str): Text to be included in the body of the message.
+        - media_id (str, optional): ID of the image uploaded with upload_media; used instead of image_url.
 
         Returns:
         - dict: Response from the WhatsApp API.
@@ -60,11 +144,6 @@ class WhatsAppAPI:
 
         url = f"https://graph.facebook.com/v22.0/{self.business_phone_number_id}/messages"
 
-        headers = {
-            "Authorization": f"Bearer {self.graph_api_token}",
-            "Content-Type": "application/json"
-        }
-
         data = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
@@ -81,9 +160,7 @@ class WhatsAppAPI:
                     "parameters": [
                     {
                         "type": "image",
-                        "image": {
-                        "link": image_url
-                        }
+                        "image": {"id": media_id} if media_id else {"link": image_url}
                     }
                     ]
                 },
@@ -104,7 +181,7 @@ class WhatsAppAPI:
             }
             }
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = self._post(url, json=data)
             response.raise_for_status()  # Raise an exception for HTTP errors (4xx, 5xx)
             return response.json(), response.status_code
         except requests.exceptions.HTTPError as http_err:
@@ -121,7 +198,7 @@ class WhatsAppAPI:
             return {"error": "An unexpected error occurred", "details": str(err)}, 500
         
 
-    def send_video(self, phone_number, video_url, caption):
+    def send_video(self, phone_number, video_url, caption, media_id=None):
         """
         Sends a WhatsApp message with a video to a user.
 
@@ -129,6 +206,7 @@ class WhatsAppAPI:
         - phone_number (str): The recipient's phone number in international format.
         - video_url (str): URL of the video to be sent.
         - caption (str): Caption text for the video.
+        - media_id (str, optional): ID of the video uploaded with upload_media; used instead of video_url.
 
         Returns:
         - dict: Response from the WhatsApp API.
@@ -136,24 +214,19 @@ class WhatsAppAPI:
         """
         url = f"https://graph.facebook.com/v22.0/{self.business_phone_number_id}/messages"
 
-        headers = {
-            "Authorization": f"Bearer {self.graph_api_token}",
-            "Content-Type": "application/json"
-        }
-
         data = {
             "messaging_product": "whatsapp",
             "recipient_type": "individual",
             "to": phone_number,
             "type": "video",
             "video": {
-                "link": video_url,
+                **({"id": media_id} if media_id else {"link": video_url}),
                 "caption": caption
             }
         }
 
         try:
-            response = requests.post(url, headers=headers, json=data)
+            response = self._post(url, json=data)
             response.raise_for_status()
             return response.json(), response.status_code
         except requests.exceptions.HTTPError as http_err:
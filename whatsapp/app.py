@@ -5,20 +5,30 @@ import os, sys
 from chromadb import HttpClient
 import chromadb.utils.embedding_functions as embedding_functions
 import datetime
-import asyncio
+import threading
+import time
 
 # Add the parent directory to sys.path to import local modules
 sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
-from subscriptionManager import subscribe_user, unsubscribe_user
+from subscriptionManager import subscribe_user, unsubscribe_user, iter_subscribers, subscription_index
 from apis.whatsapp_api import WhatsAppAPI
 from shared.apis.chatgpt_api import ChatGptApi  # Our ChatGPT API class
 from shared.apis.azure_key_vault import AzureKeyVault  # Our Key Vault access class
 from shared.models.job import Job
 from shared.models.media_asset import MediaAsset
 from shared.models.user_subscriptions import UserSubscriptions
-from shared.database import SessionLocal
+from shared.models.broadcast_delivery import BroadcastDelivery
+from shared.models.base import Base
+from shared.database import engine, SessionLocal
+from sqlalchemy import or_, func
+from sqlalchemy.dialects.mysql import insert
 from whatsapp.langchain_manager import LangChainManager
-import threading
+from whatsapp.answer_cache import SemanticAnswerCache
+from whatsapp.message_worker import MessageWorkerPool
+from whatsapp.inbound_queue import InboundMessageQueue, QueueDispatcher
+from whatsapp.dedup_cache import MessageDedupCache, SqliteDedupBackend
+from whatsapp.broadcast import BroadcastEngine
+from whatsapp.media_cache import MediaIdCache
 
 for handler in logging.root.handlers[:]:
     logging.root.removeHandler(handler)
@@ -33,6 +43,8 @@ logging.basicConfig(
 
 
 app = Flask(__name__)
+# Create tables if not created
+Base.metadata.create_all(bind=engine)
 
 # Initialize Azure Key Vault using the AzureKeyVault class
 vault = AzureKeyVault()  # uses default vault URL: "https://advising101vault.vault.azure.net"
@@ -44,7 +56,16 @@ openai_api_key = vault.get_secret("OPENAI-API-KEY")
 
 chatgpt_api = ChatGptApi(api_key=openai_api_key, model="gpt-4")
 whatsapp_api = WhatsAppAPI(graph_api_token=GRAPH_API_TOKEN)
-langchain_manager = LangChainManager(openai_api_key)
+
+# The semantic answer cache is opt-in: set WHATSAPP_ANSWER_CACHE=1 to enable it
+answer_cache = None
+if os.environ.get("WHATSAPP_ANSWER_CACHE", "0") == "1":
+    answer_cache = SemanticAnswerCache(
+        embed_fn=chatgpt_api.get_openai_embedding,
+        similarity_threshold=float(os.environ.get("WHATSAPP_ANSWER_CACHE_THRESHOLD", "0.95")),
+        ttl_seconds=int(os.environ.get("WHATSAPP_ANSWER_CACHE_TTL", "3600"))
+    )
+langchain_manager = LangChainManager(openai_api_key, answer_cache=answer_cache)
 
 # Initialize the vector database client and get the collection
 vector_client = HttpClient(host='20.203.61.164', port=8000)
@@ -54,10 +75,7 @@ collection = vector_client.get_collection(name="aub_embeddings",
         model_name="text-embedding-3-large")
         )
 
-def run_async_in_thread(coro):
-    asyncio.run(coro)
-
-async def process_user_message(user_number, message_text, message_id):
+def process_user_message(user_number, message_text, message_id):
     # Send "Working on it..."
     whatsapp_api.reply_to_user(user_number, "Working on it...", message_id)
 
@@ -71,6 +89,310 @@ async def process_user_message(user_number, message_text, message_id):
     # Reply to the user with the chatbot's response
     whatsapp_api.reply_to_user(user_number, chatbot_response, message_id)
 
+def handle_queued_message(user_number, message_text, message_id):
+    """
+    Processes a message taken from the durable inbound queue and records the outcome,
+    so that a message is only removed from the queue once it has been answered.
+    """
+    try:
+        process_user_message(user_number, message_text, message_id)
+    except Exception as e:
+        inbound_queue.mark_failed(message_id, e)
+        raise
+    inbound_queue.mark_done(message_id)
+
+# Sends post-image/post-video broadcasts concurrently, within Meta's per-number throughput
+broadcast_engine = BroadcastEngine(
+    max_workers=int(os.environ.get("WHATSAPP_BROADCAST_WORKERS", "16")),
+    messages_per_second=float(os.environ.get("WHATSAPP_BROADCAST_RATE", "80"))
+)
+
+# WhatsApp media IDs of uploaded assets, so each asset is uploaded once per broadcast instead of fetched per recipient
+media_id_cache = MediaIdCache()
+
+# A recipient is retried when a broadcast is resumed until it reaches this many failed attempts
+MAX_DELIVERY_ATTEMPTS = 3
+
+# A running broadcast holds a lease on its job (error_message "broadcast:<unix time>"), renewed by a
+# heartbeat. Jobs whose lease expired were interrupted and are resumed by any replica.
+BROADCAST_LEASE_SECONDS = int(os.environ.get("WHATSAPP_BROADCAST_LEASE_SECONDS", "300"))
+BROADCAST_HEARTBEAT_SECONDS = BROADCAST_LEASE_SECONDS / 3
+
+# Lease marker last written by this process, per job id of a running broadcast
+held_broadcast_leases = {}
+
+def broadcast_lease(timestamp):
+    """Returns the error_message marker of a broadcast lease taken at the given Unix time."""
+    # Zero-padded so that leases compare in time order as strings
+    return f"broadcast:{int(timestamp):012d}"
+
+def claim_broadcast_job(db_session, job_id):
+    """
+    Atomically takes the broadcast lease of a WhatsApp post job (status 1), unless a
+    live broadcast holds it. Commits the session.
+
+    Returns:
+        bool: True if the lease was taken, False if another broadcast of the job is running.
+    """
+    now = time.time()
+    claimed = db_session.query(Job).filter(
+        Job.id == job_id,
+        Job.status == 1,
+        or_(
+            Job.error_message.is_(None),
+            ~Job.error_message.like("broadcast:%"),
+            Job.error_message < broadcast_lease(now - BROADCAST_LEASE_SECONDS)
+        )
+    ).update({Job.error_message: broadcast_lease(now)}, synchronize_session=False)
+    db_session.commit()
+    if claimed == 1:
+        held_broadcast_leases[job_id] = broadcast_lease(now)
+    return claimed == 1
+
+def renew_broadcast_lease(job_id):
+    """
+    Renews the broadcast lease of a job, unless it was taken over by another replica
+    (after it expired) or the job was finished.
+
+    Returns:
+        bool: False if the lease is lost and the broadcast must stop, True otherwise.
+    """
+    held = held_broadcast_leases.get(job_id)
+    if not held:
+        return False
+
+    lease = broadcast_lease(time.time())
+    db_session = SessionLocal()
+    try:
+        renewed = db_session.query(Job).filter(
+            Job.id == job_id,
+            Job.status == 1,
+            Job.error_message == held
+        ).update({Job.error_message: lease}, synchronize_session=False)
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+    if renewed != 1:
+        logging.error("Broadcast lease of job %s was lost", job_id)
+        return False
+    held_broadcast_leases[job_id] = lease
+    return True
+
+def save_delivery_checkpoint(job_id, results):
+    """
+    Bulk-writes a batch of delivery results of a broadcast to the broadcast_delivery table.
+    Re-sending to a recipient (when a broadcast is resumed) overwrites its status and increments its attempt count.
+    """
+    now = datetime.datetime.now()
+    rows = [{
+        "job_id": job_id,
+        "phone_number": phone_number,
+        "status": 2 if 200 <= status_code < 300 else -1,
+        "attempt": 1,
+        "updated_at": now
+    } for phone_number, status_code in results]
+
+    statement = insert(BroadcastDelivery)
+    statement = statement.on_duplicate_key_update(
+        status=statement.inserted.status,
+        attempt=BroadcastDelivery.attempt + 1,
+        updated_at=statement.inserted.updated_at
+    )
+
+    db_session = SessionLocal()
+    try:
+        db_session.execute(statement, rows)
+        db_session.commit()
+    except Exception:
+        db_session.rollback()
+        raise
+    finally:
+        db_session.close()
+
+def finish_broadcast_job(job_id, summary):
+    """
+    Records the outcome of a finished broadcast on its job.
+    The job is completed (status 2) if at least one recipient was reached, including
+    recipients reached before the broadcast was resumed, and failed (status -1) otherwise.
+    Deliveries are counted from the checkpoints, and from the engine's counters in case
+    the last checkpoints could not be written; lost checkpoints are noted in error_message.
+    A broadcast that lost its lease leaves the job to the replica that took it over.
+    """
+    held = held_broadcast_leases.pop(job_id, None)
+    if summary["aborted"]:
+        return
+
+    db_session = SessionLocal()
+    try:
+        job = db_session.query(Job).filter(Job.id == job_id).first()
+        if not job:
+            raise Exception("Job not found")
+        if job.error_message != held:
+            logging.error("Broadcast lease of job %s was lost, leaving the job to its new owner", job_id)
+            return
+
+        delivered = db_session.query(func.count()).filter(
+            BroadcastDelivery.job_id == job_id,
+            BroadcastDelivery.status == 2
+        ).scalar()
+
+        job.status = 2 if delivered > 0 or summary["sent"] > 0 else -1
+        # Replaces the broadcast lease
+        problems = []
+        if summary["unsaved"]:
+            problems.append(f"Delivery checkpoints lost for {summary['unsaved']} recipients")
+        if summary["error"]:
+            problems.append(summary["error"])
+        elif summary["failed"]:
+            problems.append(f"{summary['failed']} of {summary['total']} deliveries failed")
+        job.error_message = "; ".join(problems)[:255] or None
+        job.updated_at = datetime.datetime.now().date()
+        db_session.commit()
+    except Exception as e:
+        db_session.rollback()
+        logging.error("Error while finishing broadcast job %s: %s", job_id, e)
+    finally:
+        db_session.close()
+
+def start_asset_broadcast(db_session, job):
+    """
+    Starts (or resumes) the broadcast of a "post image whatsapp" / "post video whatsapp" job.
+    - Retrieves the media asset using the job's task_id and validates it.
+    - Fetches user subscriptions for the default category.
+    - Skips recipients already reached (or out of attempts) according to the broadcast_delivery checkpoints.
+    - Starts the background fan-out, checkpointing delivery results in batches. Before the first send, the
+      broadcast thread uploads the asset to WhatsApp once (cached by asset id) so every message references
+      the same media ID. The job's broadcast lease is renewed on a heartbeat, and the fan-out stops if
+      another replica took the lease over.
+
+    Returns:
+        int: The number of users subscribed to the category.
+    """
+    # Retrieve the media asset using the job's task_id (asset id)
+    asset_id = job.task_id
+    asset = db_session.query(MediaAsset).filter_by(id=asset_id).first()
+    if not asset:
+        raise Exception("Asset not found")
+
+    if not asset.media_blob_url or not asset.caption:
+        raise Exception("Asset missing media blob URL or caption")
+
+    # Get category from payload if provided, default to "sports"
+    category = "sports"
+
+    # Target list from the in-memory subscription index, or streamed page by page from the database
+    if subscription_index.loaded:
+        subscribers = subscription_index.count(category)
+        targets = subscription_index.subscribers(category)
+    else:
+        subscribers = db_session.query(func.count()).filter(UserSubscriptions.category == category).scalar()
+        targets = iter_subscribers(category)
+    if not subscribers:
+        raise Exception("No user subscriptions found for category: " + category)
+
+    # Recipients checkpointed by an earlier, interrupted run of this broadcast
+    completed = {
+        row.phone_number for row in db_session.query(BroadcastDelivery.phone_number).filter(
+            BroadcastDelivery.job_id == job.id,
+            or_(BroadcastDelivery.status == 2, BroadcastDelivery.attempt >= MAX_DELIVERY_ATTEMPTS)
+        )
+    }
+    recipients = (phone_number for phone_number in targets if phone_number not in completed)
+
+    asset_id, media_blob_url, caption = asset.id, asset.media_blob_url, asset.caption
+
+    def upload_media():
+        # Runs in the broadcast thread: upload the asset to WhatsApp once and reference its media ID in every message
+        try:
+            return media_id_cache.get_or_upload(asset_id, lambda: whatsapp_api.upload_media_from_url(media_blob_url))
+        except Exception as e:
+            logging.warning("Media upload failed for asset %s, sending the blob link instead: %s", asset_id, e)
+            return None
+
+    if job.task_name.lower() == "post image whatsapp":
+        send_fn = lambda phone_number, media_id: whatsapp_api.send_image(phone_number, category, media_blob_url, caption, media_id=media_id)
+    else:
+        send_fn = lambda phone_number, media_id: whatsapp_api.send_video(phone_number, media_blob_url, caption, media_id=media_id)
+
+    started = broadcast_engine.start(
+        job.id,
+        whatsapp_api.business_phone_number_id,
+        recipients,
+        send_fn,
+        on_complete=finish_broadcast_job,
+        checkpoint_fn=save_delivery_checkpoint,
+        prepare_fn=upload_media,
+        heartbeat_fn=renew_broadcast_lease,
+        heartbeat_interval=BROADCAST_HEARTBEAT_SECONDS
+    )
+    if not started:
+        raise Exception("A broadcast is already running for this job")
+
+    if completed:
+        logging.info("Resuming broadcast for job %s, skipping %d recipients already handled", job.id, len(completed))
+    return subscribers
+
+def resume_interrupted_broadcasts():
+    """
+    Resumes the broadcasts of WhatsApp post jobs left in progress (status 1) by a stopped process.
+    Jobs whose broadcast lease is still live (running here, in another replica, or just
+    dispatched by the scheduler) are skipped.
+    """
+    db_session = SessionLocal()
+    try:
+        job_ids = [job_id for (job_id,) in db_session.query(Job.id).filter(
+            func.lower(Job.task_name).in_(["post image whatsapp", "post video whatsapp"]),
+            Job.status == 1
+        )]
+        for job_id in job_ids:
+            try:
+                if not claim_broadcast_job(db_session, job_id):
+                    continue
+                job = db_session.query(Job).filter(Job.id == job_id).first()
+                start_asset_broadcast(db_session, job)
+                logging.info("Resumed broadcast for job %s", job_id)
+            except Exception as e:
+                db_session.rollback()
+                logging.error("Could not resume broadcast for job %s: %s", job_id, e)
+    finally:
+        db_session.close()
+
+def run_broadcast_resumer():
+    """Resumes interrupted broadcasts at startup and then whenever a lease may have expired."""
+    while True:
+        resume_interrupted_broadcasts()
+        time.sleep(BROADCAST_LEASE_SECONDS)
+
+# Load the subscription index once and keep it reconciled with the database
+try:
+    subscription_index.load()
+except Exception as e:
+    logging.error("Could not load subscription index, falling back to database queries: %s", e)
+subscription_index.start_reconciler()
+
+# Drops webhook deliveries Meta retries; set WHATSAPP_DEDUP_SHARED_PATH to share it between processes
+dedup_backend = None
+if os.environ.get("WHATSAPP_DEDUP_SHARED_PATH"):
+    dedup_backend = SqliteDedupBackend(os.environ["WHATSAPP_DEDUP_SHARED_PATH"])
+dedup_cache = MessageDedupCache(backend=dedup_backend)
+
+# Durable queue: the webhook appends messages here and acknowledges immediately
+inbound_queue = InboundMessageQueue(os.environ.get("WHATSAPP_QUEUE_PATH", "tmp/inbound_messages.db"))
+
+# Fixed-size pool that runs the agent; each user's messages are processed in order on one worker
+worker_pool = MessageWorkerPool(
+    handle_queued_message,
+    num_workers=int(os.environ.get("WHATSAPP_WORKERS", "4")),
+    queue_size=int(os.environ.get("WHATSAPP_WORKER_QUEUE_SIZE", "100"))
+)
+
+# Drains the durable queue onto the worker pool (and replays messages interrupted by a restart)
+dispatcher = QueueDispatcher(inbound_queue, worker_pool)
+dispatcher.start()
 
 @app.route("/", methods=["POST"])
 def webhook():
@@ -96,25 +418,41 @@ def webhook():
         user_number = data['entry'][0]['changes'][0]['value']['messages'][0]['from']
         message_id = message['id']
 
-        # Mark message as read
-        whatsapp_api.mark_message_as_read(message_id)
+        # Drop retried deliveries before doing any Graph API or LLM work
+        if dedup_cache.is_duplicate(message_id):
+            logging.info("Duplicate delivery of message %s dropped", message_id)
+            return "Message already received", 200
+
+        try:
+            # Mark message as read
+            whatsapp_api.mark_message_as_read(message_id)
 
-        split_message = message_text.split(' ', 1)
-        category = split_message[1].lower() if len(split_message) > 1 else ""
-        if split_message[0].lower() == "subscribe":
-            result = subscribe_user(user_number, category)
-            whatsapp_api.reply_to_user(user_number, result[0], message_id)
-            return result
+            split_message = message_text.split(' ', 1)
+            category = split_message[1].lower() if len(split_message) > 1 else ""
+            if split_message[0].lower() == "subscribe":
+                result = subscribe_user(user_number, category)
+                whatsapp_api.reply_to_user(user_number, result[0], message_id)
+                return result
         
-        if split_message[0].lower() == "unsubscribe":
-            result = unsubscribe_user(user_number, category)
-            whatsapp_api.reply_to_user(user_number, result[0], message_id)
-            return result
+            if split_message[0].lower() == "unsubscribe":
+                result = unsubscribe_user(user_number, category)
+                whatsapp_api.reply_to_user(user_number, result[0], message_id)
+                return result
         
-        logging.info("Incoming message:" + message_text)
+            logging.info("Incoming message:" + message_text)
+
+            if not inbound_queue.enqueue(message_id, user_number, message_text):
+                logging.info("Message %s already queued, ignoring retried delivery", message_id)
+                return "Message already received", 200
+
+            dispatcher.wake()
+        except Exception as e:
+            # Forget the message so Meta's redelivery is processed instead of dropped as a duplicate
+            dedup_cache.forget(message_id)
+            logging.exception("Error while handling message %s: %s", message_id, e)
+            return "Error while handling message", 500
 
-        threading.Thread(target=run_async_in_thread, args=(process_user_message(user_number, message_text, message_id),)).start()
-        logging.info("Langchain agent running, sending 200 to cloud api")
+        logging.info("Message queued for langchain agent, sending 200 to cloud api")
     
     return "Replied to Message", 200
 
@@ -126,9 +464,9 @@ def post_image_whatsapp(job_id):
     - Queries the job with the given job_id and verifies that its task_name is "post image" and its status is 1.
     - Retrieves the media asset using the job's task_id.
     - Validates that the asset has both a media_blob_url and caption_blob_url.
-    - Fetches user subscriptions for the provided (or default) category.
-    - Calls the WhatsApp API to send a template message with the asset's details.
-    - Updates the job's status to 2 and commits the changes.
+    - Fetches user subscriptions for the provided (or default) category, skipping users already reached.
+    - Starts a background broadcast of the template message with the asset's details and returns 202.
+    - Once every subscriber has been tried, the job's status is updated to 2 (or -1 if no send succeeded).
     In case of an error, rolls back the transaction and returns an error message.
     """
     db_session = SessionLocal()
@@ -142,33 +480,15 @@ def post_image_whatsapp(job_id):
         if job.task_name.lower() != "post image whatsapp" or job.status != 1:
             raise Exception("Job is not valid for posting an image")
         
-        # Retrieve the media asset using the job's task_id (asset id)
-        asset_id = job.task_id
-        asset = db_session.query(MediaAsset).filter_by(id=asset_id).first()
-        if not asset:
-            raise Exception("Asset not found")
-        
-        if not asset.media_blob_url or not asset.caption:
-            raise Exception("Asset missing media blob URL or caption blob URL")
-        
-        # Get category from payload if provided, default to "sports"
-        category = "sports"
-        
-        # Query user subscriptions for the given category
-        users = db_session.query(UserSubscriptions).filter(UserSubscriptions.category == category).all()
-        if not users:
-            raise Exception("No user subscriptions found for category: " + category)
-        
-        # Call the WhatsApp API to send the template message to each subscribed user
-        for user in users:
-            whatsapp_api.send_image(user.phone_number, category, asset.media_blob_url, asset.caption)
-        
-        # Update job status to indicate successful processing (status 2)
-        job.status = 2
-        job.updated_at = datetime.datetime.now().date()
-        db_session.commit()
-        
-        return jsonify({"message": "Image posted successfully", "job_id": job.id}), 200
+        # The job is already being broadcast (e.g. resumed after a restart)
+        if not claim_broadcast_job(db_session, job.id):
+            return jsonify({"message": "Image broadcast already running", "job_id": job.id}), 202
+
+        # Send to every subscribed user in the background; the job status is
+        # updated by finish_broadcast_job once the fan-out completes
+        subscribers = start_asset_broadcast(db_session, job)
+
+        return jsonify({"message": "Image broadcast started", "job_id": job.id, "subscribers": subscribers}), 202
 
     except Exception as e:
         db_session.rollback()
@@ -185,9 +505,9 @@ def post_video_whatsapp(job_id):
     - Queries the job with the given job_id and verifies that its task_name is "post video whatsapp" and its status is 1.
     - Retrieves the media asset using the job's task_id.
     - Validates that the asset has both a media_blob_url and caption.
-    - Fetches user subscriptions for the provided (or default) category.
-    - Calls the WhatsApp API to send a video message with the asset's details.
-    - Updates the job's status to 2 and commits the changes.
+    - Fetches user subscriptions for the provided (or default) category, skipping users already reached.
+    - Starts a background broadcast of the video message with the asset's details and returns 202.
+    - Once every subscriber has been tried, the job's status is updated to 2 (or -1 if no send succeeded).
     In case of an error, rolls back the transaction and returns an error message.
     """
     db_session = SessionLocal()
@@ -201,33 +521,15 @@ def post_video_whatsapp(job_id):
         if job.task_name.lower() != "post video whatsapp" or job.status != 1:
             raise Exception("Job is not valid for posting a video")
         
-        # Retrieve the media asset using the job's task_id (asset id)
-        asset_id = job.task_id
-        asset = db_session.query(MediaAsset).filter_by(id=asset_id).first()
-        if not asset:
-            raise Exception("Asset not found")
-        
-        if not asset.media_blob_url or not asset.caption:
-            raise Exception("Asset missing media blob URL or caption")
-        
-        # Get category from payload if provided, default to "sports"
-        category = "sports"
-        
-        # Query user subscriptions for the given category
-        users = db_session.query(UserSubscriptions).filter(UserSubscriptions.category == category).all()
-        if not users:
-            raise Exception("No user subscriptions found for category: " + category)
-        
-        # Call the WhatsApp API to send the video message to each subscribed user
-        for user in users:
-            whatsapp_api.send_video(user.phone_number, asset.media_blob_url, asset.caption)
-        
-        # Update job status to indicate successful processing (status 2)
-        job.status = 2
-        job.updated_at = datetime.datetime.now().date()
-        db_session.commit()
-        
-        return jsonify({"message": "Video posted successfully", "job_id": job.id}), 200
+        # The job is already being broadcast (e.g. resumed after a restart)
+        if not claim_broadcast_job(db_session, job.id):
+            return jsonify({"message": "Video broadcast already running", "job_id": job.id}), 202
+
+        # Send to every subscribed user in the background; the job status is
+        # updated by finish_broadcast_job once the fan-out completes
+        subscribers = start_asset_broadcast(db_session, job)
+
+        return jsonify({"message": "Video broadcast started", "job_id": job.id, "subscribers": subscribers}), 202
 
     except Exception as e:
         db_session.rollback()
@@ -235,6 +537,33 @@ def post_video_whatsapp(job_id):
     finally:
         db_session.close()
 
+@app.route("/broadcasts/<int:job_id>", methods=["GET"])
+def get_broadcast_status(job_id):
+    """
+    Returns the delivery counters of the broadcast started for a post-image/post-video job.
+    Finished broadcasts are kept for an hour; per-recipient results are in the broadcast_delivery table.
+    """
+    status = broadcast_engine.status(job_id)
+    if not status:
+        return jsonify({"error": "Broadcast not found"}), 404
+    return jsonify(status), 200
+
+@app.route("/metrics", methods=["GET"])
+def metrics():
+    """
+    Returns runtime statistics for the WhatsApp service.
+    - answer_cache: hit rate and saved latency of the semantic answer cache (null when disabled).
+    - worker_pool: queue depth and throughput of the message worker pool.
+    - inbound_queue: number of durable queued messages in each state.
+    - dedup_cache: number of remembered message IDs and duplicate deliveries dropped.
+    """
+    return jsonify({
+        "answer_cache": answer_cache.stats() if answer_cache else None,
+        "worker_pool": worker_pool.stats(),
+        "inbound_queue": inbound_queue.stats(),
+        "dedup_cache": dedup_cache.stats()
+    }), 200
+
 @app.route("/", methods=["GET"])
 def verify_webhook():
     """
@@ -258,4 +587,5 @@ def verify_webhook():
         return "Forbidden", 403
 
 if __name__ == "__main__":
+    threading.Thread(target=run_broadcast_resumer, name="broadcast-resumer", daemon=True).start()
     app.run(host="0.0.0.0", port=3000)
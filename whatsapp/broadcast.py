@@ -0,0 +1,280 @@
+import threading
+import time
+import logging
+from concurrent.futures import ThreadPoolExecutor, wait
+
+
+class TokenBucket:
+    """
+    Thread-safe token bucket used to stay within a messages-per-second limit.
+    """
+
+    def __init__(self, rate, capacity=None):
+        """
+        Args:
+            rate (float): Tokens added per second.
+            capacity (float, optional): Maximum burst size (defaults to one second of tokens).
+        """
+        self.rate = rate
+        self.capacity = capacity or rate
+        self._tokens = self.capacity
+        self._updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self):
+        """Blocks until a token is available and consumes it."""
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self._tokens = min(self.capacity, self._tokens + (now - self._updated_at) * self.rate)
+                self._updated_at = now
+                if self._tokens >= 1:
+                    self._tokens -= 1
+                    return
+                wait = (1 - self._tokens) / self.rate
+            time.sleep(wait)
+
+
+class BroadcastEngine:
+    """
+    Sends one message to many WhatsApp subscribers concurrently, in the background.
+
+    Sends go through a shared thread pool and a token bucket per business phone
+    number ID, so the total rate stays within Meta's throughput limit. Only delivery
+    counters are kept in memory (per-recipient results go to `checkpoint_fn`), and
+    finished broadcasts are forgotten after `retention_seconds`.
+    """
+
+    def __init__(self, max_workers=16, messages_per_second=80, retention_seconds=3600,
+                 checkpoint_retry_delay=5.0, final_checkpoint_attempts=3):
+        """
+        Args:
+            max_workers (int): Maximum number of sends in flight at once.
+            messages_per_second (float): Send rate allowed per business phone number ID.
+            retention_seconds (float): How long the counters of a finished broadcast can still be queried.
+            checkpoint_retry_delay (float): Seconds before a failed checkpoint batch is written again.
+            final_checkpoint_attempts (int): Attempts at writing the last checkpoint batch of a broadcast.
+        """
+        self.max_workers = max_workers
+        self.messages_per_second = messages_per_second
+        self.retention_seconds = retention_seconds
+        self.checkpoint_retry_delay = checkpoint_retry_delay
+        self.final_checkpoint_attempts = final_checkpoint_attempts
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="broadcast")
+        self._buckets = {}
+        self._broadcasts = {}
+        self._checkpoints = {}  # job_id -> {"batch": results not yet checkpointed, "retry_at": monotonic time}
+        self._lock = threading.Lock()
+
+    def start(self, job_id, phone_number_id, recipients, send_fn, on_complete=None,
+              checkpoint_fn=None, checkpoint_every=200, prepare_fn=None, heartbeat_fn=None, heartbeat_interval=100):
+        """
+        Starts a broadcast in a background thread and returns immediately.
+
+        Args:
+            job_id (int): ID of the job the broadcast belongs to.
+            phone_number_id (str): Business phone number ID the messages are sent from.
+            recipients (iterable[str]): Phone numbers to send to.
+            send_fn (callable): Called as send_fn(phone_number), or send_fn(phone_number, prepared) when
+                prepare_fn is given; returns (response, status_code).
+            on_complete (callable, optional): Called as on_complete(job_id, summary) when all sends finish;
+                the summary has the total, sent and failed counters, the error that stopped the broadcast
+                early (if any), the number of results checkpoint_fn could not write ("unsaved") and
+                whether the broadcast was aborted by heartbeat_fn ("aborted").
+            checkpoint_fn (callable, optional): Called as checkpoint_fn(job_id, [(phone_number, status_code)])
+                with batches of delivery results, so that an interrupted broadcast can be resumed. A batch
+                that fails to be written is kept and written again with a later one.
+            checkpoint_every (int): Number of delivery results per checkpoint batch.
+            prepare_fn (callable, optional): Called as prepare_fn() in the background thread before the
+                first send, for slow setup such as uploading media; its result is passed to send_fn.
+            heartbeat_fn (callable, optional): Called as heartbeat_fn(job_id) every heartbeat_interval seconds
+                while the broadcast runs, for example to renew a lease. If it returns False the broadcast is
+                aborted: no further messages are sent, and results of sends already made are still reported.
+            heartbeat_interval (float): Seconds between two heartbeat_fn calls.
+
+        Returns:
+            bool: True if the broadcast was started, False if one is already running for this job.
+        """
+        with self._lock:
+            self._evict_finished()
+            current = self._broadcasts.get(job_id)
+            if current and not current["done"]:
+                return False
+            self._broadcasts[job_id] = {
+                "total": 0,
+                "sent": 0,
+                "failed": 0,
+                "done": False,
+                "aborted": False,
+                "started_at": time.time(),
+                "finished_at": None
+            }
+            self._checkpoints[job_id] = {"batch": [], "retry_at": 0.0}
+            bucket = self._buckets.setdefault(phone_number_id, TokenBucket(self.messages_per_second))
+
+        threading.Thread(
+            target=self._run,
+            args=(job_id, bucket, recipients, send_fn, on_complete, checkpoint_fn, checkpoint_every, prepare_fn,
+                  heartbeat_fn, heartbeat_interval),
+            name=f"broadcast-{job_id}",
+            daemon=True
+        ).start()
+        return True
+
+    def status(self, job_id):
+        """
+        Returns the progress of a broadcast.
+
+        Args:
+            job_id (int): ID of the job the broadcast belongs to.
+
+        Returns:
+            dict | None: Delivery counters and timestamps, or None if unknown (or finished and evicted).
+        """
+        with self._lock:
+            self._evict_finished()
+            broadcast = self._broadcasts.get(job_id)
+            if not broadcast:
+                return None
+            return dict(broadcast)
+
+    def _evict_finished(self):
+        # Called with the lock held
+        cutoff = time.time() - self.retention_seconds
+        for job_id in [job_id for job_id, broadcast in self._broadcasts.items()
+                       if broadcast["done"] and broadcast["finished_at"] < cutoff]:
+            del self._broadcasts[job_id]
+
+    def _run(self, job_id, bucket, recipients, send_fn, on_complete, checkpoint_fn, checkpoint_every, prepare_fn,
+             heartbeat_fn, heartbeat_interval):
+        broadcast = self._broadcasts[job_id]
+        checkpoint = None
+        if checkpoint_fn:
+            checkpoint = lambda final=False: self._checkpoint(job_id, checkpoint_fn, checkpoint_every, final)
+        finished = threading.Event()
+        aborted = threading.Event()
+        heartbeat = None
+        if heartbeat_fn:
+            heartbeat = threading.Thread(
+                target=self._heartbeat,
+                args=(job_id, heartbeat_fn, heartbeat_interval, finished, aborted),
+                name=f"broadcast-{job_id}-heartbeat",
+                daemon=True
+            )
+            heartbeat.start()
+        # Bounds the number of queued sends, so recipients are consumed lazily
+        in_flight = threading.BoundedSemaphore(self.max_workers * 2)
+        pending = []
+
+        try:
+            if prepare_fn:
+                prepared, prepared_send_fn = prepare_fn(), send_fn
+                send_fn = lambda phone_number: prepared_send_fn(phone_number, prepared)
+            for phone_number in recipients:
+                in_flight.acquire()
+                if aborted.is_set():
+                    in_flight.release()
+                    break
+                with self._lock:
+                    broadcast["total"] += 1
+                future = self._executor.submit(self._send, job_id, broadcast, bucket, phone_number, send_fn,
+                                               checkpoint, aborted)
+                future.add_done_callback(lambda _: in_flight.release())
+                pending.append(future)
+                pending = [f for f in pending if not f.done()]
+            for future in pending:
+                future.result()
+        except Exception as e:
+            logging.exception("Broadcast for job %s stopped early: %s", job_id, e)
+            with self._lock:
+                broadcast["error"] = str(e)
+
+        # Sends already submitted still report their results
+        wait(pending)
+
+        if checkpoint:
+            checkpoint(final=True)
+
+        finished.set()
+        if heartbeat:
+            heartbeat.join()
+
+        with self._lock:
+            # Results the last checkpoint could not write are only known from the counters
+            unsaved = len(self._checkpoints.pop(job_id)["batch"])
+            broadcast["done"] = True
+            broadcast["aborted"] = aborted.is_set()
+            broadcast["finished_at"] = time.time()
+            summary = {key: broadcast[key] for key in ("total", "sent", "failed")}
+            summary["error"] = broadcast.get("error")
+            summary["unsaved"] = unsaved
+            summary["aborted"] = broadcast["aborted"]
+        logging.info("Broadcast for job %s finished: %s", job_id, summary)
+
+        if on_complete:
+            try:
+                on_complete(job_id, summary)
+            except Exception as e:
+                logging.exception("Error while completing broadcast for job %s: %s", job_id, e)
+
+    def _heartbeat(self, job_id, heartbeat_fn, heartbeat_interval, finished, aborted):
+        while not finished.wait(heartbeat_interval):
+            try:
+                if heartbeat_fn(job_id) is False:
+                    logging.error("Broadcast for job %s lost its heartbeat, aborting", job_id)
+                    aborted.set()
+                    return
+            except Exception as e:
+                # A transient error is retried on the next beat rather than stopping the broadcast
+                logging.exception("Error in heartbeat of broadcast for job %s: %s", job_id, e)
+
+    def _send(self, job_id, broadcast, bucket, phone_number, send_fn, checkpoint, aborted):
+        bucket.acquire()
+        if aborted.is_set():
+            # Queued before the broadcast was aborted; left to whoever takes over the job
+            with self._lock:
+                broadcast["total"] -= 1
+            return
+        try:
+            _, status_code = send_fn(phone_number)
+        except Exception as e:
+            logging.error(f"Error sending broadcast message to {phone_number}: {e}")
+            status_code = 500
+
+        with self._lock:
+            if 200 <= status_code < 300:
+                broadcast["sent"] += 1
+            else:
+                broadcast["failed"] += 1
+            if checkpoint:
+                self._checkpoints[job_id]["batch"].append((phone_number, status_code))
+
+        if checkpoint:
+            checkpoint()
+
+    def _checkpoint(self, job_id, checkpoint_fn, checkpoint_every, final):
+        with self._lock:
+            pending = self._checkpoints[job_id]
+            batch = pending["batch"]
+            if not batch:
+                return
+            if not final and (len(batch) < checkpoint_every or time.monotonic() < pending["retry_at"]):
+                return
+            pending["batch"] = []
+
+        attempts = self.final_checkpoint_attempts if final else 1
+        for attempt in range(attempts):
+            try:
+                checkpoint_fn(job_id, batch)
+                return
+            except Exception as e:
+                logging.exception("Error while checkpointing broadcast for job %s: %s", job_id, e)
+                if attempt + 1 < attempts:
+                    time.sleep(self.checkpoint_retry_delay)
+
+        # Keep the results for the next flush rather than losing them
+        with self._lock:
+            pending["batch"] = batch + pending["batch"]
+            pending["retry_at"] = time.monotonic() + self.checkpoint_retry_delay
+        if final:
+            logging.error("%d delivery results of job %s could not be checkpointed", len(batch), job_id)
@@ -0,0 +1,142 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+
+
+class MessageDedupCache:
+    """
+    Time-bounded set of recently seen WhatsApp message IDs.
+
+    Meta retries webhook deliveries, so the same message can arrive several times.
+    The cache is an in-memory LRU (constant-time lookups and inserts) with an
+    optional shared backend, so that several processes on the same host agree on
+    which messages were already handled.
+    """
+
+    def __init__(self, max_size=10000, ttl_seconds=24 * 3600, backend=None):
+        """
+        Initializes the deduplication cache.
+
+        Args:
+            max_size (int): Maximum number of message IDs kept in memory.
+            ttl_seconds (int): How long (in seconds) a message ID is remembered.
+            backend (SqliteDedupBackend, optional): Shared store consulted when an ID is not in memory.
+        """
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self.backend = backend
+        self._seen = OrderedDict()  # message_id -> time first seen, oldest first
+        self._lock = threading.Lock()
+        self.duplicates = 0
+
+    def is_duplicate(self, message_id):
+        """
+        Records a message ID and reports whether it had already been seen.
+
+        Args:
+            message_id (str): The WhatsApp message ID.
+
+        Returns:
+            bool: True if the message was seen within the TTL, False if it is new.
+        """
+        now = time.monotonic()
+        with self._lock:
+            seen_at = self._seen.get(message_id)
+            if seen_at is not None and now - seen_at < self.ttl_seconds:
+                self.duplicates += 1
+                return True
+
+            self._seen[message_id] = now
+            self._seen.move_to_end(message_id)
+            self._evict(now)
+
+        if self.backend and not self.backend.add(message_id):
+            with self._lock:
+                self.duplicates += 1
+            return True
+        return False
+
+    def forget(self, message_id):
+        """
+        Removes a message ID, so a redelivery of a message that could not be handled is processed.
+
+        Args:
+            message_id (str): The WhatsApp message ID.
+        """
+        with self._lock:
+            self._seen.pop(message_id, None)
+        if self.backend:
+            self.backend.remove(message_id)
+
+    def stats(self):
+        """
+        Returns the cache size and the number of duplicates dropped.
+
+        Returns:
+            dict: Number of IDs in memory and duplicates detected.
+        """
+        with self._lock:
+            return {"entries": len(self._seen), "duplicates": self.duplicates}
+
+    def _evict(self, now):
+        while self._seen:
+            _, seen_at = next(iter(self._seen.items()))
+            if len(self._seen) <= self.max_size and now - seen_at < self.ttl_seconds:
+                break
+            self._seen.popitem(last=False)
+
+
+class SqliteDedupBackend:
+    """
+    Shared message-ID store in a SQLite database, for processes running on the same host.
+    """
+
+    def __init__(self, path, ttl_seconds=24 * 3600):
+        """
+        Args:
+            path (str): Location of the SQLite database file.
+            ttl_seconds (int): How long (in seconds) a message ID is remembered.
+        """
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        self._inserts = 0
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None, timeout=5)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS seen_message (message_id TEXT PRIMARY KEY, seen_at REAL NOT NULL)")
+
+    def add(self, message_id):
+        """
+        Records a message ID.
+
+        Args:
+            message_id (str): The WhatsApp message ID.
+
+        Returns:
+            bool: True if the ID was new, False if another process had already recorded it.
+        """
+        now = time.time()
+        with self._lock:
+            # An expired row is refreshed and counted as new, a live one is left untouched
+            cursor = self._conn.execute(
+                "INSERT INTO seen_message (message_id, seen_at) VALUES (?, ?) "
+                "ON CONFLICT(message_id) DO UPDATE SET seen_at = excluded.seen_at WHERE seen_message.seen_at < ?",
+                (message_id, now, now - self.ttl_seconds)
+            )
+            self._inserts += 1
+            if self._inserts % 1000 == 0:
+                self._conn.execute("DELETE FROM seen_message WHERE seen_at < ?", (now - self.ttl_seconds,))
+            return cursor.rowcount == 1
+
+    def remove(self, message_id):
+        """
+        Deletes a message ID.
+
+        Args:
+            message_id (str): The WhatsApp message ID.
+        """
+        with self._lock:
+            self._conn.execute("DELETE FROM seen_message WHERE message_id = ?", (message_id,))
@@ -0,0 +1,243 @@
+import os
+import sqlite3
+import threading
+import time
+import logging
+
+# Message statuses follow the same convention as the `job` table
+PENDING = 0
+IN_PROGRESS = 1
+DONE = 2
+FAILED = -1
+
+
+class InboundMessageQueue:
+    """
+    Durable queue of incoming WhatsApp messages backed by a local SQLite database in WAL mode.
+
+    The webhook appends every message before acknowledging it, so messages survive a
+    restart of the service. `message_id` is the primary key, which makes enqueueing
+    idempotent: a retried delivery of the same message is ignored.
+    """
+
+    def __init__(self, path="tmp/inbound_messages.db", max_attempts=3, retention_seconds=7 * 24 * 3600):
+        """
+        Opens (and creates if needed) the queue database.
+
+        Args:
+            path (str): Location of the SQLite database file.
+            max_attempts (int): Number of processing attempts before a message is marked as failed.
+            retention_seconds (int): How long processed messages are kept for deduplication.
+        """
+        self.path = path
+        self.max_attempts = max_attempts
+        self.retention_seconds = retention_seconds
+        self._lock = threading.Lock()
+
+        os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """
+            CREATE TABLE IF NOT EXISTS inbound_message (
+                seq INTEGER PRIMARY KEY AUTOINCREMENT,
+                message_id TEXT NOT NULL UNIQUE,
+                user_number TEXT NOT NULL,
+                message_text TEXT NOT NULL,
+                status INTEGER NOT NULL,
+                attempts INTEGER NOT NULL DEFAULT 0,
+                error_message TEXT,
+                created_at REAL NOT NULL,
+                updated_at REAL NOT NULL
+            )
+            """
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS ix_inbound_message_status ON inbound_message (status, seq)")
+
+    def enqueue(self, message_id, user_number, message_text):
+        """
+        Durably appends a message to the queue.
+
+        Args:
+            message_id (str): The WhatsApp message ID.
+            user_number (str): The sender's phone number.
+            message_text (str): The message body.
+
+        Returns:
+            bool: True if the message was added, False if it was already known (a retried delivery).
+        """
+        now = time.time()
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT OR IGNORE INTO inbound_message "
+                "(message_id, user_number, message_text, status, created_at, updated_at) VALUES (?, ?, ?, ?, ?, ?)",
+                (message_id, user_number, message_text, PENDING, now, now)
+            )
+            return cursor.rowcount == 1
+
+    def claim_pending(self, limit=50):
+        """
+        Marks the oldest pending messages as in progress and returns them in arrival order.
+
+        Args:
+            limit (int): Maximum number of messages to claim.
+
+        Returns:
+            list[tuple]: (message_id, user_number, message_text) for every claimed message.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT message_id, user_number, message_text FROM inbound_message "
+                    "WHERE status = ? ORDER BY seq LIMIT ?",
+                    (PENDING, limit)
+                ).fetchall()
+                self._conn.executemany(
+                    "UPDATE inbound_message SET status = ?, updated_at = ? WHERE message_id = ?",
+                    [(IN_PROGRESS, time.time(), row[0]) for row in rows]
+                )
+                self._conn.execute("COMMIT")
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+        return rows
+
+    def mark_done(self, message_id):
+        """Marks a message as successfully processed."""
+        self._set_status(message_id, DONE)
+
+    def release(self, message_id):
+        """Returns a claimed message to the queue without counting an attempt."""
+        self._set_status(message_id, PENDING)
+
+    def mark_failed(self, message_id, error):
+        """
+        Records a failed processing attempt. The message is retried until it reaches `max_attempts`.
+
+        Args:
+            message_id (str): The WhatsApp message ID.
+            error (str): Description of the failure.
+        """
+        with self._lock:
+            self._conn.execute(
+                "UPDATE inbound_message SET attempts = attempts + 1, error_message = ?, updated_at = ?, "
+                "status = CASE WHEN attempts + 1 >= ? THEN ? ELSE ? END WHERE message_id = ?",
+                (str(error)[:255], time.time(), self.max_attempts, FAILED, PENDING, message_id)
+            )
+
+    def requeue_in_progress(self):
+        """
+        Returns messages that were in progress when the service stopped to the pending state.
+
+        Returns:
+            int: Number of messages requeued.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "UPDATE inbound_message SET status = ?, updated_at = ? WHERE status = ?",
+                (PENDING, time.time(), IN_PROGRESS)
+            )
+            return cursor.rowcount
+
+    def purge_processed(self):
+        """
+        Deletes processed and failed messages older than the retention period.
+
+        Returns:
+            int: Number of messages deleted.
+        """
+        with self._lock:
+            cursor = self._conn.execute(
+                "DELETE FROM inbound_message WHERE status IN (?, ?) AND updated_at < ?",
+                (DONE, FAILED, time.time() - self.retention_seconds)
+            )
+            return cursor.rowcount
+
+    def stats(self):
+        """
+        Returns the number of messages in each state.
+
+        Returns:
+            dict: Counts of pending, in-progress, done and failed messages.
+        """
+        with self._lock:
+            counts = dict(self._conn.execute("SELECT status, COUNT(*) FROM inbound_message GROUP BY status").fetchall())
+        return {
+            "pending": counts.get(PENDING, 0),
+            "in_progress": counts.get(IN_PROGRESS, 0),
+            "done": counts.get(DONE, 0),
+            "failed": counts.get(FAILED, 0)
+        }
+
+    def _set_status(self, message_id, status):
+        with self._lock:
+            self._conn.execute(
+                "UPDATE inbound_message SET status = ?, updated_at = ? WHERE message_id = ?",
+                (status, time.time(), message_id)
+            )
+
+
+class QueueDispatcher:
+    """
+    Background thread that moves pending messages from the durable queue onto the worker pool.
+
+    Submitting to the pool blocks while the user's lane is full, so bursts of traffic
+    wait in the durable queue rather than in memory.
+    """
+
+    def __init__(self, inbound_queue, worker_pool, batch_size=50, poll_interval=1.0, submit_timeout=5.0):
+        """
+        Args:
+            inbound_queue (InboundMessageQueue): The durable queue to drain.
+            worker_pool (MessageWorkerPool): The pool that processes the messages.
+            batch_size (int): Number of messages claimed per round.
+            poll_interval (float): Seconds to wait for new messages when the queue is empty.
+            submit_timeout (float): Seconds to wait for space on a worker lane before retrying later.
+        """
+        self.inbound_queue = inbound_queue
+        self.worker_pool = worker_pool
+        self.batch_size = batch_size
+        self.poll_interval = poll_interval
+        self.submit_timeout = submit_timeout
+        self._wake = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="inbound-dispatcher", daemon=True)
+
+    def start(self):
+        """Requeues messages interrupted by a previous shutdown and starts dispatching."""
+        requeued = self.inbound_queue.requeue_in_progress()
+        if requeued:
+            logging.info("Requeued %d messages interrupted by the last shutdown", requeued)
+        self._thread.start()
+
+    def wake(self):
+        """Signals that new messages were enqueued."""
+        self._wake.set()
+
+    def _run(self):
+        last_purge = 0.0
+        while True:
+            self._wake.wait(self.poll_interval)
+            self._wake.clear()
+
+            try:
+                if time.time() - last_purge > 3600:
+                    self.inbound_queue.purge_processed()
+                    last_purge = time.time()
+                self._dispatch_pending()
+            except Exception as e:
+                logging.exception("Error while dispatching inbound messages: %s", e)
+
+    def _dispatch_pending(self):
+        while True:
+            rows = self.inbound_queue.claim_pending(self.batch_size)
+            if not rows:
+                return
+
+            for index, (message_id, user_number, message_text) in enumerate(rows):
+                if not self.worker_pool.submit(user_number, message_text, message_id, block=True, timeout=self.submit_timeout):
+                    # Workers are saturated: hand the rest back and try again on the next round
+                    for unsent_id, _, _ in rows[index:]:
+                        self.inbound_queue.release(unsent_id)
+                    return
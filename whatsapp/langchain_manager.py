@@ -5,6 +5,7 @@ from langchain.chat_models import ChatOpenAI
 from langchain.memory import ConversationBufferWindowMemory
 from langchain.prompts import MessagesPlaceholder
 import re
+import time
 
 for handler in logging.root.handlers[:]:
     logging.root.removeHandler(handler)
@@ -46,9 +47,10 @@ Do not mention that you are using the VectorDB tool or referring to context or c
 
 
 class LangChainManager:
-    def __init__(self, openai_api_key):
+    def __init__(self, openai_api_key, answer_cache=None):
         self.openai_api_key = openai_api_key
         self.user_agents = {}  # Stores one agent per user
+        self.answer_cache = answer_cache  # Optional SemanticAnswerCache, disabled when None
     
     def get_user_agent(self, user_phone_number, collection):
         """
@@ -154,12 +156,37 @@ class LangChainManager:
         """
         Uses the agent for the given user to generate a response to the message_text.
         The agent will automatically leverage conversation memory and call the retrieval tool as needed.
+        If an answer cache is configured, the first message of a conversation is answered from the
+        cache when a sufficiently similar question was answered recently. Follow-up messages depend
+        on the user's own conversation memory, so they always go to the agent.
         """
         try:
             logging.info("Received from "+ str(user_phone_number) +" message: "+str(message_text))
             agent = self.get_user_agent(user_phone_number, collection)
+
+            embedding = None
+            if self.answer_cache and not agent.memory.chat_memory.messages:
+                try:
+                    embedding = self.answer_cache.embed(message_text)
+                    cached_response = self.answer_cache.lookup(embedding)
+                except Exception as e:
+                    # The cache is an optimization: fall back to the agent
+                    logging.error("Answer cache lookup failed: "+ str(e))
+                    embedding, cached_response = None, None
+                if cached_response:
+                    # Keep the user's conversation memory coherent for follow-up questions
+                    agent.memory.save_context({"input": message_text}, {"output": cached_response})
+                    return cached_response
+
+            started = time.monotonic()
             response = agent.run(message_text)
             logging.info("Responded to message from "+ str(user_phone_number) +": \n Original message: "+str(message_text)+"\n Response: "+str(response))
+
+            if embedding is not None:
+                try:
+                    self.answer_cache.store(embedding, message_text, response, time.monotonic() - started)
+                except Exception as e:
+                    logging.error("Answer cache store failed: "+ str(e))
             return response
         except ValueError as e:
             response = str(e)
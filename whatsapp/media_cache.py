@@ -0,0 +1,67 @@
+import threading
+import time
+import logging
+
+
+class MediaIdCache:
+    """
+    Maps media asset IDs to the WhatsApp media IDs they were uploaded as.
+
+    Each asset is uploaded to WhatsApp once and its media ID is reused for every
+    recipient of a broadcast, instead of Meta fetching the blob once per message.
+    WhatsApp keeps uploaded media for 30 days, so entries expire shortly before that.
+    """
+
+    def __init__(self, ttl_seconds=29 * 24 * 3600):
+        """
+        Args:
+            ttl_seconds (int): How long (in seconds) a media ID is reused.
+        """
+        self.ttl_seconds = ttl_seconds
+        self._media_ids = {}  # asset_id -> (media_id, expires_at)
+        self._lock = threading.Lock()
+        self._upload_locks = {}  # asset_id -> lock held while the asset is being uploaded
+
+    def get(self, asset_id):
+        """
+        Returns the cached media ID of an asset, or None if it is unknown or expired.
+        """
+        with self._lock:
+            entry = self._media_ids.get(asset_id)
+            if entry and entry[1] > time.time():
+                return entry[0]
+            self._media_ids.pop(asset_id, None)
+            return None
+
+    def get_or_upload(self, asset_id, upload_fn):
+        """
+        Returns the media ID of an asset, uploading it first if needed.
+
+        Args:
+            asset_id (int | str): ID of the media asset.
+            upload_fn (callable): Uploads the asset and returns its WhatsApp media ID.
+
+        Returns:
+            str: The WhatsApp media ID.
+        """
+        media_id = self.get(asset_id)
+        if media_id:
+            return media_id
+
+        # Concurrent broadcasts of the same asset upload it only once; other assets are not blocked
+        with self._lock:
+            upload_lock = self._upload_locks.setdefault(asset_id, threading.Lock())
+        with upload_lock:
+            media_id = self.get(asset_id)
+            if media_id:
+                return media_id
+
+            try:
+                media_id = upload_fn()
+                with self._lock:
+                    self._media_ids[asset_id] = (media_id, time.time() + self.ttl_seconds)
+            finally:
+                with self._lock:
+                    self._upload_locks.pop(asset_id, None)
+            logging.info("Cached WhatsApp media ID %s for asset %s", media_id, asset_id)
+            return media_id
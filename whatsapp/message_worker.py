@@ -0,0 +1,124 @@
+import threading
+import queue
+import zlib
+import logging
+
+
+class MessageWorkerPool:
+    """
+    Fixed-size pool of worker threads that process incoming WhatsApp messages.
+
+    Every worker owns a bounded queue (a "lane"). Messages are routed to a lane by
+    hashing the user's phone number, so one user's messages are always handled by
+    the same worker, in the order they arrived. When a lane is full, `submit`
+    refuses the message instead of letting the backlog grow without limit.
+    """
+
+    def __init__(self, handler, num_workers=4, queue_size=100):
+        """
+        Initializes and starts the worker threads.
+
+        Args:
+            handler (callable): Function called as handler(user_number, *args) for every message.
+            num_workers (int): Number of worker threads (and lanes).
+            queue_size (int): Maximum number of messages waiting in each lane.
+        """
+        self.handler = handler
+        self.queue_size = queue_size
+        self._lanes = [queue.Queue(maxsize=queue_size) for _ in range(num_workers)]
+        self._lock = threading.Lock()
+
+        self.submitted = 0
+        self.rejected = 0
+        self.processed = 0
+        self.failed = 0
+        self.active = 0
+
+        self._threads = []
+        for index, lane in enumerate(self._lanes):
+            thread = threading.Thread(target=self._run, args=(lane,), name=f"message-worker-{index}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def submit(self, user_number, *args, block=False, timeout=None):
+        """
+        Queues a message for processing on the user's lane.
+
+        Args:
+            user_number (str): The sender's phone number, used to pick the lane.
+            *args: Extra arguments passed to the handler.
+            block (bool): Wait for space in the lane instead of failing immediately.
+            timeout (float | None): Maximum seconds to wait when block is True.
+
+        Returns:
+            bool: True if the message was queued, False if the lane is full.
+        """
+        lane = self._lanes[zlib.crc32(user_number.encode()) % len(self._lanes)]
+        try:
+            lane.put((user_number, args), block=block, timeout=timeout)
+        except queue.Full:
+            with self._lock:
+                self.rejected += 1
+            logging.warning("Worker lane full, rejecting message from %s", user_number)
+            return False
+
+        with self._lock:
+            self.submitted += 1
+        return True
+
+    def stats(self):
+        """
+        Returns queue-depth and throughput counters for the pool.
+
+        Returns:
+            dict: Per-lane queue depth, total depth, capacity and message counters.
+        """
+        depths = [lane.qsize() for lane in self._lanes]
+        with self._lock:
+            return {
+                "workers": len(self._lanes),
+                "queue_depths": depths,
+                "queue_depth": sum(depths),
+                "queue_capacity": self.queue_size * len(self._lanes),
+                "active": self.active,
+                "submitted": self.submitted,
+                "rejected": self.rejected,
+                "processed": self.processed,
+                "failed": self.failed
+            }
+
+    def shutdown(self, wait=True):
+        """
+        Stops the workers once the messages already queued have been processed.
+
+        Args:
+            wait (bool): Block until every worker thread has exited.
+        """
+        for lane in self._lanes:
+            lane.put(None)
+        if wait:
+            for thread in self._threads:
+                thread.join()
+
+    def _run(self, lane):
+        while True:
+            item = lane.get()
+            if item is None:
+                lane.task_done()
+                return
+
+            user_number, args = item
+            with self._lock:
+                self.active += 1
+            try:
+                self.handler(user_number, *args)
+                with self._lock:
+                    self.processed += 1
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                logging.exception("Error while processing message from %s: %s", user_number, e)
+            finally:
+                with self._lock:
+                    self.active -= 1
+                lane.task_done()
@@ -3,17 +3,48 @@ sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..')))
 from shared.database import SessionLocal
 from shared.models.user_subscriptions import UserSubscriptions
 from shared.models.users import Users
+from whatsapp.subscription_index import SubscriptionIndex
+from sqlalchemy import func
 from sqlalchemy.exc import IntegrityError
+from sqlalchemy.dialects.mysql import insert
 import logging
 
+def iter_all_subscriptions(batch_size=1000):
+    """
+    Yields (phone_number, category) for every subscription, streamed in batches.
+    """
+    db_session = SessionLocal()
+    try:
+        query = db_session.query(UserSubscriptions.phone_number, UserSubscriptions.category)
+        for row in query.yield_per(batch_size):
+            yield row.phone_number, row.category
+    finally:
+        db_session.close()
+
+def count_all_subscriptions():
+    """
+    Returns:
+        int: The number of subscriptions in the database.
+    """
+    db_session = SessionLocal()
+    try:
+        return db_session.query(func.count()).select_from(UserSubscriptions).scalar()
+    finally:
+        db_session.close()
+
+# Process-local category -> phone numbers index used for broadcast target lists, kept coherent by
+# subscribe_user/subscribe_many/unsubscribe_user and reloaded when the subscription count in the
+# database changes (e.g. after a CRUD import). It is loaded (and its reconciler started) by the
+# WhatsApp service at startup; other processes never load it, so their writes through it are dropped.
+subscription_index = SubscriptionIndex(iter_all_subscriptions, count_fn=count_all_subscriptions)
+
 def subscribe_user(user_number, category):
     """
     Subscribes a user to a specific category.
     
-    This function checks if the user exists in the database. If not, it creates a new user entry.
-    Then, it verifies if the user is already subscribed to the given category. If they are,
-    it returns a message indicating the subscription already exists. Otherwise, it creates
-    a new subscription entry in the database.
+    The user and the subscription are created with `INSERT IGNORE` statements in a single
+    transaction, so an existing user or subscription is left untouched. If the subscription
+    already existed, a message indicating so is returned.
     
     Args:
         user_number (str): The phone number of the user.
@@ -27,26 +58,16 @@ def subscribe_user(user_number, category):
     """
     db_session = SessionLocal()
     try:
-        # Check if user exists
-        user = db_session.get(Users, user_number)
-
-        if not user:
-            # Create new user
-            user = Users(phone_number=user_number)
-            db_session.add(user)
-            db_session.commit()  # Commit to generate the user entry
-
-        # Check if subscription already exists
-        existing_subscription = db_session.get(UserSubscriptions, (user_number, category))
-
-        if existing_subscription:
-            return "Subscription Already Exists", 200
-
-        # Add new subscription
-        subscription = UserSubscriptions(phone_number=user_number, category=category)
-        db_session.add(subscription)
+        # Create the user and the subscription unless they already exist, in one transaction
+        db_session.execute(insert(Users).prefix_with("IGNORE").values(phone_number=user_number))
+        result = db_session.execute(
+            insert(UserSubscriptions).prefix_with("IGNORE").values(phone_number=user_number, category=category)
+        )
         db_session.commit()
+        subscription_index.add(user_number, category)
 
+        if result.rowcount == 0:
+            return "Subscription Already Exists", 200
         return f"Subscription to {category} successful", 200
 
     except IntegrityError as e:
@@ -60,6 +81,70 @@ def subscribe_user(user_number, category):
     finally:
         db_session.close()
 
+def subscribe_many(users, category, chunk_size=1000, counts=None):
+    """
+    Subscribes many users to a category at once (e.g. for admin imports).
+    
+    Users and subscriptions are inserted in chunks with multi-row `INSERT IGNORE`
+    statements, all in one transaction; existing users and subscriptions are skipped.
+    The subscription index is written through once the transaction is committed.
+    
+    Args:
+        users (iterable[str | tuple[str, str]]): The phone numbers of the users, or
+            (phone_number, name) pairs; names are only set on the users created here.
+        category (str | None): The category to subscribe them to; None only creates the users.
+        chunk_size (int): Number of rows per insert statement.
+        counts (dict, optional): Incremented with "users_created" and "subscriptions_created".
+    
+    Returns:
+        tuple: A message string and an HTTP status code, as for `subscribe_user`.
+        - "Subscription Already Exists", 200: If every user was already subscribed.
+        - "Subscription to {category} successful", 200: If at least one subscription was created.
+        - "Users created", 200: If no category was given.
+        - "Please try again later", 503: If an unexpected error occurs.
+    """
+    names = {}
+    for user in users:
+        phone_number, name = user if isinstance(user, tuple) else (user, None)
+        names.setdefault(phone_number, name)  # Drop duplicates, keep order and the first name
+    phone_numbers = list(names)
+
+    db_session = SessionLocal()
+    try:
+        users_created = subscriptions_created = 0
+        for i in range(0, len(phone_numbers), chunk_size):
+            chunk = phone_numbers[i:i + chunk_size]
+            users_created += db_session.execute(
+                insert(Users).prefix_with("IGNORE"),
+                [{"phone_number": phone_number, "name": names[phone_number]} for phone_number in chunk]
+            ).rowcount
+            if category:
+                subscriptions_created += db_session.execute(
+                    insert(UserSubscriptions).prefix_with("IGNORE"),
+                    [{"phone_number": phone_number, "category": category} for phone_number in chunk]
+                ).rowcount
+        db_session.commit()
+
+        if counts is not None:
+            counts["users_created"] = counts.get("users_created", 0) + users_created
+            counts["subscriptions_created"] = counts.get("subscriptions_created", 0) + subscriptions_created
+
+        if not category:
+            return "Users created", 200
+        for phone_number in phone_numbers:
+            subscription_index.add(phone_number, category)
+
+        if subscriptions_created == 0:
+            return "Subscription Already Exists", 200
+        return f"Subscription to {category} successful", 200
+
+    except Exception as e:
+        db_session.rollback()
+        logging.error(e)
+        return "Please try again later", 503
+    finally:
+        db_session.close()
+
 def unsubscribe_user(user_number, category):
     """
     Unsubscribes a user from a specific category.
@@ -84,19 +169,22 @@ def unsubscribe_user(user_number, category):
     """
     db_session = SessionLocal()
     try:
-        # Check if the user exists
+        # Check if the user exists; the database is authoritative, the index is corrected if it was stale
         user = db_session.get(Users, user_number)
         if not user:
+            subscription_index.remove(user_number, category)
             return "You are not subscribed to anything", 200
 
         # Check if the subscription exists
         subscription = db_session.get(UserSubscriptions, (user_number, category))
         if not subscription:
+            subscription_index.remove(user_number, category)
             return "You are not subscribed to this category", 200
 
         # Delete the subscription
         db_session.delete(subscription)
         db_session.commit()
+        subscription_index.remove(user_number, category)
 
         return f"Unsubscribed from {category} successfully", 200
 
@@ -110,3 +198,39 @@ def unsubscribe_user(user_number, category):
         return "Please try again later", 503
     finally:
         db_session.close()
+
+def iter_subscribers(category, page_size=500):
+    """
+    Yields the phone numbers subscribed to a category, one page at a time.
+
+    Subscriptions are read with keyset pagination on `phone_number` (each page starts
+    after the last number of the previous one), so memory use stays constant and the
+    caller can start working as soon as the first page arrives. Every page uses its
+    own short-lived session, so no connection is held while the caller processes it.
+
+    Args:
+        category (str): The subscription category.
+        page_size (int): Number of subscriptions fetched per query.
+
+    Yields:
+        str: The phone number of a subscribed user, in ascending order.
+    """
+    last_phone_number = None
+    while True:
+        db_session = SessionLocal()
+        try:
+            query = db_session.query(UserSubscriptions.phone_number).filter(UserSubscriptions.category == category)
+            if last_phone_number is not None:
+                query = query.filter(UserSubscriptions.phone_number > last_phone_number)
+            page = [
+                row.phone_number
+                for row in query.order_by(UserSubscriptions.phone_number).limit(page_size).yield_per(page_size)
+            ]
+        finally:
+            db_session.close()
+
+        yield from page
+
+        if len(page) < page_size:
+            return
+        last_phone_number = page[-1]
@@ -0,0 +1,150 @@
+import threading
+import time
+import logging
+
+
+class SubscriptionIndex:
+    """
+    Process-local index of subscriptions: category -> set of phone numbers.
+
+    The index is loaded once from the database and kept coherent by write-through from
+    subscribe/unsubscribe. Changes made by other processes (other replicas, CRUD imports)
+    are picked up by comparing the number of subscriptions in the database with the
+    index every `check_interval` seconds and reloading when they differ, plus a full
+    reload every `reconcile_interval` seconds. In between it can be stale, so it only
+    serves broadcast target lists; replies to subscribe/unsubscribe commands are always
+    checked against the database.
+
+    Writes made before the index is first loaded are dropped, so processes that never
+    load it (e.g. the CRUD service importing subscriptions) do not accumulate them.
+    """
+
+    def __init__(self, load_fn, reconcile_interval=300, count_fn=None, check_interval=10):
+        """
+        Args:
+            load_fn (callable): Returns an iterable of (phone_number, category) for every subscription.
+            reconcile_interval (float): Seconds between two full reloads from the database.
+            count_fn (callable, optional): Returns the number of subscriptions in the database.
+            check_interval (float): Seconds between two comparisons of count_fn with the index.
+        """
+        self.load_fn = load_fn
+        self.reconcile_interval = reconcile_interval
+        self.count_fn = count_fn
+        self.check_interval = check_interval
+        self.loaded = False
+        self._loaded_at = None
+        self._by_category = {}
+        self._lock = threading.Lock()
+        # Writes made while a reload is running, replayed on top of the reloaded data
+        self._writes_during_reload = None
+        self._stop = threading.Event()
+
+    def load(self):
+        """
+        (Re)builds the index from the database.
+        """
+        with self._lock:
+            self._writes_during_reload = []
+
+        by_category = {}
+        try:
+            for phone_number, category in self.load_fn():
+                by_category.setdefault(category, set()).add(phone_number)
+        except Exception:
+            with self._lock:
+                self._writes_during_reload = None
+            raise
+
+        with self._lock:
+            writes, self._writes_during_reload = self._writes_during_reload, None
+            self._by_category = by_category
+            for subscribed, phone_number, category in writes:
+                self._apply(subscribed, phone_number, category)
+            self.loaded = True
+            self._loaded_at = time.monotonic()
+        logging.info("Subscription index loaded: %d categories, %d subscriptions",
+                     len(by_category), sum(len(phone_numbers) for phone_numbers in by_category.values()))
+
+    def add(self, phone_number, category):
+        """Records a subscription (write-through after a successful commit)."""
+        self._write(True, phone_number, category)
+
+    def remove(self, phone_number, category):
+        """Removes a subscription (write-through after a successful commit)."""
+        self._write(False, phone_number, category)
+
+    def subscribers(self, category):
+        """
+        Yields the phone numbers subscribed to the category (in no particular order), from a
+        snapshot taken on the first iteration.
+
+        Yields:
+            str: The phone number of a subscribed user.
+        """
+        with self._lock:
+            snapshot = tuple(self._by_category.get(category, ()))
+        yield from snapshot
+
+    def count(self, category):
+        """
+        Returns:
+            int: The number of users subscribed to the category.
+        """
+        with self._lock:
+            return len(self._by_category.get(category, ()))
+
+    def total(self):
+        """
+        Returns:
+            int: The number of subscriptions in the index.
+        """
+        with self._lock:
+            return sum(len(phone_numbers) for phone_numbers in self._by_category.values())
+
+    def refresh(self):
+        """
+        Reloads the index if it was never loaded, if `reconcile_interval` seconds passed
+        since the last load, or if the database holds a different number of subscriptions.
+
+        Returns:
+            bool: Whether the index was reloaded.
+        """
+        due = not self.loaded or time.monotonic() - self._loaded_at >= self.reconcile_interval
+        if not due and self.count_fn is not None:
+            due = self.count_fn() != self.total()
+        if due:
+            self.load()
+        return due
+
+    def start_reconciler(self):
+        """Starts a background thread that calls `refresh` every `check_interval` seconds."""
+        threading.Thread(target=self._reconcile_loop, name="subscription-reconciler", daemon=True).start()
+
+    def stop(self):
+        """Stops the reconciler thread."""
+        self._stop.set()
+
+    def _reconcile_loop(self):
+        interval = self.check_interval if self.count_fn is not None else self.reconcile_interval
+        while not self._stop.wait(interval):
+            try:
+                self.refresh()
+            except Exception as e:
+                logging.error("Error while reconciling subscription index: %s", e)
+
+    def _write(self, subscribed, phone_number, category):
+        with self._lock:
+            if not self.loaded and self._writes_during_reload is None:
+                return
+            if self._writes_during_reload is not None:
+                self._writes_during_reload.append((subscribed, phone_number, category))
+            self._apply(subscribed, phone_number, category)
+
+    def _apply(self, subscribed, phone_number, category):
+        if subscribed:
+            self._by_category.setdefault(category, set()).add(phone_number)
+            return
+
+        self._by_category.get(category, set()).discard(phone_number)
+        if not self._by_category.get(category, True):
+            del self._by_category[category]
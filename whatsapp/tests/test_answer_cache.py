@@ -0,0 +1,102 @@
+import os, sys
+import pytest
+
+np = pytest.importorskip("numpy")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.answer_cache import SemanticAnswerCache
+
+
+def fake_embedding(text):
+    # Questions mentioning "price" point one way, everything else the other
+    return [1.0, 0.0] if "price" in text else [0.0, 1.0]
+
+
+class FakeMemory:
+    def __init__(self):
+        self.chat_memory = type("ChatMemory", (), {"messages": []})()
+
+    def save_context(self, inputs, outputs):
+        self.chat_memory.messages += [inputs["input"], outputs["output"]]
+
+
+class FakeAgent:
+    def __init__(self, answer):
+        self.answer = answer
+        self.memory = FakeMemory()
+        self.calls = 0
+
+    def run(self, message_text):
+        self.calls += 1
+        self.memory.save_context({"input": message_text}, {"output": self.answer})
+        return self.answer
+
+
+@pytest.fixture
+def cache():
+    return SemanticAnswerCache(embed_fn=fake_embedding, similarity_threshold=0.9, ttl_seconds=60)
+
+
+def make_manager(cache, agents):
+    pytest.importorskip("langchain")
+    from whatsapp.langchain_manager import LangChainManager
+    manager = LangChainManager("test-key", answer_cache=cache)
+    manager.user_agents.update(agents)
+    return manager
+
+
+# ---------------------------
+# SemanticAnswerCache Tests
+# ---------------------------
+
+def test_lookup_returns_similar_answer(cache):
+    """A similar question is answered from the cache."""
+    cache.store(cache.embed("What is the price?"), "What is the price?", "10 EUR", 2.0)
+    assert cache.lookup(cache.embed("price please")) == "10 EUR"
+    assert cache.lookup(cache.embed("Where are you?")) is None
+    assert cache.stats()["hits"] == 1
+    assert cache.stats()["misses"] == 1
+
+def test_expired_answers_are_not_returned(cache):
+    """Answers older than the TTL are evicted."""
+    cache.ttl_seconds = -1
+    cache.store(cache.embed("price"), "price", "10 EUR", 1.0)
+    assert cache.lookup(cache.embed("price")) is None
+    assert cache.stats()["entries"] == 0
+
+def test_max_entries_drops_oldest(cache):
+    """The oldest answers are dropped first once the cache is full."""
+    cache.max_entries = 1
+    cache.store(cache.embed("price"), "price", "old", 1.0)
+    cache.store(cache.embed("hours"), "hours", "new", 1.0)
+    assert cache.lookup(cache.embed("price")) is None
+    assert cache.lookup(cache.embed("hours")) == "new"
+
+
+# ---------------------------
+# LangChainManager Cache Tests
+# ---------------------------
+
+def test_follow_up_questions_bypass_the_cache(cache):
+    """Only the first message of a conversation is answered from the shared cache."""
+    first, second = FakeAgent("Alice's answer"), FakeAgent("Bob's answer")
+    manager = make_manager(cache, {"alice": first, "bob": second})
+
+    assert manager.get_response_from_gpt("price?", None, "alice") == "Alice's answer"
+    assert manager.get_response_from_gpt("price?", None, "bob") == "Alice's answer"
+    assert second.calls == 0
+
+    # Bob now has history, so his follow-up depends on his own context
+    assert manager.get_response_from_gpt("price?", None, "bob") == "Bob's answer"
+    assert second.calls == 1
+
+def test_cache_failure_falls_back_to_agent(cache):
+    """An embedding error does not prevent the agent from answering."""
+    def broken_embedding(text):
+        raise RuntimeError("embedding service down")
+    cache.embed_fn = broken_embedding
+    agent = FakeAgent("answer")
+    manager = make_manager(cache, {"alice": agent})
+
+    assert manager.get_response_from_gpt("price?", None, "alice") == "answer"
+    assert agent.calls == 1
@@ -0,0 +1,220 @@
+import os, sys
+import threading
+import time
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.broadcast import TokenBucket, BroadcastEngine
+
+
+def run_broadcast(engine, job_id, recipients, send_fn, **kwargs):
+    """Starts a broadcast and waits for it to finish, returning its summary."""
+    finished = threading.Event()
+    summaries = []
+
+    def on_complete(job_id, summary):
+        summaries.append(summary)
+        finished.set()
+
+    assert engine.start(job_id, "phone-id", recipients, send_fn, on_complete=on_complete, **kwargs)
+    assert finished.wait(5)
+    return summaries[0]
+
+
+# ---------------------------
+# TokenBucket Tests
+# ---------------------------
+
+def test_bucket_allows_burst_up_to_capacity():
+    """A full bucket hands out its capacity without waiting."""
+    bucket = TokenBucket(rate=1000, capacity=5)
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started < 0.05
+
+def test_bucket_limits_rate():
+    """Once empty, tokens are handed out at the configured rate."""
+    bucket = TokenBucket(rate=50, capacity=1)
+    bucket.acquire()
+    started = time.monotonic()
+    for _ in range(5):
+        bucket.acquire()
+    assert time.monotonic() - started >= 0.08
+
+
+# ---------------------------
+# BroadcastEngine Tests
+# ---------------------------
+
+def test_broadcast_counts_deliveries():
+    """Successful and failed sends are counted, without keeping per-recipient results."""
+    engine = BroadcastEngine(max_workers=4, messages_per_second=1000)
+    send_fn = lambda phone_number: ({}, 200 if phone_number != "+3" else 500)
+
+    summary = run_broadcast(engine, 1, ["+1", "+2", "+3"], send_fn)
+    assert summary == {"total": 3, "sent": 2, "failed": 1, "error": None, "unsaved": 0, "aborted": False}
+
+    status = engine.status(1)
+    assert status["done"]
+    assert "results" not in status
+
+def test_send_exception_counts_as_failure():
+    """A send that raises is recorded as a failed delivery."""
+    engine = BroadcastEngine(max_workers=2, messages_per_second=1000)
+    def send_fn(phone_number):
+        raise RuntimeError("network down")
+
+    summary = run_broadcast(engine, 1, ["+1"], send_fn)
+    assert summary["failed"] == 1
+
+def test_running_broadcast_cannot_be_started_twice():
+    """A second start for a job whose broadcast is still running is refused."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000)
+    release = threading.Event()
+    send_fn = lambda phone_number: (release.wait(5), 200)
+
+    assert engine.start(1, "phone-id", ["+1"], send_fn)
+    assert not engine.start(1, "phone-id", ["+1"], send_fn)
+    release.set()
+
+def test_finished_broadcasts_are_evicted():
+    """Finished broadcasts are forgotten once the retention period has passed."""
+    engine = BroadcastEngine(max_workers=2, messages_per_second=1000, retention_seconds=0)
+    run_broadcast(engine, 1, ["+1"], lambda phone_number: ({}, 200))
+    time.sleep(0.01)
+    assert engine.status(1) is None
+    assert engine._checkpoints == {}
+
+
+# ---------------------------
+# Checkpoint Tests
+# ---------------------------
+
+def test_results_are_checkpointed_in_batches():
+    """Delivery results are written in batches, with the remainder flushed at the end."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000)
+    batches = []
+    recipients = [f"+{index}" for index in range(5)]
+
+    run_broadcast(engine, 1, recipients, lambda phone_number: ({}, 200),
+                  checkpoint_fn=lambda job_id, batch: batches.append(batch), checkpoint_every=2)
+    assert [len(batch) for batch in batches] == [2, 2, 1]
+    assert sorted(phone_number for batch in batches for phone_number, _ in batch) == recipients
+
+def test_failed_checkpoint_is_kept_for_the_next_flush():
+    """A batch that fails to be written is written again with a later one."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000, checkpoint_retry_delay=0)
+    written = []
+    calls = []
+
+    def checkpoint_fn(job_id, batch):
+        calls.append(len(batch))
+        if len(calls) == 1:
+            raise RuntimeError("database unavailable")
+        written.extend(batch)
+
+    run_broadcast(engine, 1, ["+1", "+2", "+3"], lambda phone_number: ({}, 200),
+                  checkpoint_fn=checkpoint_fn, checkpoint_every=2)
+    assert calls[0] == 2
+    assert sorted(phone_number for phone_number, _ in written) == ["+1", "+2", "+3"]
+
+def test_final_checkpoint_is_retried():
+    """The last batch of a broadcast is retried before giving up."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000,
+                             checkpoint_retry_delay=0, final_checkpoint_attempts=3)
+    calls = []
+
+    def checkpoint_fn(job_id, batch):
+        calls.append(batch)
+        if len(calls) < 3:
+            raise RuntimeError("database unavailable")
+
+    run_broadcast(engine, 1, ["+1"], lambda phone_number: ({}, 200),
+                  checkpoint_fn=checkpoint_fn, checkpoint_every=10)
+    assert len(calls) == 3
+
+def test_lost_checkpoints_are_reported():
+    """Results that could not be checkpointed are counted in the summary."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000,
+                             checkpoint_retry_delay=0, final_checkpoint_attempts=2)
+
+    def checkpoint_fn(job_id, batch):
+        raise RuntimeError("database unavailable")
+
+    summary = run_broadcast(engine, 1, ["+1", "+2"], lambda phone_number: ({}, 200),
+                            checkpoint_fn=checkpoint_fn, checkpoint_every=10)
+    assert summary["sent"] == 2
+    assert summary["unsaved"] == 2
+
+def test_prepare_fn_runs_in_background_before_sends():
+    """Slow setup runs in the broadcast thread and its result is passed to every send."""
+    engine = BroadcastEngine(max_workers=2, messages_per_second=1000)
+    release = threading.Event()
+    sent = []
+
+    def prepare_fn():
+        release.wait(5)
+        return "media-1"
+
+    def send_fn(phone_number, media_id):
+        sent.append(media_id)
+        return {}, 200
+
+    finished = threading.Event()
+    assert engine.start(1, "phone-id", ["+1", "+2"], send_fn, prepare_fn=prepare_fn,
+                        on_complete=lambda job_id, summary: finished.set())
+    # start returned while the setup is still blocked
+    release.set()
+    assert finished.wait(5)
+    assert sent == ["media-1", "media-1"]
+
+def test_heartbeat_runs_while_broadcasting():
+    """The heartbeat is called on its own timer, independently of checkpoints."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000)
+    beats = []
+
+    def send_fn(phone_number):
+        time.sleep(0.1)
+        return {}, 200
+
+    summary = run_broadcast(engine, 1, ["+1", "+2"], send_fn,
+                            heartbeat_fn=lambda job_id: beats.append(job_id), heartbeat_interval=0.02)
+    assert len(beats) >= 3
+    assert set(beats) == {1}
+    assert summary["sent"] == 2
+    assert not summary["aborted"]
+
+def test_failed_heartbeat_is_retried():
+    """An error in the heartbeat does not stop the broadcast."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000)
+
+    def heartbeat_fn(job_id):
+        raise RuntimeError("database unavailable")
+
+    def send_fn(phone_number):
+        time.sleep(0.05)
+        return {}, 200
+
+    summary = run_broadcast(engine, 1, ["+1", "+2"], send_fn, heartbeat_fn=heartbeat_fn, heartbeat_interval=0.01)
+    assert summary["sent"] == 2
+    assert not summary["aborted"]
+
+def test_lost_heartbeat_aborts_broadcast():
+    """When the heartbeat returns False, no further messages are sent."""
+    engine = BroadcastEngine(max_workers=1, messages_per_second=1000)
+    sent = []
+    batches = []
+
+    def send_fn(phone_number):
+        sent.append(phone_number)
+        time.sleep(0.05)
+        return {}, 200
+
+    summary = run_broadcast(engine, 1, [f"+{i}" for i in range(100)], send_fn,
+                            heartbeat_fn=lambda job_id: False, heartbeat_interval=0.01,
+                            checkpoint_fn=lambda job_id, batch: batches.append(batch))
+    assert summary["aborted"]
+    assert len(sent) < 10
+    assert summary["total"] == summary["sent"] == len(sent)
+    assert sorted(phone_number for batch in batches for phone_number, _ in batch) == sorted(sent)
+    assert engine.status(1)["aborted"]
@@ -0,0 +1,61 @@
+import os, sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.dedup_cache import MessageDedupCache, SqliteDedupBackend
+
+
+@pytest.fixture
+def backend_path(tmp_path):
+    return str(tmp_path / "dedup.db")
+
+
+# ---------------------------
+# MessageDedupCache Tests
+# ---------------------------
+
+def test_second_delivery_is_duplicate():
+    """A message ID is new the first time and a duplicate afterwards."""
+    cache = MessageDedupCache()
+    assert not cache.is_duplicate("wamid.1")
+    assert cache.is_duplicate("wamid.1")
+    assert cache.stats() == {"entries": 1, "duplicates": 1}
+
+def test_expired_id_is_new_again():
+    """IDs older than the TTL are no longer considered duplicates."""
+    cache = MessageDedupCache(ttl_seconds=0)
+    assert not cache.is_duplicate("wamid.1")
+    assert not cache.is_duplicate("wamid.1")
+
+def test_oldest_ids_are_evicted():
+    """The cache never holds more than max_size IDs."""
+    cache = MessageDedupCache(max_size=2)
+    for message_id in ("wamid.1", "wamid.2", "wamid.3"):
+        cache.is_duplicate(message_id)
+    assert cache.stats()["entries"] == 2
+    assert not cache.is_duplicate("wamid.1")
+
+def test_forget_allows_redelivery(backend_path):
+    """A forgotten message ID is processed again when it is redelivered."""
+    cache = MessageDedupCache(backend=SqliteDedupBackend(backend_path))
+    assert not cache.is_duplicate("wamid.1")
+    cache.forget("wamid.1")
+    assert not cache.is_duplicate("wamid.1")
+
+
+# ---------------------------
+# SqliteDedupBackend Tests
+# ---------------------------
+
+def test_processes_share_seen_ids(backend_path):
+    """A message seen by one process is a duplicate for another one on the same host."""
+    first = MessageDedupCache(backend=SqliteDedupBackend(backend_path))
+    second = MessageDedupCache(backend=SqliteDedupBackend(backend_path))
+    assert not first.is_duplicate("wamid.1")
+    assert second.is_duplicate("wamid.1")
+
+def test_expired_row_counts_as_new(backend_path):
+    """An expired row is refreshed and reported as new."""
+    backend = SqliteDedupBackend(backend_path, ttl_seconds=-1)
+    assert backend.add("wamid.1")
+    assert backend.add("wamid.1")
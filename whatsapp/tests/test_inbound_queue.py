@@ -0,0 +1,79 @@
+import os, sys
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.inbound_queue import InboundMessageQueue, QueueDispatcher
+
+
+@pytest.fixture
+def inbound_queue(tmp_path):
+    return InboundMessageQueue(path=str(tmp_path / "inbound.db"), max_attempts=2)
+
+
+class FakePool:
+    def __init__(self, capacity):
+        self.capacity = capacity
+        self.submitted = []
+
+    def submit(self, user_number, message_text, message_id, block=False, timeout=None):
+        if len(self.submitted) >= self.capacity:
+            return False
+        self.submitted.append(message_id)
+        return True
+
+
+# ---------------------------
+# InboundMessageQueue Tests
+# ---------------------------
+
+def test_enqueue_is_idempotent(inbound_queue):
+    """A retried delivery of the same message is ignored."""
+    assert inbound_queue.enqueue("wamid.1", "+1", "hello")
+    assert not inbound_queue.enqueue("wamid.1", "+1", "hello")
+    assert inbound_queue.stats()["pending"] == 1
+
+def test_claim_pending_in_arrival_order(inbound_queue):
+    """Claimed messages are returned oldest first and marked in progress."""
+    for index in range(3):
+        inbound_queue.enqueue(f"wamid.{index}", "+1", f"message {index}")
+    rows = inbound_queue.claim_pending(limit=2)
+    assert [row[0] for row in rows] == ["wamid.0", "wamid.1"]
+    assert inbound_queue.stats() == {"pending": 1, "in_progress": 2, "done": 0, "failed": 0}
+
+def test_failed_message_retried_until_max_attempts(inbound_queue):
+    """A message goes back to pending after a failure and fails for good after max_attempts."""
+    inbound_queue.enqueue("wamid.1", "+1", "hello")
+    inbound_queue.claim_pending()
+    inbound_queue.mark_failed("wamid.1", "boom")
+    assert inbound_queue.stats()["pending"] == 1
+
+    inbound_queue.claim_pending()
+    inbound_queue.mark_failed("wamid.1", "boom")
+    assert inbound_queue.stats()["failed"] == 1
+
+def test_messages_survive_a_restart(tmp_path):
+    """Messages in progress at shutdown are requeued when the queue is reopened."""
+    path = str(tmp_path / "inbound.db")
+    first = InboundMessageQueue(path=path)
+    first.enqueue("wamid.1", "+1", "hello")
+    first.claim_pending()
+
+    second = InboundMessageQueue(path=path)
+    assert second.requeue_in_progress() == 1
+    assert second.claim_pending()[0][0] == "wamid.1"
+
+
+# ---------------------------
+# QueueDispatcher Tests
+# ---------------------------
+
+def test_dispatcher_releases_messages_when_workers_are_full(inbound_queue):
+    """Messages the pool refuses go back to pending for the next round."""
+    for index in range(3):
+        inbound_queue.enqueue(f"wamid.{index}", "+1", f"message {index}")
+    pool = FakePool(capacity=2)
+    QueueDispatcher(inbound_queue, pool)._dispatch_pending()
+
+    assert pool.submitted == ["wamid.0", "wamid.1"]
+    assert inbound_queue.stats()["pending"] == 1
+    assert inbound_queue.stats()["in_progress"] == 2
@@ -0,0 +1,70 @@
+import os, sys
+import threading
+import time
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.media_cache import MediaIdCache
+
+
+# ---------------------------
+# MediaIdCache Tests
+# ---------------------------
+
+def test_asset_uploaded_once():
+    """The media ID of an asset is reused after the first upload."""
+    cache = MediaIdCache()
+    uploads = []
+    upload_fn = lambda: uploads.append(1) or "media-1"
+
+    assert cache.get_or_upload(1, upload_fn) == "media-1"
+    assert cache.get_or_upload(1, upload_fn) == "media-1"
+    assert len(uploads) == 1
+
+def test_expired_media_id_is_uploaded_again():
+    """Media IDs are not reused after the TTL."""
+    cache = MediaIdCache(ttl_seconds=-1)
+    cache.get_or_upload(1, lambda: "media-1")
+    assert cache.get(1) is None
+    assert cache.get_or_upload(1, lambda: "media-2") == "media-2"
+
+def test_concurrent_uploads_of_one_asset_are_merged():
+    """Concurrent broadcasts of the same asset upload it only once."""
+    cache = MediaIdCache()
+    uploads = []
+
+    def upload_fn():
+        uploads.append(1)
+        time.sleep(0.05)
+        return "media-1"
+
+    threads = [threading.Thread(target=cache.get_or_upload, args=(1, upload_fn)) for _ in range(5)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    assert len(uploads) == 1
+
+def test_slow_upload_does_not_block_other_assets():
+    """An upload in progress for one asset does not delay the upload of another."""
+    cache = MediaIdCache()
+    release = threading.Event()
+    slow = threading.Thread(target=cache.get_or_upload, args=(1, lambda: release.wait(5) and "media-1"))
+    slow.start()
+
+    started = time.monotonic()
+    assert cache.get_or_upload(2, lambda: "media-2") == "media-2"
+    assert time.monotonic() - started < 1
+    release.set()
+    slow.join()
+
+def test_failed_upload_is_not_cached():
+    """A failed upload raises and the next call uploads again."""
+    cache = MediaIdCache()
+
+    def failing_upload():
+        raise RuntimeError("upload failed")
+
+    with pytest.raises(RuntimeError):
+        cache.get_or_upload(1, failing_upload)
+    assert cache.get_or_upload(1, lambda: "media-1") == "media-1"
@@ -0,0 +1,56 @@
+import os, sys
+import threading
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.message_worker import MessageWorkerPool
+
+
+# ---------------------------
+# MessageWorkerPool Tests
+# ---------------------------
+
+def test_messages_of_one_user_keep_their_order():
+    """Messages from the same user are processed by one worker, in arrival order."""
+    handled = []
+    pool = MessageWorkerPool(lambda user, text: handled.append((user, text)), num_workers=4)
+    for index in range(20):
+        assert pool.submit("+3312345", index)
+    pool.shutdown()
+    assert [text for _, text in handled] == list(range(20))
+    assert pool.stats()["processed"] == 20
+
+def test_full_lane_rejects_message():
+    """A full lane refuses new messages instead of growing the backlog."""
+    release = threading.Event()
+    started = threading.Event()
+
+    def handler(user, text):
+        started.set()
+        release.wait(5)
+
+    pool = MessageWorkerPool(handler, num_workers=1, queue_size=1)
+    assert pool.submit("+1", "busy")
+    started.wait(5)
+    assert pool.submit("+1", "queued")
+    assert not pool.submit("+1", "rejected")
+    release.set()
+    pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["rejected"] == 1
+    assert stats["processed"] == 2
+
+def test_handler_errors_are_counted():
+    """A failing message does not stop the worker."""
+    def handler(user, text):
+        if text == "bad":
+            raise ValueError("bad message")
+
+    pool = MessageWorkerPool(handler, num_workers=1)
+    pool.submit("+1", "bad")
+    pool.submit("+1", "good")
+    pool.shutdown()
+
+    stats = pool.stats()
+    assert stats["failed"] == 1
+    assert stats["processed"] == 1
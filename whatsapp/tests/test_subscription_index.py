@@ -0,0 +1,101 @@
+import os, sys
+import threading
+import types
+import pytest
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.subscription_index import SubscriptionIndex
+
+
+# ---------------------------
+# SubscriptionIndex Tests
+# ---------------------------
+
+def test_load_builds_index():
+    """The index is built from the (phone_number, category) rows."""
+    index = SubscriptionIndex(lambda: [("+1", "sports"), ("+2", "sports"), ("+1", "news")])
+    index.load()
+    assert index.loaded
+    assert index.count("sports") == 2
+    assert set(index.subscribers("sports")) == {"+1", "+2"}
+    assert index.count("unknown") == 0
+
+def test_subscribers_is_lazy_snapshot():
+    """subscribers yields from a snapshot, so writes during a broadcast do not break iteration."""
+    index = SubscriptionIndex(lambda: [("+1", "sports"), ("+2", "sports")])
+    index.load()
+    subscribers = index.subscribers("sports")
+    assert isinstance(subscribers, types.GeneratorType)
+
+    first = next(subscribers)
+    index.add("+3", "sports")
+    index.remove("+2", "sports")
+    assert sorted([first] + list(subscribers)) == ["+1", "+2"]
+
+def test_write_through():
+    """Subscriptions added and removed after a commit are reflected immediately."""
+    index = SubscriptionIndex(lambda: [])
+    index.load()
+    index.add("+1", "sports")
+    assert list(index.subscribers("sports")) == ["+1"]
+    index.remove("+1", "sports")
+    assert index.count("sports") == 0
+
+def test_writes_during_reload_are_kept():
+    """A subscription written while the index reloads is not lost by the reload."""
+    loading = threading.Event()
+    release = threading.Event()
+
+    def load_fn():
+        loading.set()
+        release.wait(5)
+        return [("+1", "sports")]
+
+    index = SubscriptionIndex(load_fn)
+    loader = threading.Thread(target=index.load)
+    loader.start()
+    loading.wait(5)
+    index.add("+2", "sports")
+    release.set()
+    loader.join()
+    assert set(index.subscribers("sports")) == {"+1", "+2"}
+
+def test_failed_reload_keeps_previous_index():
+    """A reload that fails leaves the previous index in place."""
+    rows = [[("+1", "sports")]]
+
+    def load_fn():
+        if not rows:
+            raise RuntimeError("database unavailable")
+        return rows.pop()
+
+    index = SubscriptionIndex(load_fn)
+    index.load()
+    with pytest.raises(RuntimeError):
+        index.load()
+    assert list(index.subscribers("sports")) == ["+1"]
+
+def test_writes_before_first_load_are_dropped():
+    """A process that never loads the index does not accumulate writes."""
+    index = SubscriptionIndex(lambda: [])
+    index.add("+1", "sports")
+    assert index.total() == 0
+
+def test_refresh_reloads_when_count_changes():
+    """Subscriptions added by another process are picked up once the database count differs."""
+    rows = [("+1", "sports")]
+    index = SubscriptionIndex(lambda: list(rows), count_fn=lambda: len(rows))
+    index.load()
+    assert index.refresh() is False
+
+    rows.append(("+2", "sports"))  # e.g. a CRUD import
+    assert index.refresh() is True
+    assert set(index.subscribers("sports")) == {"+1", "+2"}
+
+def test_refresh_reloads_after_reconcile_interval():
+    """Without a count change, the index is still reloaded every reconcile_interval."""
+    loads = []
+    index = SubscriptionIndex(lambda: loads.append(1) or [], reconcile_interval=0, count_fn=lambda: 0)
+    index.load()
+    assert index.refresh() is True
+    assert len(loads) == 2
@@ -0,0 +1,150 @@
+import os, sys
+import pytest
+
+pytest.importorskip("sqlalchemy")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from shared.database import engine, SessionLocal
+from shared.models.base import Base
+from shared.models.users import Users
+from shared.models.user_subscriptions import UserSubscriptions
+from whatsapp.subscriptionManager import iter_subscribers, subscribe_user, subscribe_many, unsubscribe_user, subscription_index
+
+CATEGORY = "test-subscriptions"
+PHONE_NUMBERS = [f"+99900000{index:02d}" for index in range(7)]
+
+
+@pytest.fixture(scope='module', autouse=True)
+def subscriptions():
+    """
+    Creates subscriptions for a test category and removes them afterwards.
+    """
+    Base.metadata.create_all(bind=engine)
+    db_session = SessionLocal()
+    try:
+        for phone_number in PHONE_NUMBERS:
+            db_session.merge(Users(phone_number=phone_number))
+            db_session.merge(UserSubscriptions(phone_number=phone_number, category=CATEGORY))
+        db_session.commit()
+        yield PHONE_NUMBERS
+    finally:
+        db_session.query(UserSubscriptions).filter(UserSubscriptions.category == CATEGORY).delete()
+        db_session.query(Users).filter(Users.phone_number.in_(PHONE_NUMBERS)).delete(synchronize_session=False)
+        db_session.commit()
+        db_session.close()
+
+# ---------------------------
+# Tests for iter_subscribers
+# ---------------------------
+
+def test_iter_subscribers_pages_through_category():
+    """Every subscriber is yielded once, in ascending order, across pages."""
+    assert list(iter_subscribers(CATEGORY, page_size=3)) == sorted(PHONE_NUMBERS)
+
+def test_iter_subscribers_exact_page_boundary():
+    """A category whose size is a multiple of the page size ends cleanly."""
+    assert list(iter_subscribers(CATEGORY, page_size=7)) == sorted(PHONE_NUMBERS)
+
+def test_iter_subscribers_is_lazy():
+    """Only the first page is fetched before the first subscriber is returned."""
+    subscribers = iter_subscribers(CATEGORY, page_size=2)
+    assert next(subscribers) == sorted(PHONE_NUMBERS)[0]
+
+def test_iter_subscribers_unknown_category():
+    """An unknown category yields nothing."""
+    assert list(iter_subscribers("test-no-such-category")) == []
+
+
+# ---------------------------
+# Tests for stale subscription index
+# ---------------------------
+
+def test_subscribe_ignores_stale_index():
+    """A subscription removed by another process is created again despite the index."""
+    phone_number = PHONE_NUMBERS[0]
+    subscription_index.add(phone_number, "test-stale")
+    try:
+        assert subscribe_user(phone_number, "test-stale") == ("Subscription to test-stale successful", 200)
+    finally:
+        unsubscribe_user(phone_number, "test-stale")
+
+def test_unsubscribe_ignores_stale_index():
+    """A subscription created by another process (e.g. a CRUD import) can be removed."""
+    phone_number = PHONE_NUMBERS[1]
+    db_session = SessionLocal()
+    db_session.merge(UserSubscriptions(phone_number=phone_number, category="test-stale"))
+    db_session.commit()
+    db_session.close()
+
+    subscription_index.remove(phone_number, "test-stale")
+    assert unsubscribe_user(phone_number, "test-stale") == ("Unsubscribed from test-stale successfully", 200)
+
+
+# ---------------------------
+# Tests for subscribe_user
+# ---------------------------
+
+def test_subscribe_new_user():
+    """Subscribing an unknown number creates the user and the subscription."""
+    phone_number = "+9990000099"
+    try:
+        assert subscribe_user(phone_number, "test-new") == ("Subscription to test-new successful", 200)
+        db_session = SessionLocal()
+        assert db_session.get(Users, phone_number) is not None
+        db_session.close()
+    finally:
+        db_session = SessionLocal()
+        db_session.query(Users).filter(Users.phone_number == phone_number).delete()
+        db_session.commit()
+        db_session.close()
+
+def test_subscribe_twice():
+    """A second subscription to the same category is reported as existing."""
+    phone_number = PHONE_NUMBERS[2]
+    assert subscribe_user(phone_number, CATEGORY) == ("Subscription Already Exists", 200)
+
+
+# ---------------------------
+# Tests for subscribe_many
+# ---------------------------
+
+def test_subscribe_many_creates_users_and_subscriptions():
+    """New and existing users are subscribed in chunks; duplicates are ignored."""
+    new_numbers = ["+9990000081", "+9990000082", "+9990000083"]
+    users = [PHONE_NUMBERS[3]] + new_numbers + [new_numbers[0]]
+    subscription_index.load()
+    try:
+        assert subscribe_many(users, "test-many", chunk_size=2) == ("Subscription to test-many successful", 200)
+        assert sorted(iter_subscribers("test-many")) == sorted([PHONE_NUMBERS[3]] + new_numbers)
+        assert sorted(subscription_index.subscribers("test-many")) == sorted([PHONE_NUMBERS[3]] + new_numbers)
+    finally:
+        db_session = SessionLocal()
+        db_session.query(UserSubscriptions).filter(UserSubscriptions.category == "test-many").delete()
+        db_session.query(Users).filter(Users.phone_number.in_(new_numbers)).delete(synchronize_session=False)
+        db_session.commit()
+        db_session.close()
+        for phone_number in users:
+            subscription_index.remove(phone_number, "test-many")
+
+def test_subscribe_many_existing_subscriptions():
+    """Subscribing users who are all already subscribed is reported as existing."""
+    assert subscribe_many(PHONE_NUMBERS[:3], CATEGORY) == ("Subscription Already Exists", 200)
+
+def test_subscribe_many_counts_and_names():
+    """Created users and subscriptions are counted; names are set on new users only."""
+    counts = {}
+    users = [("+9990000084", "Dana"), (PHONE_NUMBERS[4], "Renamed")]
+    try:
+        assert subscribe_many(users, None, counts=counts) == ("Users created", 200)
+        assert subscribe_many(users, "test-many", counts=counts) == ("Subscription to test-many successful", 200)
+        assert counts == {"users_created": 1, "subscriptions_created": 2}
+        db_session = SessionLocal()
+        assert db_session.get(Users, "+9990000084").name == "Dana"
+        assert db_session.get(Users, PHONE_NUMBERS[4]).name is None
+        db_session.close()
+    finally:
+        db_session = SessionLocal()
+        db_session.query(UserSubscriptions).filter(UserSubscriptions.category == "test-many").delete()
+        db_session.query(Users).filter(Users.phone_number == "+9990000084").delete()
+        db_session.commit()
+        db_session.close()
@@ -0,0 +1,36 @@
+import os, sys
+import pytest
+
+pytest.importorskip("requests")
+
+sys.path.append(os.path.abspath(os.path.join(os.path.dirname(__file__), '..', '..')))
+from whatsapp.apis.whatsapp_api import WhatsAppAPI
+
+
+@pytest.fixture
+def retry():
+    api = WhatsAppAPI(graph_api_token="test-token")
+    return api.session.get_adapter("https://graph.facebook.com").max_retries
+
+
+# ---------------------------
+# Retry Policy Tests
+# ---------------------------
+
+def test_post_retried_on_rate_limit(retry):
+    """A rate-limited message was not sent, so it is retried."""
+    assert retry.is_retry("POST", 429)
+
+def test_post_not_retried_on_server_error(retry):
+    """A 5xx on a message may mean it was sent, so it is not retried."""
+    for status_code in (500, 502, 503, 504):
+        assert not retry.is_retry("POST", status_code)
+
+def test_post_not_retried_on_read_error(retry):
+    """Read errors are only retried for idempotent methods."""
+    assert not retry._is_method_retryable("POST")
+    assert retry._is_method_retryable("GET")
+
+def test_get_retried_on_server_error(retry):
+    """Media downloads (GET) are retried on 5xx responses."""
+    assert retry.is_retry("GET", 503)